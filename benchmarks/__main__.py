@@ -0,0 +1,293 @@
+"""
+Offline benchmarks for SearchAI.
+
+    python -m benchmarks                   # run everything and print a table
+    python -m benchmarks --compare         # ... and compare it to baseline.json, failing on regressions
+    python -m benchmarks --save            # ... and make the results the new baseline.json
+    python -m benchmarks -k markdown       # only the benchmarks with 'markdown' in their name
+
+Searches go to a local stand-in for lite.duckduckgo.com, and extended outputs fetch heavy pages from a local static
+site, so the numbers measure SearchAI and not the network.
+"""
+
+import sys
+import json
+import time
+import math
+import asyncio
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from pathlib import Path
+from dataclasses import asdict, dataclass
+from typing import Any, Callable
+
+import search_ai.searcher as searcher
+from search_ai import Hedging, SearchClient, search, async_search
+from search_ai.parse import parse_search
+from search_ai.utils import extract_metadata, generate_markdown
+from search_ai.convert import convert_page
+from search_ai.search_result import CompactSearchResult, SearchResult
+
+from .pages import SITE_PAGES, lite_page
+from .servers import LiteServer, SiteServer
+
+
+BASELINE = Path(__file__).parent / 'baseline.json'
+
+# Fewer runs for the slow benchmarks, so the whole suite takes about a minute
+PAGE_ITERATIONS = {'small': 40, 'medium': 10, 'large': 4}
+SEARCH_ITERATIONS = 40
+IMPORT_ITERATIONS = 10
+
+# Deep searches go to a stand-in with this much latency, so requesting pages in parallel pays off like it would
+DEEP_COUNT = 300
+DEEP_LATENCY = 0.02
+DEEP_ITERATIONS = 5
+
+# One search in this many stalls for half a second, which hedging should take out of the p99
+STALL_EVERY = 25
+STALL_TIME = 0.5
+STALL_LATENCY = 0.005
+STALL_ITERATIONS = 100
+
+# The result classes are compared on this many parsed rows, like a bulk job holding the results of 100 searches
+RESULT_ROWS = 1_000
+EXTENDED_ITERATIONS = 8
+
+
+@dataclass
+class Result:
+    name: str
+    iterations: int
+    ops_per_sec: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+@dataclass
+class Benchmark:
+    name: str
+    run: Callable[[], object]
+    iterations: int
+
+    def measure(self, warmup: int = 1) -> Result:
+        for _ in range(warmup):
+            self.run()
+
+        timings = []
+        for _ in range(self.iterations):
+            start = time.perf_counter()
+            self.run()
+            timings.append(time.perf_counter() - start)
+
+        return Result(
+            self.name,
+            self.iterations,
+            round(self.iterations / sum(timings), 2),
+            round(percentile(timings, 50) * 1000, 3),
+            round(percentile(timings, 95) * 1000, 3),
+            round(percentile(timings, 99) * 1000, 3),
+        )
+
+
+def percentile(timings: list[float], p: float) -> float:
+    """
+    The nearest-rank percentile, which is one of the timings instead of an interpolation between two.
+    """
+    ordered = sorted(timings)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def import_search_ai() -> None:
+    # A fresh interpreter each time, like a short-lived worker or CLI wrapper starting up
+    subprocess.run([sys.executable, '-c', 'import search_ai'], check=True)
+
+
+def result_memory(result_class: type, rows: list[dict]) -> float:
+    """
+    Bytes allocated per result, including a validated link for the full models. The rows share their strings, so
+    this is just what each class adds.
+    """
+    tracemalloc.start()
+    results = [result_class(**row) for row in rows]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    del results
+    return round(size / len(rows), 1)
+
+
+def searching(url: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Call `fn` with searches going to `url` instead of the usual stand-in.
+    """
+    base_url = searcher.BASE_URL
+    searcher.BASE_URL = url
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        searcher.BASE_URL = base_url
+
+
+def benchmarks(
+    lite: LiteServer, deep: LiteServer, stalling: LiteServer, site: SiteServer, loop: asyncio.AbstractEventLoop
+) -> list[Benchmark]:
+    pages = {name: site.pages[name].decode() for name in SITE_PAGES}
+    results_page = lite_page('python', 0, 10, lite.link)
+
+    suite = [
+        Benchmark('import search_ai', import_search_ai, IMPORT_ITERATIONS),
+        Benchmark('search', lambda: search('python', count=30), SEARCH_ITERATIONS),
+        Benchmark('async_search', lambda: loop.run_until_complete(async_search('python', count=30)), SEARCH_ITERATIONS),
+        Benchmark('parse_search', lambda: parse_search(results_page), 200),
+    ]
+
+    for parallel_pages in (1, 8):
+        client = SearchClient(parallel_pages=parallel_pages)
+        suite.append(
+            Benchmark(
+                f'search[count={DEEP_COUNT},parallel_pages={parallel_pages}]',
+                lambda client=client: searching(deep.url, client.search, 'python', count=DEEP_COUNT),
+                DEEP_ITERATIONS,
+            )
+        )
+
+    for hedging in (None, Hedging(min_delay=0.01, initial_delay=0.05)):
+        client = SearchClient(hedging=hedging)
+        suite.append(
+            Benchmark(
+                f'search[stalls,hedging={"on" if hedging else "off"}]',
+                lambda client=client: searching(stalling.url, client.search, 'python', count=10),
+                STALL_ITERATIONS,
+            )
+        )
+
+    rows = parse_search(results_page) * (RESULT_ROWS // 10)
+    for result_class in (SearchResult, CompactSearchResult):
+        suite.append(
+            Benchmark(f'results[{result_class.__name__}]', lambda cls=result_class: [cls(**row) for row in rows], 40)
+        )
+
+    for name, page in pages.items():
+        iterations = PAGE_ITERATIONS[name]
+        suite += [
+            Benchmark(f'extract_metadata[{name}]', lambda page=page: extract_metadata(page), iterations * 5),
+            Benchmark(f'generate_markdown[{name}]', lambda page=page: generate_markdown(page, False, True), iterations),
+            Benchmark(f'convert_page[{name}]', lambda page=page: convert_page(page, max_length=1_000), iterations),
+        ]
+
+    results = search('python', count=10)
+    async_results = loop.run_until_complete(async_search('python', count=10))
+
+    suite += [
+        Benchmark(
+            'SearchResults.markdown(extend=True)',
+            lambda: results.markdown(extend=True, fetch_mode='tiered'),
+            EXTENDED_ITERATIONS,
+        ),
+        Benchmark(
+            'SearchResults.json(extend=True)',
+            lambda: results.json(extend=True, fetch_mode='tiered'),
+            EXTENDED_ITERATIONS,
+        ),
+        Benchmark(
+            'AsyncSearchResults.markdown(extend=True)',
+            lambda: loop.run_until_complete(async_results.markdown(extend=True, fetch_mode='tiered')),
+            EXTENDED_ITERATIONS,
+        ),
+        Benchmark(
+            'AsyncSearchResults.json(extend=True)',
+            lambda: loop.run_until_complete(async_results.json(extend=True, fetch_mode='tiered')),
+            EXTENDED_ITERATIONS,
+        ),
+    ]
+
+    return suite
+
+
+def print_table(results: list[Result], baseline: dict[str, dict]) -> None:
+    header = f'{"benchmark":<42} {"runs":>5} {"ops/s":>10} {"p50 ms":>10} {"p95 ms":>10} {"p99 ms":>10}'
+    print(header + ('  p50 vs baseline' if baseline else ''))
+    print('-' * (len(header) + (18 if baseline else 0)))
+
+    for r in results:
+        line = f'{r.name:<42} {r.iterations:>5} {r.ops_per_sec:>10.2f}'
+        line += f' {r.p50_ms:>10.3f} {r.p95_ms:>10.3f} {r.p99_ms:>10.3f}'
+        if r.name in baseline:
+            line += f'  {r.p50_ms / baseline[r.name]["p50_ms"]:>15.2f}x'
+        print(line)
+
+
+def regressions(results: list[Result], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    return [r.name for r in results if r.name in baseline and r.p50_ms > baseline[r.name]['p50_ms'] * (1 + tolerance)]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Offline SearchAI benchmarks.')
+    parser.add_argument('-k', dest='keyword', default='', help='only run benchmarks with this in their name')
+    parser.add_argument('--iterations', type=int, help='runs per benchmark, instead of the defaults')
+    parser.add_argument('--baseline', type=Path, default=BASELINE, help='baseline file (default: %(default)s)')
+    parser.add_argument('--compare', action='store_true', help='exit with 1 if a p50 regressed past --tolerance')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p50 slowdown (default: %(default)s)')
+    parser.add_argument('--save', action='store_true', help='write the results to the baseline file')
+    args = parser.parse_args(argv)
+
+    saved_data = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    saved = saved_data.get('results', {})
+    saved_memory = saved_data.get('result_memory', {})
+    baseline = saved if args.compare else {}
+
+    # The stand-in servers answer instantly, so the pause between results pages would only measure time.sleep
+    searcher.SLEEP_TIME = 0
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    with SiteServer() as site:
+        names = list(SITE_PAGES)
+
+        def link(n: int) -> str:
+            return site.page_url(names[n % len(names)])
+
+        stalling = LiteServer(link, latency=STALL_LATENCY, stall=STALL_TIME, stall_every=STALL_EVERY)
+
+        with LiteServer(link) as lite, LiteServer(link, total=DEEP_COUNT, latency=DEEP_LATENCY) as deep, stalling:
+            searcher.BASE_URL = lite.url
+
+            results = []
+            for benchmark in benchmarks(lite, deep, stalling, site, loop):
+                if args.keyword in benchmark.name:
+                    benchmark.iterations = args.iterations or benchmark.iterations
+                    results.append(benchmark.measure())
+                    print(f'{benchmark.name}: done', file=sys.stderr)
+
+    loop.close()
+    print_table(results, baseline)
+
+    memory = {}
+    if 'results' in args.keyword or not args.keyword:
+        rows = parse_search(lite_page('python', 0, 10, lambda n: f'https://example.com/{n}')) * (RESULT_ROWS // 10)
+        memory = {cls.__name__: result_memory(cls, rows) for cls in (SearchResult, CompactSearchResult)}
+        print('\nBytes per result: ' + ', '.join(f'{name} {size:.0f}' for name, size in memory.items()))
+
+    if args.save:
+        # Benchmarks that weren't run keep their saved results
+        environment = {'python': platform.python_version(), 'platform': platform.platform()}
+        data = {'environment': environment, 'results': saved | {r.name: asdict(r) for r in results}}
+        data['result_memory'] = memory or saved_memory
+        args.baseline.write_text(json.dumps(data, indent=2) + '\n')
+
+    if args.compare:
+        slower = regressions(results, baseline, args.tolerance)
+        if slower:
+            print(f'\nSlower than the baseline by more than {args.tolerance:.0%}: {", ".join(slower)}')
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Deterministic stand-ins for the pages SearchAI reads: DuckDuckGo lite results pages and heavy article pages.
+"""
+
+import random
+from html import escape
+from typing import Callable
+
+
+WORDS = (
+    'search engine result page markdown browser proxy latency request response session cache token python async '
+    'library network parser document element content metadata article section table list image link query filter '
+    'region timespan server client thread process memory performance benchmark baseline throughput percentile'
+).split()
+
+# Name and approximate size in bytes of the heavy pages the static site serves
+SITE_PAGES = {'small': 40_000, 'medium': 300_000, 'large': 1_500_000}
+
+LITE_TEMPLATE = """<!DOCTYPE html PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN" "http://www.w3.org/TR/html4/loose.dtd">
+<html>
+<head>
+  <meta http-equiv="content-type" content="text/html; charset=UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=0">
+  <meta name="referrer" content="origin">
+  <title>{query} at DuckDuckGo</title>
+  <link title="DuckDuckGo (Lite)" type="application/opensearchdescription+xml" rel="search" href="/lite/opensearch.xml">
+  <link rel="stylesheet" href="/dist/lite.css" type="text/css">
+</head>
+<body>
+  <p class='extra'>&nbsp;</p>
+  <div class="header">DuckDuckGo</div>
+  <p class='extra'>&nbsp;</p>
+  <form action="/lite/" method="post">
+    <input class="query" type="text" size="40" name="q" autocomplete="off" value="{query}" autofocus>
+    <input class="submit" type="submit" value="Search">
+    <div class="filters">
+      <select class="submit" name="kl">
+        <option value="" >All Regions</option>
+        <option value="us-en" >US (English)</option>
+        <option value="uk-en" >UK</option>
+      </select>
+      <select class="submit" name="df">
+        <option value="" selected>Any Time</option>
+        <option value="d" >Past Day</option>
+        <option value="w" >Past Week</option>
+      </select>
+    </div>
+  </form>
+  <p class='extra'>&nbsp;</p>
+  <table border="0">
+{rows}
+  </table>
+  <br>
+  <table border="0">
+    <tr>
+      <td>
+        <form action="/lite/" method="post">
+          <input type="submit" class='navbutton' value="Next Page &gt;">
+          <input type="hidden" name="q" value="{query}">
+          <input type="hidden" name="s" value="{next_s}">
+          <input type="hidden" name="dc" value="{next_dc}">
+        </form>
+      </td>
+    </tr>
+  </table>
+</body>
+</html>
+"""
+
+SPONSORED_ROWS = """    <tr class="result-sponsored">
+      <td valign="top">&nbsp;</td>
+      <td>
+        <a rel="nofollow" href="https://duckduckgo.com/y.js?ad_domain=ads.example.com&amp;ad_provider=bing"
+           class='result-link'>{title}</a>
+      </td>
+    </tr>
+    <tr class="result-sponsored">
+      <td>&nbsp;&nbsp;&nbsp;</td>
+      <td class='result-snippet'>{snippet}</td>
+    </tr>
+    <tr class="result-sponsored">
+      <td>&nbsp;&nbsp;&nbsp;</td>
+      <td><span class='link-text'>ads.example.com</span></td>
+    </tr>
+    <tr><td>&nbsp;</td><td>&nbsp;</td></tr>
+"""
+
+RESULT_ROWS = """    <tr>
+      <td valign="top">{number}.&nbsp;</td>
+      <td>
+        <a rel="nofollow" href="{link}" class='result-link'>{title}</a>
+      </td>
+    </tr>
+    <tr>
+      <td>&nbsp;&nbsp;&nbsp;</td>
+      <td class='result-snippet'>{snippet}</td>
+    </tr>
+    <tr>
+      <td>&nbsp;&nbsp;&nbsp;</td>
+      <td><span class='link-text'>{display_link}</span>&nbsp;&nbsp;&nbsp;<span class='timestamp'>2024-05-01</span></td>
+    </tr>
+    <tr><td>&nbsp;</td><td>&nbsp;</td></tr>
+"""
+
+
+def words(rng: random.Random, count: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def lite_page(query: str, start: int, stop: int, link: Callable[[int], str], sponsored: int = 2) -> str:
+    """
+    A lite results page with results `start` to `stop`, after `sponsored` ads. Result `n` links to `link(n)`.
+    """
+    rng = random.Random(f'{query}:{start}')
+    rows = [
+        SPONSORED_ROWS.format(title=escape(words(rng, 5).title()), snippet=escape(words(rng, 25)))
+        for _ in range(sponsored)
+    ]
+
+    for n in range(start, stop):
+        url = link(n)
+        rows.append(
+            RESULT_ROWS.format(
+                number=n + 1,
+                link=escape(url),
+                title=escape(f'{query} {words(rng, 6)}'.title()),
+                snippet=escape(words(rng, 30)).replace(escape(query), f'<b>{escape(query)}</b>'),
+                display_link=escape(url.split('://', 1)[-1]),
+            )
+        )
+
+    if start == stop:
+        rows = ['    <tr><td>No more results.</td></tr>\n']
+
+    return LITE_TEMPLATE.format(query=escape(query), rows=''.join(rows), next_s=stop - 1, next_dc=stop)
+
+
+def site_page(name: str, size: int) -> str:
+    """
+    A documentation-style article of about `size` bytes, wrapped in the navigation, scripts and styles of a
+    modern site, which make up most of a real page's weight.
+    """
+    rng = random.Random(name)
+
+    head = [
+        f'<title>{name.title()} page | Example Docs</title>',
+        f'<meta name="description" content="{words(rng, 20)}">',
+        '<meta name="author" content="Example Author">',
+        '<meta name="twitter:site" content="@example">',
+        '<meta charset="utf-8">',
+        f'<style>{"".join(f".c{i} {{margin: {i}px; padding: {i % 7}px}}" for i in range(size // 400))}</style>',
+        f'<script>window.__STATE__ = {{"items": [{",".join(str(i) for i in range(size // 200))}]}};</script>',
+    ]
+
+    nav = ''.join(f'<li><a href="/docs/{i}">{words(rng, 2)}</a></li>' for i in range(60))
+    body = [f'<header><nav><ul>{nav}</ul></nav></header>', '<main><article>', f'<h1>{name.title()} page</h1>']
+
+    section = 0
+    while sum(map(len, body)) + sum(map(len, head)) < size:
+        section += 1
+        body.append(f'<h2 id="s{section}">{words(rng, 4)}</h2>')
+
+        for _ in range(4):
+            links = ' '.join(
+                f'<a href="https://example.com/{rng.randrange(1000)}">{words(rng, 2)}</a>' for _ in range(2)
+            )
+            body.append(f'<p>{words(rng, 40)} <strong>{words(rng, 3)}</strong> {links} <em>{words(rng, 5)}</em>.</p>')
+
+        body.append('<ul>' + ''.join(f'<li>{words(rng, 8)}</li>' for _ in range(5)) + '</ul>')
+        body.append(f'<pre><code>def {rng.choice(WORDS)}():\n    return {section}\n</code></pre>')
+
+        if section % 3 == 0:
+            cells = ''.join('<tr>' + ''.join(f'<td>{words(rng, 2)}</td>' for _ in range(4)) + '</tr>' for _ in range(6))
+            body.append(f'<table><tr><th>A</th><th>B</th><th>C</th><th>D</th></tr>{cells}</table>')
+
+        body.append(f'<div class="ad"><script>track({section});</script><img src="/img/{section}.png"></div>')
+
+    body.append('</article></main><footer><p>Copyright Example</p></footer>')
+    return f'<!DOCTYPE html><html><head>{"".join(head)}</head><body>{"".join(body)}</body></html>'
@@ -0,0 +1,156 @@
+"""
+Local HTTP servers for the benchmarks, so they measure SearchAI instead of the network and DuckDuckGo's mood.
+"""
+
+import time
+import hashlib
+import itertools
+import threading
+from email.utils import formatdate
+from typing import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .pages import SITE_PAGES, lite_page, site_page
+
+
+class _Server:
+    handler: type[BaseHTTPRequestHandler]
+
+    def __init__(self):
+        self.requests = 0
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler)
+        self._server.daemon_threads = True
+        self._server.owner = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # Headers and body are written separately
+
+    def send_page(self, body: bytes, status: int = 200, headers: dict[str, str] | None = None) -> None:
+        self.server.owner.requests += 1
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class _LiteHandler(_Handler):
+    def do_GET(self) -> None:
+        self.respond(parse_qs(urlsplit(self.path).query))
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get('Content-Length') or 0)
+        self.respond(parse_qs(self.rfile.read(length).decode()))
+
+    def respond(self, form: dict[str, list[str]]) -> None:
+        server: LiteServer = self.server.owner
+        query = form.get('q', [''])[0]
+
+        # Like DuckDuckGo, `dc` is the (0-based here) index of the first result and `s` the one before it
+        start = int(form.get('dc', ['0'])[0])
+        stop = min(start + server.page_size, server.total)
+
+        page = lite_page(query, start, max(start, stop), server.link, server.sponsored)
+        time.sleep(server.latency + server.stall_time())
+        self.send_page(page.encode())
+
+
+class LiteServer(_Server):
+    """
+    Mimics lite.duckduckgo.com/lite/: every query has `total` results, served `page_size` at a time after
+    `sponsored` ads, `latency` seconds after they're requested. Result `n` links to `link(n)`. With `stall_every`,
+    every that many-th request takes `stall` seconds longer, like a connection that hangs now and then.
+    """
+
+    handler = _LiteHandler
+
+    def __init__(
+        self,
+        link: Callable[[int], str],
+        total: int = 30,
+        page_size: int = 10,
+        sponsored: int = 2,
+        latency: float = 0.0,
+        stall: float = 0.0,
+        stall_every: int = 0,
+    ):
+        super().__init__()
+        self.link = link
+        self.total = total
+        self.page_size = page_size
+        self.sponsored = sponsored
+        self.latency = latency
+        self.stall = stall
+        self.stall_every = stall_every
+        self._received = itertools.count(1)
+
+    def stall_time(self) -> float:
+        received = next(self._received)
+        return self.stall if self.stall_every and received % self.stall_every == 0 else 0.0
+
+    @property
+    def url(self) -> str:
+        return super().url + '/lite/'
+
+
+class _SiteHandler(_Handler):
+    def do_GET(self) -> None:
+        server: SiteServer = self.server.owner
+        name = urlsplit(self.path).path.strip('/').removesuffix('.html')
+        page = server.pages.get(name)
+
+        if page is None:
+            self.send_page(b'<html><body><p>Not found</p></body></html>', status=404)
+            return
+
+        etag = server.etags[name]
+        if self.headers.get('If-None-Match') == etag:
+            self.send_page(b'', status=304, headers={'ETag': etag})
+            return
+
+        self.send_page(page, headers={'ETag': etag, 'Last-Modified': server.last_modified})
+
+
+class SiteServer(_Server):
+    """
+    Serves the heavy pages in `pages.SITE_PAGES` at /<name>.html, with ETag and Last-Modified headers.
+    """
+
+    handler = _SiteHandler
+
+    def __init__(self):
+        super().__init__()
+        self.pages = {name: site_page(name, size).encode() for name, size in SITE_PAGES.items()}
+        self.etags = {name: f'"{hashlib.sha1(page).hexdigest()}"' for name, page in self.pages.items()}
+        self.last_modified = formatdate(0, usegmt=True)
+
+    def page_url(self, name: str) -> str:
+        return f'{self.url}/{name}.html'
@@ -1,3 +1,23 @@
-from .searcher import search, async_search
+from .searcher import (
+    search,
+    async_search,
+    search_iter,
+    async_search_iter,
+    search_many,
+    async_search_many,
+    SearchClient,
+    AsyncSearchClient,
+    SearchJob,
+    BatchResult,
+    SearchBlocked,
+)
 from .filters import Filters, Timespans, Regions
-from .proxy import Proxy
+from .proxy import Proxy, ProxyPool
+from .browser import BrowserPool
+from .ratelimit import RateLimiter, AdaptiveRateLimiter
+from .hedging import Hedging
+from .cache import SearchCache, PageCache
+from .pool import ConversionPool
+from .runner import LoopRunner
+from .replay import Recorder, Replayer
+from .tracing import Timings
@@ -0,0 +1,175 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext, Route, Request
+
+
+# Only the text of a page is used, so nothing that is purely visual needs to be downloaded
+DEFAULT_BLOCKED_TYPES = frozenset({'image', 'media', 'font', 'stylesheet', 'texttrack', 'manifest'})
+
+# Ad, analytics and tracking hosts. Subdomains are blocked too.
+BLOCKED_DOMAINS = frozenset(
+    {
+        'doubleclick.net',
+        'googlesyndication.com',
+        'googleadservices.com',
+        'google-analytics.com',
+        'googletagmanager.com',
+        'googletagservices.com',
+        'adservice.google.com',
+        'analytics.google.com',
+        'connect.facebook.net',
+        'facebook.com/tr',
+        'amazon-adsystem.com',
+        'adnxs.com',
+        'adsrvr.org',
+        'advertising.com',
+        'criteo.com',
+        'criteo.net',
+        'outbrain.com',
+        'taboola.com',
+        'pubmatic.com',
+        'rubiconproject.com',
+        'openx.net',
+        'casalemedia.com',
+        'moatads.com',
+        'scorecardresearch.com',
+        'quantserve.com',
+        'quantcount.com',
+        'chartbeat.com',
+        'chartbeat.net',
+        'hotjar.com',
+        'hotjar.io',
+        'mouseflow.com',
+        'fullstory.com',
+        'clarity.ms',
+        'segment.com',
+        'segment.io',
+        'mixpanel.com',
+        'amplitude.com',
+        'heap.io',
+        'heapanalytics.com',
+        'newrelic.com',
+        'nr-data.net',
+        'optimizely.com',
+        'bat.bing.com',
+        'ads.linkedin.com',
+        'px.ads.linkedin.com',
+        'snap.licdn.com',
+        'analytics.twitter.com',
+        'ads-twitter.com',
+        'static.ads-twitter.com',
+        'analytics.tiktok.com',
+        'ads.pinterest.com',
+        'ct.pinterest.com',
+        'yandex.ru/metrika',
+        'mc.yandex.ru',
+        'adform.net',
+        'bidswitch.net',
+        'smartadserver.com',
+        'teads.tv',
+        'media.net',
+        'zedo.com',
+        'krxd.net',
+        'bluekai.com',
+        'demdex.net',
+        'omtrdc.net',
+        '2mdn.net',
+        'serving-sys.com',
+        'sharethrough.com',
+        'yieldmo.com',
+        'onetrust.com',
+        'cookielaw.org',
+        'trustarc.com',
+        'cookiebot.com',
+    }
+)
+
+# Blocked requests are never downloaded, so the bytes they would have cost are estimated by type
+ESTIMATED_BYTES = {
+    'image': 45_000,
+    'media': 500_000,
+    'font': 35_000,
+    'stylesheet': 25_000,
+    'script': 30_000,
+    'xhr': 5_000,
+    'fetch': 5_000,
+}
+DEFAULT_ESTIMATED_BYTES = 5_000
+
+
+@dataclass
+class BlockStats:
+    requests: int = 0
+    bytes: int = 0
+    by_type: Counter[str] = field(default_factory=Counter)
+
+    def record(self, resource_type: str) -> None:
+        self.requests += 1
+        self.bytes += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+        self.by_type[resource_type] += 1
+
+
+class ResourceBlocker:
+    """
+    Aborts requests the text extraction doesn't need, by resource type and by host.
+
+    `attach` returns the stats for one page, and `totals` adds up every page the blocker was attached to.
+    """
+
+    def __init__(
+        self,
+        resource_types: frozenset[str] | set[str] = DEFAULT_BLOCKED_TYPES,
+        domains: frozenset[str] | set[str] = BLOCKED_DOMAINS,
+        enabled: bool = True,
+    ):
+        self.resource_types = frozenset(resource_types)
+        self.domains = frozenset(domains)
+        self.enabled = enabled
+
+        self.pages = 0
+        self.totals = BlockStats()
+
+    def blocks(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.resource_types:
+            return True
+
+        parts = urlsplit(url)
+        host = parts.hostname or ''
+        first_path_segment = parts.path.split('/', 2)[1] if parts.path.count('/') else ''
+
+        labels = host.split('.')
+        for i in range(len(labels) - 1):
+            domain = '.'.join(labels[i:])
+            if domain in self.domains or f'{domain}/{first_path_segment}' in self.domains:
+                return True
+
+        return False
+
+    async def attach(self, context: 'BrowserContext') -> BlockStats:
+        from playwright.async_api import Error as PlaywrightError
+
+        stats = BlockStats()
+        if not self.enabled:
+            return stats
+
+        async def handle(route: 'Route', request: 'Request') -> None:
+            # Never block the page itself, even if the site is on the blocklist
+            top_level = request.is_navigation_request() and request.frame.parent_frame is None
+
+            try:
+                if not top_level and self.blocks(request.resource_type, request.url):
+                    stats.record(request.resource_type)
+                    self.totals.record(request.resource_type)
+                    await route.abort('blockedbyclient')
+                else:
+                    await route.continue_()
+            except PlaywrightError:
+                pass  # The page was closed while the request was in flight
+
+        await context.route('**/*', handle)
+        self.pages += 1
+        return stats
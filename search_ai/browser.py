@@ -0,0 +1,227 @@
+import os
+import asyncio
+import subprocess
+from dataclasses import dataclass
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator
+
+from .proxy import Proxy
+from . import tracing
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, Playwright
+
+
+@dataclass(eq=False)
+class _PooledBrowser:
+    key: str | None
+    browser: 'Browser'
+    pages: int = 0
+    active: int = 0
+    retired: bool = False
+
+
+class BrowserPool:
+    """
+    Long-lived Chromium browsers shared across `get_page` calls.
+
+    Playwright sets the proxy when a browser is launched, so the pool keeps one browser per proxy. A browser
+    is recycled once it has rendered `max_pages` pages or its process tree uses more than `max_memory_mb`.
+    The pool belongs to the event loop it was started on.
+    """
+
+    def __init__(
+        self,
+        max_pages: int | None = 200,
+        max_memory_mb: int | None = 1_024,
+        memory_check_interval: int = 10,
+    ):
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.memory_check_interval = memory_check_interval
+        self.launches = 0
+
+        self._playwright: 'Playwright | None' = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._starting: asyncio.Future | None = None
+        self._lock: asyncio.Lock | None = None
+        self._browsers: dict[str | None, _PooledBrowser] = {}
+        self._live: set[_PooledBrowser] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._playwright is not None
+
+    async def start(self) -> 'BrowserPool':
+        """
+        Start Playwright, once: callers that come in while it's starting wait for the same startup.
+        """
+        if self._starting is None:
+            self._loop = asyncio.get_running_loop()
+            self._starting = asyncio.ensure_future(self._start())
+        else:
+            self._check_loop()
+
+        starting = self._starting
+        try:
+            await asyncio.shield(starting)
+        except BaseException:
+            # A failed startup is tried again by the next caller (one that was only cancelled leaves it running)
+            if starting.done() and (starting.cancelled() or starting.exception()) and self._starting is starting:
+                self._starting = None
+                self._loop = None
+            raise
+
+        return self
+
+    async def _start(self) -> None:
+        self._lock = asyncio.Lock()
+        self._playwright = await async_playwright().start()
+
+    async def stop(self) -> None:
+        if self._starting is None:
+            return
+
+        self._check_loop()
+        starting, self._starting = self._starting, None
+        try:
+            await starting
+        except Exception:
+            self._loop = None
+            return  # It never started
+
+        for entry in list(self._live):
+            await self._close(entry)
+
+        self._browsers.clear()
+        await self._playwright.stop()
+        self._playwright = None
+        self._loop = None
+
+    async def __aenter__(self) -> 'BrowserPool':
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    @asynccontextmanager
+    async def browser(self, proxy: Proxy | None = None) -> AsyncIterator['Browser']:
+        """
+        Borrow the browser for `proxy` for one page. Each borrow counts towards `max_pages`.
+        """
+        entry = await self._acquire(proxy)
+        try:
+            yield entry.browser
+        finally:
+            await self._release(entry)
+
+    async def _acquire(self, proxy: Proxy | None) -> _PooledBrowser:
+        if not self.running:
+            await self.start()
+        self._check_loop()
+
+        key = proxy.to_httpx_proxy_url() if proxy else None
+
+        async with self._lock:
+            entry = self._browsers.get(key)
+
+            if entry is not None and (self._exhausted(entry) or not entry.browser.is_connected()):
+                await self._retire(entry)
+                entry = None
+
+            if entry is None:
+                with tracing.span('browser.launch', proxy=key):
+                    entry = _PooledBrowser(key, await launch_browser(self._playwright, proxy))
+                self.launches += 1
+                self._browsers[key] = entry
+                self._live.add(entry)
+
+            entry.pages += 1
+            entry.active += 1
+            return entry
+
+    async def _release(self, entry: _PooledBrowser) -> None:
+        entry.active -= 1
+
+        if not entry.retired and self.max_memory_mb and entry.pages % self.memory_check_interval == 0:
+            memory = await browser_memory_mb(entry.browser)
+            if memory is not None and memory > self.max_memory_mb:
+                await self._retire(entry)
+
+        if entry.retired and entry.active == 0:
+            await self._close(entry)
+
+    def _exhausted(self, entry: _PooledBrowser) -> bool:
+        return bool(self.max_pages) and entry.pages >= self.max_pages
+
+    async def _retire(self, entry: _PooledBrowser) -> None:
+        entry.retired = True
+        if self._browsers.get(entry.key) is entry:
+            del self._browsers[entry.key]
+        if entry.active == 0:
+            await self._close(entry)
+
+    async def _close(self, entry: _PooledBrowser) -> None:
+        from playwright.async_api import Error as PlaywrightError
+
+        if entry not in self._live:
+            return
+
+        self._live.discard(entry)
+        try:
+            await entry.browser.close()
+        except PlaywrightError:
+            pass  # The browser already crashed or disconnected
+
+    def _check_loop(self) -> None:
+        if asyncio.get_running_loop() is not self._loop:
+            raise RuntimeError('BrowserPool is bound to the event loop it was started on')
+
+
+def async_playwright():
+    # Playwright takes a while to import, so it's only imported once a pool starts
+    from playwright.async_api import async_playwright
+
+    return async_playwright()
+
+
+async def launch_browser(playwright: 'Playwright', proxy: Proxy | None) -> 'Browser':
+    from playwright.async_api import Error as PlaywrightError
+
+    options = {'headless': True, 'proxy': proxy.to_playwright_proxy() if proxy else None}
+
+    try:
+        return await playwright.chromium.launch(**options)
+    except PlaywrightError:
+        print("Playwright browser not found. Running 'playwright install'...")
+        subprocess.run(['playwright', 'install', 'chromium'], check=True)
+        return await playwright.chromium.launch(**options)
+
+
+async def browser_memory_mb(browser: 'Browser') -> float | None:
+    """
+    Resident memory of the browser and its renderer processes. Only available on Linux (via /proc).
+    """
+    from playwright.async_api import Error as PlaywrightError
+
+    if not hasattr(os, 'sysconf') or not os.path.isdir('/proc'):
+        return None
+
+    try:
+        session = await browser.new_browser_cdp_session()
+        info = await session.send('SystemInfo.getProcessInfo')
+        await session.detach()
+    except PlaywrightError:
+        return None
+
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+
+    for process in info.get('processInfo', []):
+        try:
+            with open(f'/proc/{process["id"]}/statm') as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, ValueError, IndexError, KeyError):
+            continue  # The process exited between the two calls
+
+    return total / 1024**2
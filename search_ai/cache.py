@@ -0,0 +1,402 @@
+import json
+import time
+import zlib
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    memory_hits: int = 0
+    disk_hits: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class SearchCache:
+    """
+    Caches DuckDuckGo results pages, keyed by the form fields sent for them.
+
+    The first tier is an in-memory LRU that evicts the least recently used pages once it holds more than
+    `max_bytes`. If `path` is set, pages are also stored (compressed) in a SQLite database, so they survive
+    restarts and can be shared between processes. Both tiers expire entries after `ttl` seconds.
+    """
+
+    KEY_FIELDS = ('q', 's', 'dc', 'df', 'kl')
+
+    def __init__(self, max_bytes: int = 32 * 1024**2, ttl: float = 900, path: str | None = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = path
+        self.stats = CacheStats()
+
+        self._memory: OrderedDict[str, tuple[str, int, float]] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+        if path:
+            self._db = _connect(
+                path, 'CREATE TABLE IF NOT EXISTS search_cache (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)'
+            )
+
+    @classmethod
+    def key(cls, data: dict) -> str:
+        fields = {field: data[field] for field in cls.KEY_FIELDS if data.get(field) not in (None, '')}
+        fields['q'] = ' '.join(str(fields.get('q', '')).split())
+        return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        value = self._memory_get(key)
+        if value is not None:
+            return value
+
+        entry = self._disk_get(key) if self._db else None
+        return self._disk_result(key, entry)
+
+    def set(self, key: str, value: str) -> None:
+        self._memory_set(key, value, time.time() + self.ttl)
+        if self._db:
+            self._disk_set(key, value, time.time() + self.ttl)
+
+    async def async_get(self, key: str) -> str | None:
+        value = self._memory_get(key)
+        if value is not None:
+            return value
+
+        entry = await asyncio.to_thread(self._disk_get, key) if self._db else None
+        return self._disk_result(key, entry)
+
+    async def async_set(self, key: str, value: str) -> None:
+        self._memory_set(key, value, time.time() + self.ttl)
+        if self._db:
+            await asyncio.to_thread(self._disk_set, key, value, time.time() + self.ttl)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+        if self._db:
+            with self._db_lock:
+                self._db.execute('DELETE FROM search_cache')
+                self._db.commit()
+
+    def purge_expired(self) -> None:
+        now = time.time()
+
+        with self._lock:
+            for key, (value, size, expires_at) in list(self._memory.items()):
+                if expires_at <= now:
+                    self._memory_pop(key)
+
+        if self._db:
+            with self._db_lock:
+                self._db.execute('DELETE FROM search_cache WHERE expires_at <= ?', (now,))
+                self._db.commit()
+
+    def close(self) -> None:
+        if self._db:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
+
+    def _memory_get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+
+            value, size, expires_at = entry
+            if expires_at <= time.time():
+                self._memory_pop(key)
+                return None
+
+            self._memory.move_to_end(key)
+            self.stats.hits += 1
+            self.stats.memory_hits += 1
+            return value
+
+    def _memory_set(self, key: str, value: str, expires_at: float) -> None:
+        size = len(value.encode())
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._memory_pop(key)
+            self._memory[key] = (value, size, expires_at)
+            self._memory_bytes += size
+
+            while self._memory_bytes > self.max_bytes:
+                self._memory_pop(next(iter(self._memory)))
+                self.stats.evictions += 1
+
+    def _memory_pop(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[1]
+
+    def _disk_get(self, key: str) -> tuple[str, float] | None:
+        with self._db_lock:
+            row = self._db.execute(
+                'SELECT value, expires_at FROM search_cache WHERE key = ? AND expires_at > ?', (key, time.time())
+            ).fetchone()
+
+        return (zlib.decompress(row[0]).decode(), row[1]) if row else None
+
+    def _disk_set(self, key: str, value: str, expires_at: float) -> None:
+        compressed = zlib.compress(value.encode())
+
+        with self._db_lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO search_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, compressed, expires_at),
+            )
+            self._db.commit()
+
+    def _disk_result(self, key: str, entry: tuple[str, float] | None) -> str | None:
+        with self._lock:
+            if entry is None:
+                self.stats.misses += 1
+                return None
+
+            self.stats.hits += 1
+            self.stats.disk_hits += 1
+
+        value, expires_at = entry
+        self._memory_set(key, value, expires_at)
+        return value
+
+
+@dataclass
+class PageCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    revalidated: int = 0
+    derived_hits: int = 0
+    evictions: int = 0
+
+
+@dataclass
+class CachedPage:
+    url: str
+    source: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+
+class PageCache:
+    """
+    Caches fetched page sources on disk, keyed by normalized URL, plus the output derived from them.
+
+    Sources are stored compressed and content-addressed, so URLs with the same page share one copy, and so do the
+    markdown and metadata derived from it. A page is fresh for `ttl` seconds. After that, `get_page` revalidates it
+    with a conditional request if it has an ETag or Last-Modified header, and fetches it again otherwise. Once the
+    database holds more than `max_bytes`, the least recently used pages are evicted. The database is SQLite in WAL
+    mode, so one cache file can be shared by several processes.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024**2, ttl: float = 3_600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stats = PageCacheStats()
+
+        self._lock = threading.Lock()
+        self._db = _connect(
+            path,
+            'CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, hash TEXT, etag TEXT, last_modified TEXT, '
+            'fetched_at REAL, accessed_at REAL)',
+            'CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)',
+            'CREATE TABLE IF NOT EXISTS sources (hash TEXT PRIMARY KEY, value BLOB, size INTEGER)',
+            'CREATE TABLE IF NOT EXISTS derived (hash TEXT, name TEXT, value BLOB, size INTEGER, '
+            'PRIMARY KEY (hash, name))',
+        )
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        """
+        Lowercases the scheme and host, and drops the fragment, default ports and the order of query parameters.
+        """
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').lower()
+
+        if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+            host = f'{host}:{parts.port}'
+
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+    @staticmethod
+    def content_hash(source: str) -> str:
+        return hashlib.sha256(source.encode()).hexdigest()
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return time.time() - page.fetched_at < self.ttl
+
+    def get(self, url: str) -> CachedPage | None:
+        url = self.normalize_url(url)
+
+        with self._lock:
+            row = self._db.execute(
+                'SELECT sources.value, pages.etag, pages.last_modified, pages.fetched_at FROM pages '
+                'JOIN sources ON sources.hash = pages.hash WHERE pages.url = ?',
+                (url,),
+            ).fetchone()
+
+            if row is None:
+                self.stats.misses += 1
+                return None
+
+            self._db.execute('UPDATE pages SET accessed_at = ? WHERE url = ?', (time.time(), url))
+            self._db.commit()
+
+            page = CachedPage(url, zlib.decompress(row[0]).decode(), row[1], row[2], row[3])
+            if self.is_fresh(page):
+                self.stats.hits += 1
+            else:
+                self.stats.stale += 1
+
+        return page
+
+    def set(self, url: str, source: str, etag: str | None = None, last_modified: str | None = None) -> None:
+        url = self.normalize_url(url)
+        content_hash = self.content_hash(source)
+        compressed = zlib.compress(source.encode())
+        now = time.time()
+
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR IGNORE INTO sources (hash, value, size) VALUES (?, ?, ?)',
+                (content_hash, compressed, len(compressed)),
+            )
+            self._db.execute(
+                'INSERT OR REPLACE INTO pages (url, hash, etag, last_modified, fetched_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (url, content_hash, etag, last_modified, now, now),
+            )
+            self._evict()
+
+    def revalidated(self, url: str) -> None:
+        """
+        Marks a cached page as fresh again, after the server said it hasn't changed.
+        """
+        now = time.time()
+
+        with self._lock, self._db:
+            self._db.execute(
+                'UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?', (now, now, self.normalize_url(url))
+            )
+            self.stats.revalidated += 1
+
+    def derived(self, source: str, name: str, compute: Callable[[], Any]) -> Any:
+        """
+        The output `name` derived from `source`, from the cache if it was computed before and otherwise from `compute`.
+        The output has to be JSON serializable.
+        """
+        found, value = self.get_derived(source, name)
+        if found:
+            return value
+
+        value = compute()
+        self.set_derived(source, name, value)
+        return value
+
+    def get_derived(self, source: str, name: str) -> tuple[bool, Any]:
+        """
+        `(True, output)` if the output `name` derived from `source` is cached, and `(False, None)` if it isn't.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value FROM derived WHERE hash = ? AND name = ?', (self.content_hash(source), name)
+            ).fetchone()
+
+        if row is None:
+            return False, None
+
+        self.stats.derived_hits += 1
+        return True, json.loads(zlib.decompress(row[0]))
+
+    def set_derived(self, source: str, name: str, value: Any) -> None:
+        compressed = zlib.compress(json.dumps(value).encode())
+
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO derived (hash, name, value, size) VALUES (?, ?, ?, ?)',
+                (self.content_hash(source), name, compressed, len(compressed)),
+            )
+            self._evict()
+
+    async def async_get(self, url: str) -> CachedPage | None:
+        return await asyncio.to_thread(self.get, url)
+
+    async def async_set(self, url: str, source: str, etag: str | None = None, last_modified: str | None = None) -> None:
+        await asyncio.to_thread(self.set, url, source, etag, last_modified)
+
+    async def async_revalidated(self, url: str) -> None:
+        await asyncio.to_thread(self.revalidated, url)
+
+    def size(self) -> int:
+        with self._lock:
+            return self._size()
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            for table in ('pages', 'sources', 'derived'):
+                self._db.execute(f'DELETE FROM {table}')
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _size(self) -> int:
+        return self._db.execute(
+            'SELECT (SELECT COALESCE(SUM(size), 0) FROM sources) + (SELECT COALESCE(SUM(size), 0) FROM derived)'
+        ).fetchone()[0]
+
+    def _evict(self) -> None:
+        """
+        Deletes the least recently used pages (and whatever only they used) until the cache fits in `max_bytes`.
+        Runs inside the caller's transaction.
+        """
+        while self._size() > self.max_bytes:
+            deleted = self._db.execute(
+                'DELETE FROM pages WHERE url = (SELECT url FROM pages ORDER BY accessed_at LIMIT 1)'
+            ).rowcount
+
+            self._db.execute('DELETE FROM sources WHERE hash NOT IN (SELECT hash FROM pages)')
+            self._db.execute('DELETE FROM derived WHERE hash NOT IN (SELECT hash FROM pages)')
+
+            if not deleted:
+                break
+            self.stats.evictions += 1
+
+
+def _connect(path: str, *schema: str) -> sqlite3.Connection:
+    """
+    Opens a SQLite database that several threads and processes can use at the same time.
+    """
+    db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    db.execute('PRAGMA journal_mode=WAL')
+    for statement in schema:
+        db.execute(statement)
+    db.commit()
+    return db
@@ -0,0 +1,779 @@
+import re
+import string
+
+from lxml import etree
+
+from .utils import extract_metadata, generate_markdown, valid_description_metadata
+
+
+# Elements without an end tag, which html.parser (and so html2text) only sees a start tag for
+VOID_TAGS = frozenset(
+    {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'}
+)
+
+# Tags that don't turn a pending link into [text](href) form when they open inside of it
+LINK_TEXT_NEUTRAL_TAGS = frozenset({'p', 'div', 'style', 'dl', 'dt'})
+
+# html2text writes &nbsp; as a placeholder, so it isn't collapsed with the whitespace around it
+NBSP_PLACEHOLDER = '&nbsp_place_holder;'
+
+ABSOLUTE_URL = re.compile(r'^[a-zA-Z+]+://')
+STRESS_SEPARATED = re.compile(r'[^][(){}\s.!?]')
+MD_CHARS = re.compile(r'([\\\[\]\(\)])')
+
+# The same escapes as html2text's escape_md_section, plus one pattern to skip them when none apply
+MD_BACKSLASH = re.compile(r'(\\)(?=[\\`*_{}\[\]()#+\-.!])')
+MD_DOT = re.compile(r'^(\s*\d+)(\.)(?=\s)', re.MULTILINE)
+MD_PLUS = re.compile(r'^(\s*)(\+)(?=\s)', re.MULTILINE)
+MD_DASH = re.compile(r'^(\s*)(-)(?=\s|\-)', re.MULTILINE)
+MD_ESCAPE_NEEDED = re.compile(r'\\|^\s*(?:\d+\.\s|\+\s|-[\s\-])', re.MULTILINE)
+
+HEADINGS = {f'h{n}': n for n in range(1, 10)}
+
+# The ends of these are where a conversion with a budget would rather stop
+BLOCK_TAGS = frozenset(
+    {'p', 'div', 'li', 'dd', 'dt', 'ul', 'ol', 'dl', 'blockquote', 'pre', 'table', 'tr', 'section', 'article'}
+    | HEADINGS.keys()
+)
+
+# How many characters past its budget a conversion can go while it waits for a block to end
+TAIL_MARGIN = 200
+
+# Pages are parsed this many characters at a time, so a conversion with a budget doesn't parse what it won't write
+CHUNK_SIZE = 32 * 1024
+
+# libxml2 drops everything after the first </html>, while html.parser reads on to the end of the page
+HTML_END = re.compile(r'</html\s*>', re.IGNORECASE)
+
+# html.parser ends a piece of text at each entity, so the whitespace between an entity and a tag is a piece of its
+# own, which html2text doesn't write when a block ends after it. A noncharacter marks where those pieces start.
+ENTITY_SPACE = re.compile(r'(&(?:#[0-9]+|#[xX][0-9a-fA-F]+|[a-zA-Z][-.a-zA-Z0-9]*)?;?)(?=\s+(?:<|\Z))')
+PIECE_BREAK = '\ufdd0'
+
+# The start tags libxml2 adds to a tree when a page leaves them out
+IMPLIED_TAGS = frozenset({'html', 'head', 'body', 'p'})
+
+
+def convert_page(
+    page_source: str, ignore_links: bool = False, ignore_images: bool = True, max_length: int | None = None
+) -> tuple[str, dict]:
+    """
+    The markdown and metadata of a page, from a single lxml parse.
+
+    The markdown is written by `MarkdownWriter`, which gives the same output as `generate_markdown` without
+    html2text's pure-Python tokenizer, but for the differences listed there. The metadata is the same as
+    `extract_metadata`'s.
+
+    With `max_length`, parsing and writing stop at the end of the first block past that many characters (or
+    `TAIL_MARGIN` characters later), so the markdown starts with the same `max_length` characters as a full
+    conversion of the page, but the work depends on `max_length` instead of the size of the page.
+    """
+    writer = MarkdownWriter(ignore_links, ignore_images, max_length)
+    tags = SourceTags(page_source)
+    parser = etree.HTMLPullParser(events=('start', 'end', 'comment', 'pi'))
+
+    try:
+        done = False
+        for chunk in _chunks(page_source):
+            parser.feed(chunk)
+            if done := write_events(parser.read_events(), writer, tags):
+                break
+
+        root = parser.close()
+        if not done:
+            write_events(parser.read_events(), writer, tags)
+    except etree.LxmlError:
+        root = None
+
+    if root is None:
+        return generate_markdown(page_source, ignore_links, ignore_images), extract_metadata(page_source)
+
+    return writer.finish().strip(), _metadata(root)
+
+
+def write_events(events, writer: 'MarkdownWriter', tags: 'SourceTags') -> bool:
+    """
+    Write a pull parser's events, and return True once the writer has written as much as it needs.
+
+    The parser can report an element before it has read the text inside or after it, so the text before each
+    event is written when the event arrives, when it's known to be complete. Tags that lxml added to the tree, but
+    that aren't in the page, aren't written, as html.parser never sees them.
+    """
+    for event, element in events:
+        if event == 'end':
+            text = element[-1].tail if len(element) else element.text
+        elif (parent := element.getparent()) is not None:
+            previous = element.getprevious()
+            text = previous.tail if previous is not None else parent.text
+        else:
+            text = None  # Nothing outside of the root element is written
+
+        if text:
+            writer.handle_data(text)
+
+        if event == 'start':
+            if tags.opened(element.tag):
+                writer.handle_tag(element.tag, element.attrib, True)
+        elif event == 'end':
+            tag = element.tag
+            if tag not in VOID_TAGS and tags.closed(tag):
+                writer.handle_tag(tag, {}, False)
+            if writer.max_length is not None and writer.full(tag in BLOCK_TAGS):
+                return True
+
+    return False
+
+
+class MarkdownWriter:
+    """
+    html2text's markdown writer, with the options `generate_markdown` uses (no wrapping, inline links) built in.
+
+    It keeps html2text's state and rules, but dispatches on the tag instead of testing every rule for every tag,
+    and skips the markdown escapes when the text can't need them.
+
+    It's written from lxml's tree instead of html.parser's tags, which gives a different output for:
+
+    - Entities, which are decoded already, so `&eacute;` stays `é` instead of becoming html2text's ASCII `e`.
+      Entities without their semicolon are left as they are, where html2text decodes some of them.
+    - Tags that a page closes in some places but leaves open in others. lxml closes all of them, and as the
+      page has end tags for them, those end tags are all written (see `SourceTags`).
+    - End tags that don't match an open element, which lxml drops, or that close elements out of order, which
+      lxml closes in order.
+    """
+
+    def __init__(self, ignore_links: bool = False, ignore_images: bool = True, max_length: int | None = None):
+        self.ignore_links = ignore_links
+        self.ignore_images = ignore_images
+        self.max_length = max_length
+
+        self.outtextlist: list[str] = []
+        self.length = 0  # Characters in outtextlist
+        self.settled = (0, 0)  # (length, how many of the final characters can't change anymore)
+        self.quiet = 0
+        self.p_p = 0  # Number of newlines to write before the next output
+        self.start = True
+        self.space = False
+        self.astack: list = []
+        self.maybe_automatic_link: str | None = None
+        self.empty_link = False
+        self.list: list[list] = []  # [name, num] pairs
+        self.blockquote = 0
+        self.pre = False
+        self.startpre = False
+        self.pre_indent = ''
+        self.list_code_indent = ''
+        self.code = False
+        self.quote = False
+        self.br_toggle = ''
+        self.last_was_nl = False
+        self.last_was_list = False
+        self.split_next_td = False
+        self.td_count = 0
+        self.table_start = False
+        self.inheader = False
+        self.abbr_title: str | None = None
+        self.abbr_data: str | None = None
+        self.abbr_list: dict[str, str] = {}
+        self.stressed = False
+        self.preceding_stressed = False
+        self.preceding_data = ''
+        self.current_tag = ''
+
+    def finish(self) -> str:
+        self.pbr()
+        self.o('', force='end')
+        return ''.join(self.outtextlist).replace(NBSP_PLACEHOLDER, ' ')
+
+    def handle_tag(self, tag: str, attrs, start: bool) -> None:
+        self.current_tag = tag
+
+        # The first thing inside a link is a tag that writes something, so it can't be an automatic <link>
+        if (
+            start
+            and self.maybe_automatic_link is not None
+            and tag not in LINK_TEXT_NEUTRAL_TAGS
+            and (tag != 'img' or self.ignore_images)
+        ):
+            self.o('[')
+            self.maybe_automatic_link = None
+            self.empty_link = False
+
+        handler = TAG_HANDLERS.get(tag)
+        if handler is not None and handler(self, tag, attrs, start):
+            return
+
+        self.last_was_list = False
+
+    def handle_data(self, data: str) -> None:
+        if PIECE_BREAK in data:
+            for piece in data.split(PIECE_BREAK):
+                if piece:
+                    self.handle_data(piece)
+            return
+
+        if self.quiet and self.abbr_data is None:
+            self._quiet_data(data)
+            return
+
+        if '\xa0' in data:
+            data = data.replace('\xa0', NBSP_PLACEHOLDER)
+
+        if self.stressed:
+            data = data.strip()
+            self.stressed = False
+            self.preceding_stressed = True
+        elif self.preceding_stressed:
+            if (
+                STRESS_SEPARATED.match(data[0])
+                and self.current_tag not in HEADINGS
+                and self.current_tag not in ('a', 'code', 'pre')
+            ):
+                data = ' ' + data
+            self.preceding_stressed = False
+
+        if self.maybe_automatic_link is not None:
+            href = self.maybe_automatic_link
+            if href == data and ABSOLUTE_URL.match(href):
+                self.o('<' + data + '>')
+                self.empty_link = False
+                return
+
+            self.o('[')
+            self.maybe_automatic_link = None
+            self.empty_link = False
+
+        if not self.code and not self.pre and MD_ESCAPE_NEEDED.search(data):
+            data = MD_BACKSLASH.sub(r'\\\1', data)
+            data = MD_DOT.sub(r'\1\\\2', data)
+            data = MD_PLUS.sub(r'\1\\\2', data)
+            data = MD_DASH.sub(r'\1\\\2', data)
+
+        self.preceding_data = data
+        self.o(data, puredata=True)
+
+    def _quiet_data(self, data: str) -> None:
+        """
+        Text that isn't written out (like scripts) still updates the state, but doesn't need escaping.
+        """
+        if self.stressed:
+            data = data.strip()
+            self.stressed = False
+            self.preceding_stressed = True
+        elif self.preceding_stressed:
+            if (
+                STRESS_SEPARATED.match(data[0])
+                and self.current_tag not in HEADINGS
+                and self.current_tag not in ('a', 'code', 'pre')
+            ):
+                data = ' ' + data
+            self.preceding_stressed = False
+
+        if self.maybe_automatic_link is not None:
+            if self.maybe_automatic_link == data and ABSOLUTE_URL.match(data):
+                self.empty_link = False
+                return
+
+            self.maybe_automatic_link = None
+            self.empty_link = False
+
+        self.preceding_data = data
+
+    def pbr(self) -> None:
+        if self.p_p == 0:
+            self.p_p = 1
+
+    def p(self) -> None:
+        self.p_p = 2
+
+    def soft_br(self) -> None:
+        self.pbr()
+        self.br_toggle = '  '
+
+    def full(self, block_end: bool) -> bool:
+        """
+        Whether the markdown has `max_length` final characters, at the end of a block, or `TAIL_MARGIN` more anywhere.
+        """
+        needed = self.max_length if block_end else self.max_length + TAIL_MARGIN
+        if self.length < needed:
+            return False
+
+        # The last output can still change (a heading takes a link's '[' back), and the markdown gets stripped
+        length, settled = self.settled
+        if length != self.length:
+            settled = len(''.join(self.outtextlist[:-1]).replace(NBSP_PLACEHOLDER, ' ').strip())
+            self.settled = (self.length, settled)
+
+        return settled >= needed
+
+    def out(self, s: str) -> None:
+        self.outtextlist.append(s)
+        if s:
+            self.length += len(s)
+            self.last_was_nl = s[-1] == '\n'
+
+    def o(self, data: str, puredata: bool = False, force: bool | str = False) -> None:
+        if self.abbr_data is not None:
+            self.abbr_data += data
+
+        if self.quiet:
+            return
+
+        if puredata and not self.pre:
+            data = _collapse_whitespace(data)
+            if data and data[0] == ' ':
+                self.space = True
+                data = data[1:]
+        if not data and not force:
+            return
+
+        if self.startpre:
+            if not data.startswith('\n') and not data.startswith('\r\n'):
+                data = '\n' + data
+
+        bq = '>' * self.blockquote
+        if not (force and data and data[0] == '>') and self.blockquote:
+            bq += ' '
+
+        if self.pre:
+            if self.list:
+                bq += self.list_code_indent
+            bq += '    '
+            data = data.replace('\n', '\n' + bq)
+            self.pre_indent = bq
+
+        if self.startpre:
+            self.startpre = False
+            if self.list:
+                data = data.lstrip('\n' + self.pre_indent)
+
+        if self.start:
+            self.space = False
+            self.p_p = 0
+            self.start = False
+
+        if force == 'end':
+            self.p_p = 0
+            self.out('\n')
+            self.space = False
+
+        if self.p_p:
+            self.out((self.br_toggle + '\n' + bq) * self.p_p)
+            self.space = False
+            self.br_toggle = ''
+
+        if self.space:
+            if not self.last_was_nl:
+                self.out(' ')
+            self.space = False
+
+        if self.abbr_list and force == 'end':
+            for abbr, definition in self.abbr_list.items():
+                self.out('  *[' + abbr + ']: ' + definition + '\n')
+
+        self.p_p = 0
+        self.out(data)
+
+    # Tag handlers. They return True when html2text returns early, before resetting `last_was_list`.
+
+    def _heading(self, tag: str, attrs, start: bool) -> bool:
+        if self.astack:
+            if start:
+                self.inheader = True
+                # Inside a link's text, the '#'s can only go before the '['
+                if self.outtextlist and self.outtextlist[-1] == '[':
+                    self.outtextlist.pop()
+                    self.space = False
+                    self.o(HEADINGS[tag] * '#' + ' ')
+                    self.o('[')
+                return False
+
+            self.p_p = 0  # Don't break up the link's text
+            self.inheader = False
+            return True
+
+        self.p()
+        if start:
+            self.inheader = True
+            self.o(HEADINGS[tag] * '#' + ' ')
+            return False
+
+        self.inheader = False
+        return True
+
+    def _paragraph(self, tag: str, attrs, start: bool) -> bool:
+        if not self.astack and not self.split_next_td:
+            self.p()
+        return False
+
+    def _br(self, tag: str, attrs, start: bool) -> bool:
+        if start:
+            self.o('  \n> ' if self.blockquote > 0 else '  \n')
+        return False
+
+    def _hr(self, tag: str, attrs, start: bool) -> bool:
+        if start:
+            self.p()
+            self.o('* * *')
+            self.p()
+        return False
+
+    def _quiet(self, tag: str, attrs, start: bool) -> bool:
+        self.quiet += 1 if start else -1
+        return False
+
+    def _body(self, tag: str, attrs, start: bool) -> bool:
+        self.quiet = 0  # Some sites never close <head>
+        return False
+
+    def _blockquote(self, tag: str, attrs, start: bool) -> bool:
+        if start:
+            self.p()
+            self.o('> ', force=True)
+            self.start = True
+            self.blockquote += 1
+        else:
+            self.blockquote -= 1
+            self.p()
+        return False
+
+    def _emphasis(self, tag: str, attrs, start: bool) -> bool:
+        # Separate the mark from a preceding word, or markdown won't render it
+        if (
+            start
+            and self.preceding_data
+            and self.preceding_data[-1] not in string.whitespace
+            and self.preceding_data[-1] not in string.punctuation
+        ):
+            emphasis = ' _'
+            self.preceding_data += ' '
+        else:
+            emphasis = '_'
+
+        self.o(emphasis)
+        if start:
+            self.stressed = True
+        return False
+
+    def _strong(self, tag: str, attrs, start: bool) -> bool:
+        if start and self.preceding_data and self.preceding_data[-1] == '*':
+            strong = ' **'
+            self.preceding_data += ' '
+        else:
+            strong = '**'
+
+        self.o(strong)
+        if start:
+            self.stressed = True
+        return False
+
+    def _strikethrough(self, tag: str, attrs, start: bool) -> bool:
+        if start and self.preceding_data and self.preceding_data[-1] == '~':
+            strike = ' ~~'
+            self.preceding_data += ' '
+        else:
+            strike = '~~'
+
+        self.o(strike)
+        if start:
+            self.stressed = True
+        return False
+
+    def _code(self, tag: str, attrs, start: bool) -> bool:
+        if not self.pre:
+            self.o('`')
+            self.code = not self.code
+        return False
+
+    def _abbr(self, tag: str, attrs, start: bool) -> bool:
+        if start:
+            self.abbr_title = attrs.get('title')
+            self.abbr_data = ''
+        else:
+            if self.abbr_title is not None:
+                self.abbr_list[self.abbr_data] = self.abbr_title
+                self.abbr_title = None
+            self.abbr_data = None
+        return False
+
+    def _quote(self, tag: str, attrs, start: bool) -> bool:
+        self.o('"')
+        self.quote = not self.quote
+        return False
+
+    def _link(self, tag: str, attrs, start: bool) -> bool:
+        if self.ignore_links:
+            return False
+
+        if start:
+            href = attrs.get('href')
+            if href is not None and not href.startswith('#'):
+                self.astack.append(attrs)
+                self.maybe_automatic_link = href
+                self.empty_link = True
+            else:
+                self.astack.append(None)
+
+        elif self.astack:
+            a = self.astack.pop()
+            if self.maybe_automatic_link and not self.empty_link:
+                self.maybe_automatic_link = None
+            elif a is not None:
+                if self.empty_link:
+                    self.o('[')
+                    self.empty_link = False
+                    self.maybe_automatic_link = None
+
+                self.p_p = 0
+                title = _escape_md(a.get('title') or '')
+                title = f' "{title}"' if title.strip() else ''
+                self.o(f']({_escape_md(a.get("href"))}{title})')
+
+        return False
+
+    def _image(self, tag: str, attrs, start: bool) -> bool:
+        if not start or self.ignore_images:
+            return False
+
+        src = attrs.get('src')
+        if src is None:
+            return False
+
+        if self.maybe_automatic_link is not None:
+            self.o('[')
+            self.maybe_automatic_link = None
+            self.empty_link = False
+
+        self.o('![' + _escape_md(attrs.get('alt') or '') + ']')
+        self.o('(' + _escape_md(src) + ')')
+        return False
+
+    def _definition_list(self, tag: str, attrs, start: bool) -> bool:
+        if tag == 'dl' and start:
+            self.p()
+        elif tag == 'dt' and not start:
+            self.pbr()
+        elif tag == 'dd':
+            if start:
+                self.o('    ')
+            else:
+                self.pbr()
+        return False
+
+    def _list(self, tag: str, attrs, start: bool) -> bool:
+        if not self.list and not self.last_was_list:
+            self.p()
+
+        if start:
+            self.list.append([tag, _list_numbering_start(attrs)])
+        elif self.list:
+            self.list.pop()
+            if not self.list:
+                self.o('\n')
+
+        self.last_was_list = True
+        return True
+
+    def _list_item(self, tag: str, attrs, start: bool) -> bool:
+        self.list_code_indent = ''
+        self.pbr()
+
+        if start:
+            li = self.list[-1] if self.list else ['ul', 0]
+
+            # Two spaces per list, but three for an unordered list inside an ordered one
+            parent_list = None
+            for name, num in self.list:
+                self.list_code_indent += '   ' if parent_list == 'ol' else '  '
+                parent_list = name
+            self.o(self.list_code_indent)
+
+            if li[0] == 'ul':
+                self.list_code_indent += '  '
+                self.o('* ')
+            elif li[0] == 'ol':
+                li[1] += 1
+                self.list_code_indent += '   '
+                self.o(str(li[1]) + '. ')
+            self.start = True
+
+        return False
+
+    def _table(self, tag: str, attrs, start: bool) -> bool:
+        if tag == 'table':
+            if start:
+                self.table_start = True
+        elif tag == 'tr':
+            if start:
+                self.td_count = 0
+            else:
+                self.split_next_td = False
+                self.soft_br()
+                if self.table_start:
+                    # Underline the table header
+                    self.o('|'.join(['---'] * self.td_count))
+                    self.soft_br()
+                    self.table_start = False
+        elif start:  # td and th
+            if self.split_next_td:
+                self.o('| ')
+            self.split_next_td = True
+            self.td_count += 1
+        return False
+
+    def _pre(self, tag: str, attrs, start: bool) -> bool:
+        if start:
+            self.startpre = True
+            self.pre = True
+            self.pre_indent = ''
+        else:
+            self.pre = False
+        self.p()
+        return False
+
+
+TAG_HANDLERS = {
+    **{heading: MarkdownWriter._heading for heading in HEADINGS},
+    'p': MarkdownWriter._paragraph,
+    'div': MarkdownWriter._paragraph,
+    'br': MarkdownWriter._br,
+    'hr': MarkdownWriter._hr,
+    'head': MarkdownWriter._quiet,
+    'style': MarkdownWriter._quiet,
+    'script': MarkdownWriter._quiet,
+    'body': MarkdownWriter._body,
+    'blockquote': MarkdownWriter._blockquote,
+    'em': MarkdownWriter._emphasis,
+    'i': MarkdownWriter._emphasis,
+    'u': MarkdownWriter._emphasis,
+    'strong': MarkdownWriter._strong,
+    'b': MarkdownWriter._strong,
+    'del': MarkdownWriter._strikethrough,
+    'strike': MarkdownWriter._strikethrough,
+    's': MarkdownWriter._strikethrough,
+    'kbd': MarkdownWriter._code,
+    'code': MarkdownWriter._code,
+    'tt': MarkdownWriter._code,
+    'abbr': MarkdownWriter._abbr,
+    'q': MarkdownWriter._quote,
+    'a': MarkdownWriter._link,
+    'img': MarkdownWriter._image,
+    'dl': MarkdownWriter._definition_list,
+    'dt': MarkdownWriter._definition_list,
+    'dd': MarkdownWriter._definition_list,
+    'ol': MarkdownWriter._list,
+    'ul': MarkdownWriter._list,
+    'li': MarkdownWriter._list_item,
+    'table': MarkdownWriter._table,
+    'tr': MarkdownWriter._table,
+    'td': MarkdownWriter._table,
+    'th': MarkdownWriter._table,
+    'pre': MarkdownWriter._pre,
+}
+
+
+class SourceTags:
+    """
+    Which of the tags in lxml's tree a page has. lxml closes every element and adds the html, head, body and p
+    elements a page leaves out, while html.parser (and so html2text) only sees the tags in the page. A tag the page
+    never writes is left out, so an unclosed <b> stays open, and text before any <head> isn't quiet.
+
+    Pages are searched once for each tag, the first time it's needed.
+    """
+
+    def __init__(self, page_source: str):
+        self.page_source = page_source
+        self._opened: dict[str, bool] = {}
+        self._closed: dict[str, bool] = {}
+
+    def opened(self, tag: str) -> bool:
+        if tag not in IMPLIED_TAGS:
+            return True
+
+        if (opened := self._opened.get(tag)) is None:
+            opened = self._opened[tag] = self._search('<' + tag)
+        return opened
+
+    def closed(self, tag: str) -> bool:
+        if (closed := self._closed.get(tag)) is None:
+            closed = self._closed[tag] = self._search('</' + tag)
+        return closed
+
+    def _search(self, prefix: str) -> bool:
+        return re.search(re.escape(prefix) + r'[\s/>]', self.page_source, re.IGNORECASE) is not None
+
+
+def _chunks(page_source: str):
+    """
+    The page in `CHUNK_SIZE` pieces without its </html> tags, so lxml reads the whole page, like html.parser does,
+    and with a `PIECE_BREAK` after each entity that only whitespace separates from the next tag.
+    """
+    offset = 0
+    while offset < len(page_source):
+        end = offset + CHUNK_SIZE
+        # Chunks end before a tag, so neither an </html> nor the whitespace before a tag is split between two
+        if end < len(page_source) and (cut := page_source.rfind('<', offset + 1, end)) != -1:
+            end = cut
+
+        chunk = HTML_END.sub('', page_source[offset:end])
+        if '&' in chunk:
+            chunk = ENTITY_SPACE.sub(r'\1' + PIECE_BREAK, chunk)
+
+        yield chunk
+        offset = end
+
+
+def _collapse_whitespace(data: str) -> str:
+    """
+    `re.sub(r'\\s+', ' ', data)`, but quicker.
+    """
+    if not data:
+        return data
+
+    words = data.split()
+    collapsed = ' '.join(words)
+
+    if data[0].isspace():
+        collapsed = ' ' + collapsed
+    if words and data[-1].isspace():
+        collapsed += ' '
+    return collapsed
+
+
+def _escape_md(text: str) -> str:
+    return MD_CHARS.sub(r'\\\1', text)
+
+
+def _list_numbering_start(attrs) -> int:
+    try:
+        return int(attrs['start']) - 1
+    except (KeyError, ValueError):
+        return 0
+
+
+def _metadata(tree: etree._Element) -> dict:
+    page_title = tree.xpath('//head/title/text()')
+    page_description = tree.xpath('//head/meta[@name="description"]/@content')
+    author = tree.xpath('//head/meta[@name="author"]/@content')
+    twitter_handle = tree.xpath('//head/meta[@name="twitter:site"]/@content')
+
+    result = {}
+
+    if page_title:
+        result['title'] = page_title[0].replace(PIECE_BREAK, '')
+    if page_description and _valid_description(page_description[0]):
+        result['description'] = page_description[0]
+    if author:
+        result['author'] = author[0]
+    if twitter_handle:
+        result['twitter'] = twitter_handle[0]
+
+    return result
+
+
+def _valid_description(desc: str) -> bool:
+    # Only text that looks like markup can parse as XML, so plain descriptions don't need another parse
+    stripped = desc.strip()
+    if not (stripped.startswith('<') and stripped.endswith('>')):
+        return True
+
+    return valid_description_metadata(desc)
@@ -1,11 +1,28 @@
+import time
 import asyncio
-import subprocess
-from typing import overload
+from collections import OrderedDict
+from functools import partial
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, Literal, overload
+from urllib.parse import urlsplit
 
-from .proxy import Proxy
-from .utils import valid_type
+import curl_cffi as curl
+from curl_cffi.requests.exceptions import RequestException
 
-from playwright.async_api import async_playwright, Browser as AsyncBrowser, Error as PlaywrightError
+from .proxy import Proxy, ProxyPool, use_proxy
+from .utils import sufficient_content, valid_type
+from .browser import BrowserPool
+from .readiness import PageReadiness
+from .blocking import ResourceBlocker
+from .cache import CachedPage, PageCache
+from . import replay, runner, tracing
+
+if TYPE_CHECKING:
+    from playwright.async_api import Browser
+
+FetchMode = Literal['browser', 'tiered']
+Tier = Literal['http', 'browser']
 
 
 PLAYWRIGHT_CONFIG = {
@@ -14,69 +31,376 @@ PLAYWRIGHT_CONFIG = {
     'locale': 'en-US',
 }
 
+HTTP_TIMEOUT = 6
+
+
+class PageLoadError(Exception):
+    pass
+
+
+class TierMemory:
+    """
+    Remembers which tier worked for each domain, so repeat domains skip the attempt that is bound to fail.
+    Entries expire after `ttl` seconds so domains get re-probed from time to time.
+    """
+
+    def __init__(self, max_domains: int = 10_000, ttl: float = 3_600):
+        self.max_domains = max_domains
+        self.ttl = ttl
+        self._tiers: OrderedDict[str, tuple[Tier, float]] = OrderedDict()
+
+    def get(self, domain: str) -> Tier | None:
+        entry = self._tiers.get(domain)
+        if entry is None:
+            return None
+
+        tier, recorded_at = entry
+        if time.monotonic() - recorded_at > self.ttl:
+            self._tiers.pop(domain, None)
+            return None
+
+        self._tiers.move_to_end(domain)
+        return tier
+
+    def record(self, domain: str, tier: Tier) -> None:
+        self._tiers[domain] = (tier, time.monotonic())
+        self._tiers.move_to_end(domain)
+
+        while len(self._tiers) > self.max_domains:
+            self._tiers.popitem(last=False)
+
+    def clear(self) -> None:
+        self._tiers.clear()
+
+
+tier_memory = TierMemory()
+default_readiness = PageReadiness()
+default_blocker = ResourceBlocker()
+default_page_cache: PageCache | None = None
+
+
+@dataclass
+class _Fetch:
+    """
+    Everything the pages of one `get_page` call share.
+    """
+
+    proxy: Proxy | ProxyPool | None
+    browser_pool: BrowserPool
+    fetch_mode: FetchMode
+    readiness: PageReadiness
+    blocker: ResourceBlocker
+    page_cache: PageCache | None = None
+    semaphore: asyncio.Semaphore = field(default_factory=lambda: asyncio.Semaphore(8))
+    session: curl.AsyncSession | None = None
+    validators: dict[str, tuple[str | None, str | None]] = field(default_factory=dict)
+
 
 @overload
-def get_page_sync(url: str, proxy: Proxy | None) -> str: ...
+def get_page_sync(
+    url: str,
+    proxy: Proxy | ProxyPool | None,
+    browser_pool: BrowserPool | None = None,
+    fetch_mode: FetchMode = 'browser',
+    readiness: PageReadiness | None = None,
+    blocker: ResourceBlocker | None = None,
+    page_cache: PageCache | None = None,
+) -> str: ...
 @overload
-def get_page_sync(url: list[str], proxy: Proxy | None) -> list[str]: ...
+def get_page_sync(
+    url: list[str],
+    proxy: Proxy | ProxyPool | None,
+    browser_pool: BrowserPool | None = None,
+    fetch_mode: FetchMode = 'browser',
+    readiness: PageReadiness | None = None,
+    blocker: ResourceBlocker | None = None,
+    page_cache: PageCache | None = None,
+) -> list[str]: ...
 @overload
-async def get_page(url: str, proxy: Proxy | None) -> str: ...
+async def get_page(
+    url: str,
+    proxy: Proxy | ProxyPool | None,
+    browser_pool: BrowserPool | None = None,
+    fetch_mode: FetchMode = 'browser',
+    readiness: PageReadiness | None = None,
+    blocker: ResourceBlocker | None = None,
+    page_cache: PageCache | None = None,
+) -> str: ...
 @overload
-async def get_page(url: list[str], proxy: Proxy | None) -> list[str]: ...
+async def get_page(
+    url: list[str],
+    proxy: Proxy | ProxyPool | None,
+    browser_pool: BrowserPool | None = None,
+    fetch_mode: FetchMode = 'browser',
+    readiness: PageReadiness | None = None,
+    blocker: ResourceBlocker | None = None,
+    page_cache: PageCache | None = None,
+) -> list[str]: ...
+
+
+def get_page_sync(
+    url: str | list[str],
+    proxy: Proxy | ProxyPool | None,
+    browser_pool: BrowserPool | None = None,
+    fetch_mode: FetchMode = 'browser',
+    readiness: PageReadiness | None = None,
+    blocker: ResourceBlocker | None = None,
+    page_cache: PageCache | None = None,
+) -> str | list[str]:
+    """
+    `get_page` for sync code, run on `runner.default_runner`'s event loop. Without a `browser_pool`, pages are
+    rendered by the runner's, so browsers are launched once and shared by every sync call and thread.
+    """
+    default_runner = runner.default_runner
+    browser_pool = browser_pool or default_runner.browser_pool
+    return default_runner.run(get_page(url, proxy, browser_pool, fetch_mode, readiness, blocker, page_cache))
+
+
+async def get_page(
+    url: str | list[str],
+    proxy: Proxy | ProxyPool | None,
+    browser_pool: BrowserPool | None = None,
+    fetch_mode: FetchMode = 'browser',
+    readiness: PageReadiness | None = None,
+    blocker: ResourceBlocker | None = None,
+    page_cache: PageCache | None = None,
+) -> str | list[str]:
+    """
+    With `fetch_mode='tiered'`, pages are first fetched with plain HTTP and only rendered in a browser
+    when the response doesn't have enough content. Rendered pages are read as soon as `readiness`
+    (by default `default_readiness`) decides that they are done loading. While rendering, `blocker`
+    (by default `default_blocker`) aborts requests for images, fonts, media, stylesheets and trackers.
+    With a `page_cache` (by default `default_page_cache`), fresh pages are read from the cache and stale
+    ones are revalidated with a conditional request before being fetched again.
+    """
+    async with _fetching(proxy, browser_pool, fetch_mode, readiness, blocker, page_cache) as fetch:
+        url_list = url if isinstance(url, list) else [url]
+        results = await asyncio.gather(*[_get_page_recorded(url, fetch) for url in url_list])
+
+    return results[0] if isinstance(url, str) else results
+
+
+async def get_page_stream(
+    urls: list[str],
+    proxy: Proxy | ProxyPool | None,
+    browser_pool: BrowserPool | None = None,
+    fetch_mode: FetchMode = 'browser',
+    readiness: PageReadiness | None = None,
+    blocker: ResourceBlocker | None = None,
+    page_cache: PageCache | None = None,
+) -> AsyncIterator[tuple[int, str]]:
+    """
+    Like `get_page`, but yields `(index, page_source)` pairs as soon as each page is done, so one slow page
+    doesn't hold up the rest. Pages still being fetched are cancelled when the iterator is closed.
+    """
+    async with _fetching(proxy, browser_pool, fetch_mode, readiness, blocker, page_cache) as fetch:
+
+        async def indexed(index: int, url: str) -> tuple[int, str]:
+            return index, await _get_page_recorded(url, fetch)
 
+        tasks = [asyncio.create_task(indexed(index, url)) for index, url in enumerate(urls)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def get_page_stream_sync(
+    urls: list[str],
+    proxy: Proxy | ProxyPool | None,
+    browser_pool: BrowserPool | None = None,
+    fetch_mode: FetchMode = 'browser',
+    readiness: PageReadiness | None = None,
+    blocker: ResourceBlocker | None = None,
+    page_cache: PageCache | None = None,
+) -> Iterator[tuple[int, str]]:
+    """
+    `get_page_stream` for sync code, run on `runner.default_runner`'s event loop like `get_page_sync`.
+    """
+    default_runner = runner.default_runner
+    browser_pool = browser_pool or default_runner.browser_pool
+    return default_runner.iterate(
+        get_page_stream(urls, proxy, browser_pool, fetch_mode, readiness, blocker, page_cache)
+    )
+
+
+@asynccontextmanager
+async def _fetching(
+    proxy: Proxy | ProxyPool | None,
+    browser_pool: BrowserPool | None,
+    fetch_mode: FetchMode,
+    readiness: PageReadiness | None,
+    blocker: ResourceBlocker | None,
+    page_cache: PageCache | None,
+) -> AsyncIterator[_Fetch]:
+    # Without a shared pool, browsers only live for this call (and are only launched if needed)
+    own_pool = browser_pool is None
+    if own_pool:
+        browser_pool = BrowserPool(max_pages=None, max_memory_mb=None)
+
+    fetch = _Fetch(
+        proxy,
+        browser_pool,
+        fetch_mode,
+        readiness or default_readiness,
+        blocker or default_blocker,
+        page_cache or default_page_cache,
+    )
 
-def get_page_sync(url: str | list[str], proxy: Proxy | None) -> str | list[str]:
     try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import nest_asyncio
+        if fetch_mode == 'tiered' or fetch.page_cache:
+            async with curl.AsyncSession() as fetch.session:
+                yield fetch
+        else:
+            yield fetch
+    finally:
+        if own_pool:
+            await browser_pool.stop()
 
-            nest_asyncio.apply()
-            return asyncio.run(get_page(url, proxy))
+
+async def _get_page_recorded(url: str, fetch: _Fetch) -> str:
+    with tracing.span('page', url=url, fetch_mode=fetch.fetch_mode) as span:
+        transport = replay.default_transport
+        if transport is None:
+            page_source = await _get_page_cached(url, fetch)
         else:
-            return loop.run_until_complete(get_page(url, proxy))
-    except RuntimeError:
-        return asyncio.run(get_page(url, proxy))
+            page_source = await transport.page(url, partial(_get_page_cached, url, fetch))
 
+        span.set(bytes=len(page_source))
+        return page_source
 
-async def get_page(url: str | list[str], proxy: Proxy | None) -> str | list[str]:
-    semaphore = asyncio.Semaphore(8)
-    url_list = url if isinstance(url, list) else [url]
+
+async def _get_page_cached(url: str, fetch: _Fetch) -> str:
+    get_source = _get_page_tiered if fetch.fetch_mode == 'tiered' else _get_page_source
+    cache = fetch.page_cache
+
+    if not cache or not valid_type(url):
+        return await get_source(url, fetch)
+
+    page = await cache.async_get(url)
+    if page and cache.is_fresh(page):
+        tracing.annotate(cache='hit')
+        return page.source
+
+    if page and await _not_modified(url, page, fetch):
+        await cache.async_revalidated(url)
+        tracing.annotate(cache='revalidated')
+        return page.source
+
+    page_source = await get_source(url, fetch)
+    if page_source:
+        await cache.async_set(url, page_source, *fetch.validators.get(url, (None, None)))
+
+    return page_source
+
+
+async def _not_modified(url: str, page: CachedPage, fetch: _Fetch) -> bool:
+    headers = {}
+    if page.etag:
+        headers['If-None-Match'] = page.etag
+    if page.last_modified:
+        headers['If-Modified-Since'] = page.last_modified
+
+    if not headers:
+        return False
 
     try:
-        async with async_playwright() as playwright:
-            browser = await playwright.chromium.launch(
-                headless=True, proxy=proxy.to_playwright_proxy() if proxy else None
+        with use_proxy(fetch.proxy) as proxy:
+            resp = await fetch.session.get(
+                url,
+                headers=headers,
+                impersonate='chrome',
+                timeout=HTTP_TIMEOUT,
+                allow_redirects=True,
+                proxy=proxy.to_httpx_proxy_url() if proxy else None,
             )
+    except RequestException:
+        return False
 
-            tasks = [_get_page_source(url, semaphore, browser) for url in url_list]
-            results = await asyncio.gather(*tasks)
-            await browser.close()
+    return resp.status_code == 304
 
-            return results[0] if isinstance(url, str) else results
 
-    except PlaywrightError:
-        print("Playwright browser not found. Running 'playwright install'...")
-        subprocess.run(['playwright', 'install', 'chromium'], check=True)
-        return await get_page(url, proxy)
+async def _get_page_tiered(url: str, fetch: _Fetch) -> str:
+    if not valid_type(url):
+        return ''
 
+    domain = urlsplit(url).hostname or ''
 
-async def _get_page_source(url: str, semaphore: asyncio.Semaphore, browser: AsyncBrowser) -> str:
-    if not valid_type(url):
+    if tier_memory.get(domain) == 'browser':
+        return await _get_page_source(url, fetch)
+
+    page_source = await _get_http_source(url, fetch)
+    if page_source and await asyncio.to_thread(sufficient_content, page_source):
+        tier_memory.record(domain, 'http')
+        return page_source
+
+    page_source = await _get_page_source(url, fetch)
+    if page_source:
+        tier_memory.record(domain, 'browser')
+
+    return page_source
+
+
+async def _get_http_source(url: str, fetch: _Fetch) -> str:
+    try:
+        with use_proxy(fetch.proxy) as proxy, tracing.span('page.http', url=url) as span:
+            resp = await fetch.session.get(
+                url,
+                impersonate='chrome',
+                timeout=HTTP_TIMEOUT,
+                allow_redirects=True,
+                proxy=proxy.to_httpx_proxy_url() if proxy else None,
+            )
+            span.set(status=resp.status_code, bytes=len(resp.content))
+    except RequestException:
         return ''
 
-    async with semaphore:
-        context = await browser.new_context(**PLAYWRIGHT_CONFIG)
-        page = await context.new_page()
+    if resp.status_code >= 400 or 'html' not in resp.headers.get('content-type', ''):
+        return ''
+
+    fetch.validators[url] = (resp.headers.get('etag'), resp.headers.get('last-modified'))
+    return resp.text
+
 
+async def _get_page_source(url: str, fetch: _Fetch) -> str:
+    if not valid_type(url):
+        return ''
+
+    async with fetch.semaphore:
         try:
-            await page.goto(url, wait_until='domcontentloaded', timeout=6000)
-            await page.wait_for_timeout(2000)  # Wait an extra 2s for JS to populate content
-        except Exception:
-            page_source = ''
-        else:
+            with use_proxy(fetch.proxy) as proxy:
+                async with fetch.browser_pool.browser(proxy) as browser:
+                    return await _render_page(url, browser, fetch)
+        except PageLoadError:
+            return ''
+
+
+async def _render_page(url: str, browser: 'Browser', fetch: _Fetch) -> str:
+    context = await browser.new_context(**PLAYWRIGHT_CONFIG)
+    blocked = await fetch.blocker.attach(context)
+    page = await context.new_page()
+
+    try:
+        with tracing.span('page.goto', url=url) as span:
+            response = await page.goto(url, wait_until='domcontentloaded', timeout=6000)
+            if response:
+                span.set(status=response.status)
+                fetch.validators[url] = (response.headers.get('etag'), response.headers.get('last-modified'))
+
+        with tracing.span('page.wait', url=url) as span:
+            ready = await fetch.readiness.wait(page, url)
+            span.set(policy=ready.policy, elapsed=ready.elapsed, timed_out=ready.timed_out)
+
+        with tracing.span('page.content', url=url) as span:
             page_source = await page.content()
+            span.set(bytes=len(page_source), blocked_requests=blocked.requests, blocked_bytes=blocked.bytes)
 
+        return page_source
+    except Exception as e:
+        raise PageLoadError(url) from e
+    finally:
         await page.close()
         await context.close()
-        return page_source
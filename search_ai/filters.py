@@ -1,9 +1,13 @@
+import os
+import re
+import importlib.util
 from enum import Enum
-from typing import Annotated
+from functools import cache, partial
+from itertools import product
+from typing import Annotated, Callable
 
 from pydantic import BaseModel, Field, AfterValidator
 from pydantic.types import StringConstraints
-from publicsuffix2 import PublicSuffixList
 
 
 class Regions(str, Enum):
@@ -82,7 +86,62 @@ class Timespans(str, Enum):
 FileType = Annotated[str, StringConstraints(pattern=r'^[a-zA-Z0-9]{2,10}$')]
 Keyword = Annotated[str, StringConstraints(pattern=r'^[^\s]+$')]
 
-psl = PublicSuffixList()
+
+# DuckDuckGo quietly ignores the end of longer queries
+MAX_QUERY_LENGTH = 500
+
+# Their values are OR'ed together, so searching them a few at a time finds the same results as all at once.
+# Each is mapped to its operator.
+SPLITTABLE_FIELDS = {'sites': 'site', 'tlds': 'site', 'any_keywords': None}
+
+QUERY_TERM = re.compile(r'-?"[^"]*"|[^\s()|]+')
+
+
+def query_terms(query: str) -> int:
+    """
+    The number of words, phrases and operators (like `site:python.org`) in a query.
+    """
+    return len(QUERY_TERM.findall(query))
+
+
+def share(needs: dict[str, int], room: int) -> dict[str, int]:
+    """
+    Divide `room` equally, except that whatever needs less than its share gets just what it needs and the rest is
+    divided between the others. Equal shares make the fewest combinations when each is split to fit its share.
+    """
+    shares = {}
+    needs = dict(needs)
+
+    while needs:
+        equal = room // len(needs)
+        smaller = {name: need for name, need in needs.items() if need <= equal}
+        if not smaller:
+            shares.update(dict.fromkeys(needs, equal))
+            break
+
+        shares.update(smaller)
+        room -= sum(smaller.values())
+        needs = {name: need for name, need in needs.items() if name not in smaller}
+
+    return shares
+
+
+def pack(values: list[str], fits: Callable[[list[str]], bool]) -> list[list[str]]:
+    """
+    Split `values` into as few runs as possible that each `fits`. If single values don't fit, they're halved instead.
+    """
+    chunks = [[values[0]]]
+    for value in values[1:]:
+        if fits(chunks[-1] + [value]):
+            chunks[-1].append(value)
+        else:
+            chunks.append([value])
+
+    if len(chunks) == len(values) and not fits(chunks[0]):
+        half = len(values) // 2
+        return [values[:half], values[half:]]
+
+    return chunks
 
 
 def to_list(val: str | list[str] | None) -> list[str]:
@@ -110,6 +169,35 @@ def group_excludes(op: str, values: list[str]) -> list[str]:
     return [f'-{op}:{v}' for v in values]
 
 
+@cache
+def top_level_domains() -> frozenset[str]:
+    """
+    The top-level labels of the public suffix list that ships with publicsuffix2, IDNA-encoded.
+
+    A TLD filter is valid when its last label is one of them, which is what `PublicSuffixList.get_tld(tld,
+    strict=True)` checks. Reading just these labels is much faster than building publicsuffix2's whole trie (or
+    importing it), and only happens the first time a TLD is validated.
+    """
+    spec = importlib.util.find_spec('publicsuffix2')
+    path = os.path.join(spec.submodule_search_locations[0], 'public_suffix_list.dat')
+
+    labels = set()
+    with open(path, encoding='utf8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('//'):
+                continue
+
+            label = line.split()[0].rpartition('.')[2].lstrip('!')
+            labels.add(label if label.isascii() else label.encode('idna').decode())
+
+    return frozenset(labels)
+
+
+def valid_tld(tld: str) -> bool:
+    return tld.lower().strip('.').rpartition('.')[2] in top_level_domains()
+
+
 def validate_tld(v: str | list[str] | None):
     # TODO: make type a generic type
     if not v:
@@ -117,7 +205,7 @@ def validate_tld(v: str | list[str] | None):
 
     tlds = v if isinstance(v, list) else [v]
     for tld in tlds:
-        if not psl.get_tld(tld, strict=True):
+        if not valid_tld(tld):
             raise ValueError(f'{tld!r} is an invalid top-level domain according to https://publicsuffix.org')
 
     return v
@@ -198,3 +286,52 @@ class Filters(BaseModel):
         filters.extend([f'-intext:{w}' for w in to_list(self.not_in_text)])
 
         return ' '.join([f for f in filters if f])
+
+    def fits(self, query: str = '', max_length: int = MAX_QUERY_LENGTH, max_terms: int | None = None) -> bool:
+        """
+        Whether `query` with these filters is at most `max_length` characters and `max_terms` terms long.
+        """
+        full_query = ' '.join(part for part in (query, self.compile_filters()) if part)
+        return len(full_query) <= max_length and (max_terms is None or query_terms(full_query) <= max_terms)
+
+    def split(
+        self, query: str = '', max_length: int = MAX_QUERY_LENGTH, max_terms: int | None = None
+    ) -> list['Filters']:
+        """
+        Split these filters into as few filters as possible that each fit with `query`, by spreading the `sites`,
+        `tlds` and `any_keywords` across them. Together they find the same results as these filters would.
+
+        The other filters are kept in every part, so if they don't fit by themselves, the parts only get as small as
+        one value of each.
+        """
+        if self.fits(query, max_length, max_terms):
+            return [self]
+
+        groups = {name: to_list(getattr(self, name)) for name in SPLITTABLE_FIELDS}
+        groups = {name: values for name, values in groups.items() if len(values) > 1}
+        if not groups:
+            return [self]
+
+        # Each group gets a share of the characters and terms the rest of the query leaves
+        rest = ' '.join(
+            part for part in (query, self.model_copy(update=dict.fromkeys(groups)).compile_filters()) if part
+        )
+        lengths = share(
+            {name: len(group_includes(values, SPLITTABLE_FIELDS[name])) + 1 for name, values in groups.items()},
+            max_length - len(rest),
+        )
+        terms = share({name: len(values) for name, values in groups.items()}, (max_terms or 0) - query_terms(rest))
+
+        def fits_share(name: str, chunk: list[str]) -> bool:
+            within_terms = max_terms is None or len(chunk) <= terms[name]
+            return within_terms and len(group_includes(chunk, SPLITTABLE_FIELDS[name])) + 1 <= lengths[name]
+
+        chunks = {name: pack(values, partial(fits_share, name)) for name, values in groups.items()}
+        if all(len(group_chunks) == 1 for group_chunks in chunks.values()):
+            # The shares were too generous, so halve the longest group and let the halves split further
+            name = max(groups, key=lambda name: lengths[name])
+            half = len(groups[name]) // 2
+            chunks[name] = [groups[name][:half], groups[name][half:]]
+
+        parts = [self.model_copy(update=dict(zip(chunks, combination))) for combination in product(*chunks.values())]
+        return [smaller for part in parts for smaller in part.split(query, max_length, max_terms)]
@@ -0,0 +1,74 @@
+import math
+import threading
+from collections import deque
+
+
+class Hedging:
+    """
+    Sends a second copy of a search request when the first hasn't been answered within the `percentile` of recent
+    response times, and uses whichever answer comes first.
+
+    The delay is taken from the last `window` response times, once there are `min_samples` of them (`initial_delay`
+    until then), and is never shorter than `min_delay`. Hedges are capped at `budget` of requests (5% by default):
+    each request earns that fraction of a hedge, and up to `max_saved` unspent hedges are kept for bursts of slow
+    responses.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        budget: float = 0.05,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.05,
+        window: int = 200,
+        min_samples: int = 20,
+        max_saved: float = 10,
+    ):
+        self.percentile = percentile
+        self.budget = budget
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.max_saved = max_saved
+
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0  # Hedges answered before the request they hedged
+
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._saved = 0.0
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """
+        How many seconds to wait for a response before hedging it. Each call counts as a request for the budget.
+        """
+        with self._lock:
+            self.requests += 1
+            self._saved = min(self.max_saved, self._saved + self.budget)
+
+            if len(self._latencies) < self.min_samples:
+                return max(self.min_delay, self.initial_delay)
+
+            ordered = sorted(self._latencies)
+            return max(self.min_delay, ordered[max(0, math.ceil(self.percentile / 100 * len(ordered)) - 1)])
+
+    def allow(self) -> bool:
+        """
+        Whether there's budget left for a hedge, which is spent if there is.
+        """
+        with self._lock:
+            if self._saved < 1:
+                return False
+
+            self._saved -= 1
+            self.hedges += 1
+            return True
+
+    def observe(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def won(self) -> None:
+        with self._lock:
+            self.wins += 1
@@ -0,0 +1,325 @@
+import math
+import weakref
+import threading
+from typing import Callable, Iterable
+
+from . import ratelimit, tracing
+from .tracing import Span
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Phases that make a request, and the kind of request they count as
+REQUEST_PHASES = {'search.request': 'search', 'page.http': 'page_http', 'page.goto': 'page_browser'}
+
+# Phases whose `bytes` were downloaded (`page` only repeats what `page.http` or `page.content` already counted)
+DOWNLOAD_PHASES = {'search.request': 'search', 'page.http': 'page_http', 'page.content': 'page_browser'}
+
+# Phases counted in `search_ai_in_flight` while they run
+IN_FLIGHT_PHASES = frozenset({'search.request', 'page', 'page.http', 'page.goto', 'convert'})
+
+
+class _Owner:
+    """
+    Kept in a thread's `threading.local`, so it's dropped (and its finalizer runs) when the thread ends.
+    """
+
+    __slots__ = ('__weakref__',)
+
+
+class Metric:
+    """
+    A metric whose values are kept per thread and added up when read, so an update never waits for a lock
+    (only a thread's first update does, to register its values). When a thread ends, its values are folded into
+    the ones of the threads before it, so short-lived threads don't pile up.
+    """
+
+    type = ''
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+
+        self._local = threading.local()
+        self._shards: dict[int, dict] = {}
+        self._retired: dict = {}
+        self._ended: list[dict] = []  # Values of threads that ended, not yet folded into `_retired`
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            owner = self._local.owner = _Owner()
+
+            with self._lock:
+                self._fold_ended()
+                self._shards[id(values)] = values
+
+            # Appending doesn't take the lock, which whatever thread runs the finalizer might be holding
+            weakref.finalize(owner, self._ended.append, values)
+            return values
+
+    def _fold_ended(self) -> None:
+        while self._ended:
+            values = self._ended.pop()
+            self._shards.pop(id(values), None)
+            for key, value in values.items():
+                self._retired[key] = self._retired.get(key, 0) + value
+
+    def _merged(self) -> dict[tuple, float]:
+        with self._lock:
+            self._fold_ended()
+            shards = [dict(self._retired)] + [dict(shard) for shard in self._shards.values()]
+
+        merged: dict[tuple, float] = {}
+        for shard in shards:
+            for key, value in shard.items():
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def values(self) -> dict[str, float]:
+        """
+        The current values, keyed by `_label_text` of their labels (an empty string without labels).
+        """
+        return {_label_text(self.labels, key): value for key, value in sorted(self._merged().items())}
+
+    def samples(self) -> list[str]:
+        return [f'{self.name}{_braces(labels)} {_number(value)}' for labels, value in self.values().items()]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fold_ended()
+            self._retired.clear()
+            for shard in self._shards.values():
+                shard.clear()
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        values = self._shard()
+        values[label_values] = values.get(label_values, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        values = self._shard()
+        values[label_values] = values.get(label_values, 0) + amount
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class CallbackGauge(Metric):
+    """
+    A gauge whose values are read from `read` (keyed by label values) when it's exported, for state that's kept
+    elsewhere.
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str], read: Callable[[], dict[tuple, float]]):
+        super().__init__(name, help, labels)
+        self.read = read
+
+    def _merged(self) -> dict[tuple, float]:
+        return self.read()
+
+    def clear(self) -> None:
+        pass
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, *label_values: str) -> None:
+        values = self._shard()
+
+        bucket = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        values[label_values + ('bucket', bucket)] = values.get(label_values + ('bucket', bucket), 0) + 1
+        values[label_values + ('sum',)] = values.get(label_values + ('sum',), 0) + value
+        values[label_values + ('count',)] = values.get(label_values + ('count',), 0) + 1
+
+    def values(self) -> dict[str, dict]:
+        """
+        The `count`, `sum` and cumulative `buckets` of each set of labels.
+        """
+        merged = self._merged()
+        n = len(self.labels)
+        result: dict[str, dict] = {}
+
+        for key in sorted({key[:n] for key in merged}):
+            counts = [merged.get(key + ('bucket', i), 0) for i in range(len(self.buckets))]
+            cumulative = [sum(counts[: i + 1]) for i in range(len(counts))]
+            result[_label_text(self.labels, key)] = {
+                'count': merged.get(key + ('count',), 0),
+                'sum': merged.get(key + ('sum',), 0.0),
+                'buckets': {_number(bound): count for bound, count in zip(self.buckets, cumulative)},
+            }
+
+        return result
+
+    def samples(self) -> list[str]:
+        lines = []
+        for labels, value in self.values().items():
+            separator = ',' if labels else ''
+            for bound, count in value['buckets'].items():
+                lines.append(f'{self.name}_bucket{{{labels}{separator}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_sum{_braces(labels)} {_number(value["sum"])}')
+            lines.append(f'{self.name}_count{_braces(labels)} {value["count"]}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def add(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> dict[str, dict]:
+        """
+        Every metric's values as plain data, keyed by metric name and then by labels (like `kind="search"`).
+        """
+        return {name: metric.values() for name, metric in self.metrics.items()}
+
+    def prometheus(self) -> str:
+        """
+        Every metric in Prometheus' text exposition format.
+        """
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self) -> None:
+        for metric in self.metrics.values():
+            metric.clear()
+
+
+registry = Registry()
+
+requests = registry.add(Counter('search_ai_requests_total', 'Requests made, by kind.', ['kind']))
+retries = registry.add(Counter('search_ai_retries_total', 'Requests retried, by kind.', ['kind']))
+responses = registry.add(
+    Counter('search_ai_responses_total', 'Responses received, by kind and status class.', ['kind', 'status'])
+)
+parse_failures = registry.add(Counter('search_ai_parse_failures_total', 'Results pages that failed to parse.'))
+blocks = registry.add(
+    Counter(
+        'search_ai_blocks_total', 'Requests DuckDuckGo blocked (at least once, counting retries), by kind.', ['kind']
+    )
+)
+hedges = registry.add(Counter('search_ai_hedges_total', 'Hedge requests sent, by kind.', ['kind']))
+timeouts = registry.add(Counter('search_ai_timeouts_total', 'Requests that timed out, by kind.', ['kind']))
+downloaded_bytes = registry.add(Counter('search_ai_downloaded_bytes_total', 'Bytes downloaded, by kind.', ['kind']))
+browser_launches = registry.add(Counter('search_ai_browser_launches_total', 'Chromium browsers launched.'))
+readiness = registry.add(
+    Counter(
+        'search_ai_page_readiness_total', 'Rendered pages, by the readiness policy that ended their wait.', ['policy']
+    )
+)
+blocked_requests = registry.add(
+    Counter('search_ai_blocked_requests_total', 'Requests the resource blocker aborted while rendering pages.')
+)
+blocked_bytes = registry.add(
+    Counter('search_ai_blocked_bytes_total', 'Estimated bytes the resource blocker kept from being downloaded.')
+)
+in_flight = registry.add(Gauge('search_ai_in_flight', 'Phases running right now, by phase.', ['phase']))
+phase_seconds = registry.add(Histogram('search_ai_phase_seconds', 'How long each phase took.', ['phase']))
+pacing_rate = registry.add(
+    CallbackGauge(
+        'search_ai_pacing_rate',
+        'Requests per second each proxy is paced at by adaptive rate limiters.',
+        ['proxy'],
+        lambda: {(proxy,): rate for proxy, rate in ratelimit.pacing_rates().items()},
+    )
+)
+
+
+def enable() -> None:
+    """
+    Start recording metrics, from the same phase spans `tracing` emits.
+    """
+    if _record not in tracing.hooks:
+        tracing.start_hooks.append(_started)
+        tracing.hooks.append(_record)
+
+
+def disable() -> None:
+    if _record in tracing.hooks:
+        tracing.start_hooks.remove(_started)
+        tracing.hooks.remove(_record)
+
+
+def _started(span: Span) -> None:
+    if span.name in IN_FLIGHT_PHASES:
+        in_flight.inc(span.name)
+
+
+def _record(span: Span) -> None:
+    name, attrs = span.name, span.attrs
+    phase_seconds.observe(span.duration, name)
+
+    if name in IN_FLIGHT_PHASES:
+        in_flight.dec(name)
+
+    kind = REQUEST_PHASES.get(name)
+    if kind:
+        requests.inc(kind)
+        if attrs.get('retries'):
+            retries.inc(kind, amount=attrs['retries'])
+        if attrs.get('status'):
+            responses.inc(kind, f'{attrs["status"] // 100}xx')
+        if attrs.get('blocked'):
+            blocks.inc(kind)
+        if attrs.get('hedge'):
+            hedges.inc(kind)
+        if 'Timeout' in attrs.get('error', ''):
+            timeouts.inc(kind)
+
+    if attrs.get('bytes') and name in DOWNLOAD_PHASES:
+        downloaded_bytes.inc(DOWNLOAD_PHASES[name], amount=attrs['bytes'])
+
+    if name == 'page.wait' and attrs.get('policy'):
+        readiness.inc(attrs['policy'])
+
+    if name == 'page.content' and attrs.get('blocked_requests'):
+        blocked_requests.inc(amount=attrs['blocked_requests'])
+        blocked_bytes.inc(amount=attrs['blocked_bytes'])
+
+    if name == 'search.parse' and attrs.get('error'):
+        parse_failures.inc()
+    elif name == 'browser.launch' and not attrs.get('error'):
+        browser_launches.inc()
+
+
+def _label_text(names: tuple[str, ...], values: tuple) -> str:
+    return ','.join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+
+
+def _braces(labels: str) -> str:
+    return f'{{{labels}}}' if labels else ''
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
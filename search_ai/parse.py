@@ -4,6 +4,21 @@ from lxml import html
 LINK_TITLE_XPATH = '//a[@class="result-link" and not(ancestor::tr[@class="result-sponsored"])]'
 DESCRIPTION_XPATH = '//td[@class="result-snippet" and not(ancestor::tr[@class="result-sponsored"])]'
 
+# Statuses DuckDuckGo answers with when it's throttling a client
+BLOCK_STATUSES = frozenset({202, 403, 418, 429})
+
+# Only on the anomaly (bot challenge) page DuckDuckGo serves instead of results, with a 200 status. A page with
+# no results has none of these, just no result rows.
+BLOCK_MARKERS = ('anomaly-modal', 'challenge-form', 'bots use DuckDuckGo too')
+
+
+def is_blocked(status: int, page: str) -> bool:
+    """
+    Whether a response is DuckDuckGo refusing to search (a throttling status or the anomaly page), instead of
+    a results page.
+    """
+    return status in BLOCK_STATUSES or any(marker in page for marker in BLOCK_MARKERS)
+
 
 def parse_search(data):
     results = []
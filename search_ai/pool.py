@@ -0,0 +1,70 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Iterable, Literal
+
+
+PoolKind = Literal['process', 'thread']
+
+
+class ConversionPool:
+    """
+    Runs page conversions on an executor, so they use every core and don't block the calling thread or event loop.
+
+    A process pool converts pages in parallel. A thread pool only keeps the event loop free (conversion holds the
+    GIL for most of its time), but it starts instantly and doesn't copy the pages to other processes.
+
+    The executor is started on first use and shared by every call until `shutdown`. `max_tasks_per_child` replaces
+    a process after it has converted that many pages, which needs Python 3.11 or newer.
+    """
+
+    def __init__(
+        self, max_workers: int | None = None, kind: PoolKind = 'process', max_tasks_per_child: int | None = None
+    ):
+        if kind not in ('process', 'thread'):
+            raise ValueError(f"kind must be 'process' or 'thread', not {kind!r}")
+
+        self.max_workers = max_workers
+        self.kind = kind
+        self.max_tasks_per_child = max_tasks_per_child
+
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._start()
+            return self._executor
+
+    def _start(self) -> Executor:
+        if self.kind == 'thread':
+            return ThreadPoolExecutor(self.max_workers, thread_name_prefix='search-ai-convert')
+
+        if self.max_tasks_per_child is not None:
+            return ProcessPoolExecutor(self.max_workers, max_tasks_per_child=self.max_tasks_per_child)
+        return ProcessPoolExecutor(self.max_workers)
+
+    def map(self, fn: Callable[..., Any], *iterables: Iterable) -> list:
+        return list(self.executor.map(fn, *iterables))
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(fn, *args))
+
+    async def async_map(self, fn: Callable[..., Any], *iterables: Iterable) -> list:
+        return await asyncio.gather(*(self.run(fn, *args) for args in zip(*iterables)))
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def __enter__(self) -> 'ConversionPool':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
@@ -1,6 +1,13 @@
-from typing import Literal, Optional
+import time
+import threading
+from dataclasses import dataclass
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Iterator, Literal, Optional
+
 from pydantic import BaseModel, Field
 
+from .parse import BLOCK_STATUSES
+
 
 class Proxy(BaseModel):
     protocol: Literal['http', 'https', 'socks4', 'socks5'] = Field(..., description='Proxy protocol')
@@ -22,3 +29,151 @@ class Proxy(BaseModel):
             proxy['password'] = self.password
 
         return proxy
+
+
+@dataclass
+class ProxyStats:
+    requests: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+    in_flight: int = 0
+    latency: float | None = None
+    error_rate: float = 0.0
+    consecutive_failures: int = 0
+    quarantines: int = 0
+    quarantined_until: float = 0.0
+
+
+class ProxyPool:
+    """
+    Spreads requests over several proxies and can be passed anywhere a `Proxy` is accepted.
+
+    Proxies are picked round-robin or by least in-flight requests. Latency and error rate are tracked per proxy,
+    and a proxy that gets rate limited (403/429, or DuckDuckGo's anomaly page) or fails `max_failures` times in a
+    row is quarantined. Each quarantine in a row doubles the cool-down, from `base_cooldown` up to `max_cooldown`
+    seconds.
+    """
+
+    def __init__(
+        self,
+        proxies: list[Proxy],
+        strategy: Literal['round_robin', 'least_loaded'] = 'round_robin',
+        max_in_flight: int | None = None,
+        max_failures: int = 3,
+        base_cooldown: float = 30,
+        max_cooldown: float = 600,
+        smoothing: float = 0.2,
+    ):
+        if not proxies:
+            raise ValueError('ProxyPool needs at least one proxy')
+
+        self.proxies = list(proxies)
+        self.strategy = strategy
+        self.max_in_flight = max_in_flight
+        self.max_failures = max_failures
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.smoothing = smoothing
+
+        self.stats = {proxy.to_httpx_proxy_url(): ProxyStats() for proxy in self.proxies}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.proxies)
+
+    def healthy(self) -> list[Proxy]:
+        now = time.monotonic()
+        return [proxy for proxy in self.proxies if self._stats(proxy).quarantined_until <= now]
+
+    def acquire(self) -> Proxy:
+        """
+        Pick a proxy for one request. Every `acquire` has to be followed by a `release`.
+        """
+        with self._lock:
+            now = time.monotonic()
+            healthy = [proxy for proxy in self.proxies if self._stats(proxy).quarantined_until <= now]
+            available = [
+                proxy
+                for proxy in healthy
+                if not self.max_in_flight or self._stats(proxy).in_flight < self.max_in_flight
+            ]
+
+            # Never fail a request just because the pool is busy or unhealthy
+            candidates = available or healthy or [min(self.proxies, key=lambda p: self._stats(p).quarantined_until)]
+
+            if self.strategy == 'least_loaded':
+                proxy = min(candidates, key=lambda p: (self._stats(p).in_flight, self._stats(p).latency or 0))
+            else:
+                candidate_ids = {id(p) for p in candidates}
+                for i in range(len(self.proxies)):
+                    index = (self._next + i) % len(self.proxies)
+                    if id(self.proxies[index]) in candidate_ids:
+                        break
+                proxy = self.proxies[index]
+                self._next = index + 1
+
+            self._stats(proxy).in_flight += 1
+            return proxy
+
+    def release(self, proxy: Proxy, latency: float, error: BaseException | None = None) -> None:
+        with self._lock:
+            stats = self._stats(proxy)
+            stats.in_flight -= 1
+            stats.requests += 1
+
+            if error is None:
+                stats.latency = (
+                    latency if stats.latency is None else stats.latency + self.smoothing * (latency - stats.latency)
+                )
+                stats.error_rate -= self.smoothing * stats.error_rate
+                stats.consecutive_failures = 0
+                stats.quarantines = 0
+                return
+
+            status = getattr(getattr(error, 'response', None), 'status_code', None)
+            rate_limited = getattr(error, 'blocked', False) or status in BLOCK_STATUSES
+
+            stats.errors += 1
+            stats.rate_limited += rate_limited
+            stats.error_rate += self.smoothing * (1 - stats.error_rate)
+            stats.consecutive_failures += 1
+
+            if rate_limited or stats.consecutive_failures >= self.max_failures:
+                cooldown = min(self.max_cooldown, self.base_cooldown * 2**stats.quarantines)
+                stats.quarantined_until = time.monotonic() + cooldown
+                stats.quarantines += 1
+                stats.consecutive_failures = 0
+
+    @contextmanager
+    def use(self) -> Iterator[Proxy]:
+        """
+        Acquire a proxy for the duration of the block. An exception raised in the block counts as a failure.
+        """
+        proxy = self.acquire()
+        start = time.monotonic()
+
+        try:
+            yield proxy
+        except Exception as e:
+            self.release(proxy, time.monotonic() - start, e)
+            raise
+        except BaseException:
+            self._abandon(proxy)  # Cancelled, which says nothing about the proxy
+            raise
+        else:
+            self.release(proxy, time.monotonic() - start)
+
+    def _abandon(self, proxy: Proxy) -> None:
+        with self._lock:
+            self._stats(proxy).in_flight -= 1
+
+    def _stats(self, proxy: Proxy) -> ProxyStats:
+        return self.stats[proxy.to_httpx_proxy_url()]
+
+
+def use_proxy(proxy: Proxy | ProxyPool | None) -> ContextManager[Proxy | None]:
+    """
+    The proxy to use for one request: one picked from a pool, or the proxy itself.
+    """
+    return proxy.use() if isinstance(proxy, ProxyPool) else nullcontext(proxy)
@@ -0,0 +1,201 @@
+import time
+import weakref
+import asyncio
+import threading
+from dataclasses import dataclass
+
+from .proxy import Proxy
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average, and bursts of up to `burst` requests.
+
+    Callers reserve a token and then wait outside of the lock, so the bucket works across threads and event loops.
+    """
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token and return how many seconds to wait before using it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def set_rate(self, rate: float) -> None:
+        """
+        Change the rate from now on. Tokens that were due at the old rate are kept.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.rate = rate
+
+
+class RateLimiter:
+    """
+    A global token bucket shared by every request, plus an optional bucket per proxy.
+    """
+
+    def __init__(
+        self,
+        rate: float = 4,
+        burst: float | None = None,
+        per_proxy_rate: float | None = None,
+        per_proxy_burst: float | None = None,
+    ):
+        self.per_proxy_rate = per_proxy_rate
+        self.per_proxy_burst = per_proxy_burst
+
+        self._bucket = TokenBucket(rate, burst)
+        self._proxy_buckets: dict[str | None, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, proxy: Proxy | None = None) -> float:
+        wait = self._bucket.reserve()
+
+        if self.per_proxy_rate:
+            wait = max(wait, self._proxy_bucket(proxy).reserve())
+
+        return wait
+
+    async def acquire(self, proxy: Proxy | None = None) -> None:
+        wait = self.reserve(proxy)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self, proxy: Proxy | None = None) -> None:
+        wait = self.reserve(proxy)
+        if wait:
+            time.sleep(wait)
+
+    def record(self, proxy: Proxy | None, blocked: bool) -> None:
+        """
+        Called after each response to a search request, with whether DuckDuckGo blocked it. The rates here are
+        fixed, so it's ignored (see `AdaptiveRateLimiter`).
+        """
+
+    def _proxy_bucket(self, proxy: Proxy | None) -> TokenBucket:
+        key = proxy.to_httpx_proxy_url() if proxy else None
+
+        with self._lock:
+            bucket = self._proxy_buckets.get(key)
+            if bucket is None:
+                bucket = self._proxy_buckets[key] = TokenBucket(self.per_proxy_rate, self.per_proxy_burst)
+            return bucket
+
+
+@dataclass
+class _Pace:
+    label: str
+    blocks: int = 0  # In a row
+    trips: int = 0  # Times the circuit opened in a row
+    open_until: float = 0.0
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """
+    A `RateLimiter` whose per-proxy rates follow how DuckDuckGo responds, additive-increase/multiplicative-decrease
+    style. Each proxy starts at `per_proxy_rate` requests per second. A response that isn't blocked adds `increase`
+    to it, up to `max_rate` (the global `rate` by default), and a block multiplies it by `decrease`, down to
+    `min_rate`.
+
+    After `trip_after` blocks in a row, the proxy's circuit opens: its requests wait `cooldown` seconds, doubled
+    each time it opens again without a response getting through in between (up to `max_cooldown`), and then go on
+    at `min_rate`.
+    """
+
+    def __init__(
+        self,
+        rate: float = 4,
+        burst: float | None = None,
+        per_proxy_rate: float = 1,
+        min_rate: float = 0.1,
+        max_rate: float | None = None,
+        increase: float = 0.1,
+        decrease: float = 0.5,
+        trip_after: int = 3,
+        cooldown: float = 30,
+        max_cooldown: float = 600,
+    ):
+        super().__init__(rate, burst, per_proxy_rate, per_proxy_burst=1)
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.increase = increase
+        self.decrease = decrease
+        self.trip_after = trip_after
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self._paces: dict[str | None, _Pace] = {}
+        _adaptive_limiters.add(self)
+
+    def reserve(self, proxy: Proxy | None = None) -> float:
+        wait = super().reserve(proxy)
+
+        with self._lock:
+            open_for = self._pace(proxy).open_until - time.monotonic()
+
+        return max(wait, open_for)
+
+    def record(self, proxy: Proxy | None, blocked: bool) -> None:
+        bucket = self._proxy_bucket(proxy)
+
+        with self._lock:
+            pace = self._pace(proxy)
+
+            if not blocked:
+                pace.blocks = pace.trips = 0
+                rate = min(self.max_rate, bucket.rate + self.increase)
+            else:
+                pace.blocks += 1
+                rate = max(self.min_rate, bucket.rate * self.decrease)
+
+                if pace.blocks >= self.trip_after:
+                    pace.open_until = time.monotonic() + min(self.max_cooldown, self.cooldown * 2**pace.trips)
+                    pace.trips += 1
+                    pace.blocks = 0
+                    rate = self.min_rate
+
+            bucket.set_rate(rate)
+
+    def rates(self) -> dict[str, float]:
+        """
+        The rate each proxy is paced at right now, keyed by its host and port (`'direct'` without a proxy).
+        """
+        with self._lock:
+            return {pace.label: self._proxy_buckets[key].rate for key, pace in self._paces.items()}
+
+    def _pace(self, proxy: Proxy | None) -> _Pace:
+        key = proxy.to_httpx_proxy_url() if proxy else None
+
+        pace = self._paces.get(key)
+        if pace is None:
+            pace = self._paces[key] = _Pace(f'{proxy.host}:{proxy.port}' if proxy else 'direct')
+        return pace
+
+
+_adaptive_limiters: 'weakref.WeakSet[AdaptiveRateLimiter]' = weakref.WeakSet()
+
+
+def pacing_rates() -> dict[str, float]:
+    """
+    The live per-proxy rates of every `AdaptiveRateLimiter` there is.
+    """
+    rates: dict[str, float] = {}
+    for limiter in list(_adaptive_limiters):
+        rates.update(limiter.rates())
+    return rates
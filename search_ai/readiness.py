@@ -0,0 +1,185 @@
+import time
+import asyncio
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Protocol
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page
+
+
+DOM_QUIESCENCE_JS = """
+(quietMs) => new Promise((resolve) => {
+    let timer;
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(done, quietMs);
+    });
+    function done() {
+        observer.disconnect();
+        resolve(true);
+    }
+    observer.observe(document, {childList: true, subtree: true, characterData: true, attributes: true});
+    timer = setTimeout(done, quietMs);
+})
+"""
+
+TEXT_LENGTH_JS = 'document.body ? document.body.innerText.length : 0'
+
+
+class ReadinessPolicy(Protocol):
+    name: str
+
+    async def wait(self, page: 'Page') -> None: ...
+
+
+class NetworkIdle:
+    name = 'network_idle'
+
+    def __init__(self, timeout: float = 30):
+        self.timeout = timeout
+
+    async def wait(self, page: 'Page') -> None:
+        await page.wait_for_load_state('networkidle', timeout=self.timeout * 1000)
+
+
+class DomQuiescence:
+    """
+    Ready once the DOM hasn't changed for `quiet` seconds, tracked with an injected MutationObserver.
+    """
+
+    name = 'dom_quiescence'
+
+    def __init__(self, quiet: float = 0.5):
+        self.quiet = quiet
+
+    async def wait(self, page: 'Page') -> None:
+        await page.evaluate(DOM_QUIESCENCE_JS, self.quiet * 1000)
+
+
+class TextStable:
+    """
+    Ready once the page has visible text and its length stayed the same for `checks` polls in a row.
+    """
+
+    name = 'text_stable'
+
+    def __init__(self, interval: float = 0.3, checks: int = 3):
+        self.interval = interval
+        self.checks = checks
+
+    async def wait(self, page: 'Page') -> None:
+        last_length, stable = -1, 0
+
+        while stable < self.checks:
+            length = await page.evaluate(TEXT_LENGTH_JS)
+            stable = stable + 1 if length and length == last_length else 0
+            last_length = length
+            await asyncio.sleep(self.interval)
+
+
+@dataclass
+class ReadinessResult:
+    policy: str
+    elapsed: float
+
+    @property
+    def timed_out(self) -> bool:
+        """
+        Whether the wait was cut off (by `hard_cap` or the domain's budget) before any policy fired.
+        """
+        return self.policy in ('hard_cap', 'budget')
+
+
+class PageReadiness:
+    """
+    Races readiness policies against each other and returns as soon as one of them fires.
+
+    Every page is cut off after `hard_cap` seconds. Once a domain has `min_samples` observations, pages from it
+    are also cut off after a learned budget: `margin` times the moving average of how long its pages took.
+    """
+
+    def __init__(
+        self,
+        policies: list[ReadinessPolicy] | None = None,
+        hard_cap: float = 5,
+        margin: float = 1.5,
+        min_budget: float = 0.5,
+        min_samples: int = 3,
+        smoothing: float = 0.3,
+        max_domains: int = 10_000,
+    ):
+        self.policies = policies if policies is not None else [NetworkIdle(), DomQuiescence(), TextStable()]
+        self.hard_cap = hard_cap
+        self.margin = margin
+        self.min_budget = min_budget
+        self.min_samples = min_samples
+        self.smoothing = smoothing
+        self.max_domains = max_domains
+
+        self.fired: Counter[str] = Counter()
+        self._domains: OrderedDict[str, tuple[float, int]] = OrderedDict()
+
+    async def wait(self, page: 'Page', url: str) -> ReadinessResult:
+        domain = urlsplit(url).hostname or ''
+        budget = self.budget(domain)
+        start = time.monotonic()
+
+        tasks = {asyncio.create_task(policy.wait(page)): policy.name for policy in self.policies}
+        policy = await _first_success(tasks, budget)
+
+        elapsed = time.monotonic() - start
+
+        if policy is None:
+            policy = 'hard_cap' if budget >= self.hard_cap else 'budget'
+        if policy != 'error':
+            self._learn(domain, elapsed)
+
+        self.fired[policy] += 1
+        return ReadinessResult(policy, elapsed)
+
+    def budget(self, domain: str) -> float:
+        average, samples = self._domains.get(domain, (0.0, 0))
+        if samples < self.min_samples:
+            return self.hard_cap
+
+        return min(self.hard_cap, max(self.min_budget, average * self.margin))
+
+    def _learn(self, domain: str, elapsed: float) -> None:
+        average, samples = self._domains.pop(domain, (elapsed, 0))
+        self._domains[domain] = (average + self.smoothing * (elapsed - average), samples + 1)
+
+        while len(self._domains) > self.max_domains:
+            self._domains.popitem(last=False)
+
+
+async def _first_success(tasks: dict[asyncio.Task, str], timeout: float) -> str | None:
+    """
+    Name of the first task to finish without raising, 'error' if they all failed, or None on timeout.
+    """
+    if not tasks:
+        await asyncio.sleep(timeout)
+        return None
+
+    deadline = time.monotonic() + timeout
+    pending = set(tasks)
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                return None
+
+            for task in done:
+                if not task.cancelled() and task.exception() is None:
+                    return tasks[task]
+
+        return 'error'
+
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
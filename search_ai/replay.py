@@ -0,0 +1,187 @@
+import abc
+import time
+import zlib
+import asyncio
+import threading
+from typing import Awaitable, Callable, Literal
+
+from .cache import PageCache, SearchCache, _connect
+
+
+class Archive:
+    """
+    Recorded search responses and page sources, in a SQLite database.
+
+    Each response is a compressed row keyed by its kind (`'search'` or `'page'`) and its key, so a single response
+    can be read without loading the rest. Search responses are keyed like `SearchCache` keys them, and pages by
+    their normalized URL.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = _connect(
+            path,
+            'CREATE TABLE IF NOT EXISTS responses '
+            '(kind TEXT, key TEXT, value BLOB, latency REAL, recorded_at REAL, PRIMARY KEY (kind, key))',
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def search_key(data: dict) -> str:
+        return SearchCache.key(data)
+
+    @staticmethod
+    def page_key(url: str) -> str:
+        return PageCache.normalize_url(url)
+
+    def get(self, kind: str, key: str) -> tuple[str, float] | None:
+        """
+        The recorded response and how many seconds it took, or None if it wasn't recorded.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value, latency FROM responses WHERE kind = ? AND key = ?', (kind, key)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return zlib.decompress(row[0]).decode(), row[1]
+
+    def put(self, kind: str, key: str, value: str, latency: float) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses (kind, key, value, latency, recorded_at) VALUES (?, ?, ?, ?, ?)',
+                (kind, key, zlib.compress(value.encode()), latency, time.time()),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class Transport(abc.ABC):
+    """
+    Sits under `search` and `get_page`. `request` and `fetch` get the response the usual way, through the caches,
+    proxies and browsers, and are paced like any other request. Responses that don't need them aren't paced.
+    """
+
+    def __init__(self, archive: Archive | str):
+        self.archive = archive if isinstance(archive, Archive) else Archive(archive)
+
+    @abc.abstractmethod
+    def search(self, data: dict, request: Callable[[], str]) -> str: ...
+
+    @abc.abstractmethod
+    async def async_search(self, data: dict, request: Callable[[], Awaitable[str]]) -> str: ...
+
+    @abc.abstractmethod
+    async def page(self, url: str, fetch: Callable[[], Awaitable[str]]) -> str: ...
+
+    def close(self) -> None:
+        self.archive.close()
+
+    def __enter__(self) -> 'Transport':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class Recorder(Transport):
+    """
+    Makes requests as usual, and writes every search response and page source into the archive, with how long
+    it took to get.
+    """
+
+    def search(self, data: dict, request: Callable[[], str]) -> str:
+        start = time.monotonic()
+        response = request()
+        self.archive.put('search', self.archive.search_key(data), response, time.monotonic() - start)
+        return response
+
+    async def async_search(self, data: dict, request: Callable[[], Awaitable[str]]) -> str:
+        start = time.monotonic()
+        response = await request()
+        latency = time.monotonic() - start
+        await asyncio.to_thread(self.archive.put, 'search', self.archive.search_key(data), response, latency)
+        return response
+
+    async def page(self, url: str, fetch: Callable[[], Awaitable[str]]) -> str:
+        start = time.monotonic()
+        page_source = await fetch()
+        latency = time.monotonic() - start
+        await asyncio.to_thread(self.archive.put, 'page', self.archive.page_key(url), page_source, latency)
+        return page_source
+
+
+class Replayer(Transport):
+    """
+    Serves search responses and page sources from the archive, without DuckDuckGo or Chromium.
+
+    `latency` is how long each response takes: no time at all by default, `'recorded'` for as long as it took
+    when it was recorded, or a number of seconds. A response that wasn't recorded raises a `LookupError`, unless
+    `passthrough` is set, in which case it's requested as usual.
+    """
+
+    def __init__(
+        self,
+        archive: Archive | str,
+        latency: float | Literal['recorded'] | None = None,
+        passthrough: bool = False,
+    ):
+        super().__init__(archive)
+        self.latency = latency
+        self.passthrough = passthrough
+        self.misses = 0
+
+    def search(self, data: dict, request: Callable[[], str]) -> str:
+        recorded = self.archive.get('search', self.archive.search_key(data))
+        if recorded is None:
+            self._missed(f'search for {data.get("q", "")!r}')
+            return request()
+
+        response, latency = recorded
+        if delay := self._delay(latency):
+            time.sleep(delay)
+        return response
+
+    async def async_search(self, data: dict, request: Callable[[], Awaitable[str]]) -> str:
+        recorded = await asyncio.to_thread(self.archive.get, 'search', self.archive.search_key(data))
+        if recorded is None:
+            self._missed(f'search for {data.get("q", "")!r}')
+            return await request()
+
+        response, latency = recorded
+        if delay := self._delay(latency):
+            await asyncio.sleep(delay)
+        return response
+
+    async def page(self, url: str, fetch: Callable[[], Awaitable[str]]) -> str:
+        recorded = await asyncio.to_thread(self.archive.get, 'page', self.archive.page_key(url))
+        if recorded is None:
+            self._missed(f'page {url}')
+            return await fetch()
+
+        page_source, latency = recorded
+        if delay := self._delay(latency):
+            await asyncio.sleep(delay)
+        return page_source
+
+    def _missed(self, what: str) -> None:
+        self.misses += 1
+        if not self.passthrough:
+            raise LookupError(f'No recorded response for {what} in {self.archive.path}')
+
+    def _delay(self, recorded_latency: float) -> float:
+        if self.latency == 'recorded':
+            return recorded_latency
+        return self.latency or 0.0
+
+
+# Set to a Recorder or Replayer to record or replay every search and page
+default_transport: Transport | None = None
@@ -0,0 +1,99 @@
+import atexit
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, TypeVar
+
+from .browser import BrowserPool
+
+T = TypeVar('T')
+
+_DONE = object()
+
+
+class LoopRunner:
+    """
+    An event loop on a daemon thread of its own, which the sync API runs its coroutines on. Whatever is bound to an
+    event loop, like a `BrowserPool`, can then outlive a sync call and be shared by every thread that makes them,
+    instead of being built again on a new loop each time.
+
+    `browser_pool` is the pool sync calls use when they aren't given one, so their browsers stay warm between calls.
+    The loop is started by the first `run`, and `close` (which also runs at exit) stops the pool and the loop.
+    """
+
+    def __init__(self, browser_pool: BrowserPool | None = None):
+        self.browser_pool = browser_pool or BrowserPool()
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._registered = False
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def run(self, coroutine: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """
+        Run `coroutine` on the loop and wait for its result. It sees the caller's context variables, so tracing
+        and `Timings` work as if it ran in the calling thread.
+        """
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError('LoopRunner.run was called from its own loop, where it would wait forever')
+
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._start())
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def iterate(self, iterator: AsyncIterator[T]) -> Iterator[T]:
+        """
+        Iterate over an async iterator from sync code, running it on the loop one item at a time. Closing the
+        returned iterator, or leaving it early, closes `iterator` on the loop too.
+        """
+        try:
+            while (item := self.run(_next(iterator))) is not _DONE:
+                yield item
+        finally:
+            if (aclose := getattr(iterator, 'aclose', None)) is not None and self.running:
+                self.run(aclose())
+
+    def close(self) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+
+        if loop is None:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self.browser_pool.stop(), loop).result()
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name='search_ai_loop_runner', daemon=True
+                )
+                self._thread.start()
+
+                if not self._registered:
+                    atexit.register(self.close)
+                    self._registered = True
+
+            return self._loop
+
+
+async def _next(iterator: AsyncIterator[T]) -> T | object:
+    return await anext(iterator, _DONE)
+
+
+# What the sync API (`get_page_sync`, `get_page_stream_sync`, and so the sync results' extended outputs) runs on
+default_runner = LoopRunner()
@@ -1,21 +1,37 @@
-from typing import Any
+import asyncio
+from itertools import repeat
+from typing import Any, AsyncIterator, Iterator
 
-from .proxy import Proxy
-from .utils import extract_metadata, generate_markdown, valid_type
-from .extractor import get_page_sync, get_page
+from .proxy import Proxy, ProxyPool
+from .browser import BrowserPool
+from .utils import valid_type
+from .convert import convert_page
+from .pool import ConversionPool
+from . import extractor, tracing
+from .extractor import FetchMode, get_page_sync, get_page, get_page_stream, get_page_stream_sync
 
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, HttpUrl, TypeAdapter
 
 
-class BaseSearchResult(BaseModel):
-    title: str
-    link: HttpUrl
-    description: str | None = None
-    _proxy: Proxy | None = None
+# Set to a ConversionPool to convert pages on it by default
+default_conversion_pool: ConversionPool | None = None
+
+Converted = tuple[str, dict]  # A page's markdown and metadata
+
+
+_HTTP_URL = TypeAdapter(HttpUrl)
+
+
+class _Formatting:
+    """
+    The markdown and JSON of a result, for anything with a `title`, `link` and `description`.
+    """
+
+    __slots__ = ()
 
     def __str__(self):
         """
-        This is here to hide _proxy, which is more of an implementation detail.
+        This is here to hide _proxy and _browser_pool, which are more of an implementation detail.
         """
         return f'{self.__class__.__name__}(title="{self.title}", link="{self.link}", description="{self.description}")'
 
@@ -28,21 +44,12 @@ class BaseSearchResult(BaseModel):
             parts.append(f'**Description:** {self.description}')
         return '\n'.join(parts)
 
-    def _extended_markdown(
-        self,
-        page_source: str,
-        content_length: int,
-        only_page_content: bool = False,
-        ignore_links: bool = False,
-        ignore_images: bool = True,
-    ) -> str:
-        markdown = generate_markdown(page_source, ignore_links, ignore_images)
+    def _extended_markdown(self, page: Converted, content_length: int, only_page_content: bool = False) -> str:
+        markdown, metadata = page
 
         if only_page_content:
             return markdown[:content_length]
 
-        metadata = extract_metadata(page_source)
-
         parts = [f'**Title:** {metadata.get("title") or self.title}', f'**Link:** {self.link}']
 
         if metadata.get('description'):
@@ -62,11 +69,8 @@ class BaseSearchResult(BaseModel):
 
         return '\n'.join(parts)
 
-    def _extended_json(
-        self, page_source: str, content_length: int, ignore_links: bool = False, ignore_images: bool = True
-    ) -> dict:
-        metadata = extract_metadata(page_source)
-        markdown = generate_markdown(page_source, ignore_links, ignore_images)
+    def _extended_json(self, page: Converted, content_length: int) -> dict:
+        markdown, metadata = page
 
         combined_data = {'title': metadata.get('title') or self.title, 'link': str(self.link)}
 
@@ -86,7 +90,175 @@ class BaseSearchResult(BaseModel):
         return combined_data
 
 
-class SearchResult(BaseSearchResult):
+class BaseSearchResult(_Formatting, BaseModel):
+    title: str
+    link: HttpUrl
+    description: str | None = None
+    _proxy: Proxy | ProxyPool | None = None
+    _browser_pool: BrowserPool | None = None
+
+
+class BaseCompactResult(_Formatting):
+    """
+    A search result without a pydantic model, for holding lots of them: it's a fraction of the size and much quicker
+    to create. `link` is only validated (as an `HttpUrl`) the first time it's read, and `model_dump` creates the
+    full model.
+    """
+
+    __slots__ = ('title', 'description', '_raw_link', '_link', '_proxy', '_browser_pool')
+    model: type[BaseSearchResult]
+
+    def __init__(self, title: str, link: str, description: str | None = None):
+        self.title = title
+        self.description = description
+        self._raw_link = link
+        self._link: HttpUrl | None = None
+        self._proxy: Proxy | ProxyPool | None = None
+        self._browser_pool: BrowserPool | None = None
+
+    @property
+    def link(self) -> HttpUrl:
+        if self._link is None:
+            self._link = _HTTP_URL.validate_python(self._raw_link)
+        return self._link
+
+    def to_model(self) -> BaseSearchResult:
+        result = self.model(title=self.title, link=self.link, description=self.description)
+        result._proxy, result._browser_pool = self._proxy, self._browser_pool
+        return result
+
+    def model_dump(self, **kwargs: Any) -> dict:
+        return self.to_model().model_dump(**kwargs)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, BaseCompactResult):
+            return NotImplemented
+        return (self.title, self._raw_link, self.description) == (other.title, other._raw_link, other.description)
+
+
+def convert_pages(
+    page_sources: list[str],
+    content_length: int,
+    ignore_links: bool = False,
+    ignore_images: bool = True,
+    conversion_pool: ConversionPool | None = None,
+) -> list[Converted]:
+    """
+    The markdown and metadata of each page, converted on `conversion_pool` (or `default_conversion_pool`) if set.
+
+    Only the start of the markdown is used, so each conversion stops soon after `content_length` characters.
+    """
+    conversion_pool = conversion_pool or default_conversion_pool
+    name = _conversion_name(content_length, ignore_links, ignore_images)
+    pages, missing = _cached_conversions(page_sources, name)
+
+    with _convert_span(page_sources, missing, conversion_pool):
+        if conversion_pool is None:
+            converted = [convert_page(page_sources[i], ignore_links, ignore_images, content_length) for i in missing]
+        else:
+            converted = conversion_pool.map(
+                convert_page,
+                [page_sources[i] for i in missing],
+                repeat(ignore_links),
+                repeat(ignore_images),
+                repeat(content_length),
+            )
+
+    return _store_conversions(page_sources, name, pages, missing, converted)
+
+
+async def async_convert_pages(
+    page_sources: list[str],
+    content_length: int,
+    ignore_links: bool = False,
+    ignore_images: bool = True,
+    conversion_pool: ConversionPool | None = None,
+) -> list[Converted]:
+    """
+    `convert_pages` for async code. With a pool the event loop awaits the conversions instead of running them, and
+    the page cache is read and written on a worker thread.
+    """
+    conversion_pool = conversion_pool or default_conversion_pool
+    cached = extractor.default_page_cache is not None
+    name = _conversion_name(content_length, ignore_links, ignore_images)
+
+    if cached:
+        pages, missing = await asyncio.to_thread(_cached_conversions, page_sources, name)
+    else:
+        pages, missing = _cached_conversions(page_sources, name)
+
+    with _convert_span(page_sources, missing, conversion_pool):
+        if conversion_pool is None:
+            converted = [convert_page(page_sources[i], ignore_links, ignore_images, content_length) for i in missing]
+        else:
+            converted = await conversion_pool.async_map(
+                convert_page,
+                [page_sources[i] for i in missing],
+                repeat(ignore_links),
+                repeat(ignore_images),
+                repeat(content_length),
+            )
+
+    if cached:
+        return await asyncio.to_thread(_store_conversions, page_sources, name, pages, missing, converted)
+    return _store_conversions(page_sources, name, pages, missing, converted)
+
+
+def _convert_span(page_sources: list[str], missing: list[int], conversion_pool: ConversionPool | None) -> tracing.Span:
+    return tracing.span(
+        'convert',
+        pages=len(missing),
+        cached=len(page_sources) - len(missing),
+        bytes=sum(len(page_sources[i]) for i in missing),
+        pool=conversion_pool.kind if conversion_pool else None,
+    )
+
+
+def _conversion_name(content_length: int, ignore_links: bool, ignore_images: bool) -> str:
+    return f'page:{ignore_links:d}{ignore_images:d}:{content_length}'
+
+
+def _cached_conversions(page_sources: list[str], name: str) -> tuple[list[Converted | None], list[int]]:
+    """
+    The pages the page cache has conversions for, and the indexes of the ones left to convert.
+    """
+    page_cache = extractor.default_page_cache
+    pages: list[Converted | None] = [None] * len(page_sources)
+    missing = []
+
+    for index, page_source in enumerate(page_sources):
+        found = False
+        if page_cache and page_source:
+            found, page = page_cache.get_derived(page_source, name)
+            if found:
+                pages[index] = tuple(page)
+
+        if not found:
+            missing.append(index)
+
+    return pages, missing
+
+
+def _store_conversions(
+    page_sources: list[str],
+    name: str,
+    pages: list[Converted | None],
+    missing: list[int],
+    converted: list[Converted],
+) -> list[Converted]:
+    page_cache = extractor.default_page_cache
+
+    for index, page in zip(missing, converted):
+        pages[index] = page
+        if page_cache and page_sources[index]:
+            page_cache.set_derived(page_sources[index], name, page)
+
+    return pages
+
+
+class _SyncOutputs:
+    __slots__ = ()
+
     def markdown(
         self,
         extend: bool = False,
@@ -94,12 +266,15 @@ class SearchResult(BaseSearchResult):
         ignore_links: bool = False,
         ignore_images: bool = True,
         only_page_content: bool = False,
+        fetch_mode: FetchMode = 'browser',
+        conversion_pool: ConversionPool | None = None,
     ) -> str:
         if not extend or not valid_type(str(self.link)):
             return self._basic_markdown()
 
-        page_source = get_page_sync(str(self.link), self._proxy)
-        return self._extended_markdown(page_source, content_length, only_page_content, ignore_links, ignore_images)
+        page_source = get_page_sync(str(self.link), self._proxy, self._browser_pool, fetch_mode)
+        [page] = convert_pages([page_source], content_length, ignore_links, ignore_images, conversion_pool)
+        return self._extended_markdown(page, content_length, only_page_content)
 
     def json(
         self,
@@ -107,16 +282,21 @@ class SearchResult(BaseSearchResult):
         content_length: int = 1_000,
         ignore_links: bool = False,
         ignore_images: bool = True,
+        fetch_mode: FetchMode = 'browser',
+        conversion_pool: ConversionPool | None = None,
         **kwargs: Any,
     ) -> dict:
         if not extend or not valid_type(str(self.link)):
-            return super().model_dump(**kwargs)
+            return self.model_dump(**kwargs)
 
-        page_source = get_page_sync(str(self.link), self._proxy)
-        return self._extended_json(page_source, content_length, ignore_links, ignore_images)
+        page_source = get_page_sync(str(self.link), self._proxy, self._browser_pool, fetch_mode)
+        [page] = convert_pages([page_source], content_length, ignore_links, ignore_images, conversion_pool)
+        return self._extended_json(page, content_length)
 
 
-class AsyncSearchResult(BaseSearchResult):
+class _AsyncOutputs:
+    __slots__ = ()
+
     async def markdown(
         self,
         extend: bool = False,
@@ -124,12 +304,15 @@ class AsyncSearchResult(BaseSearchResult):
         ignore_links: bool = False,
         ignore_images: bool = True,
         only_page_content: bool = False,
+        fetch_mode: FetchMode = 'browser',
+        conversion_pool: ConversionPool | None = None,
     ) -> str:
         if not extend or not valid_type(str(self.link)):
             return self._basic_markdown()
 
-        page_source = await get_page(str(self.link), self._proxy)
-        return self._extended_markdown(page_source, content_length, only_page_content, ignore_links, ignore_images)
+        page_source = await get_page(str(self.link), self._proxy, self._browser_pool, fetch_mode)
+        [page] = await async_convert_pages([page_source], content_length, ignore_links, ignore_images, conversion_pool)
+        return self._extended_markdown(page, content_length, only_page_content)
 
     async def json(
         self,
@@ -137,21 +320,57 @@ class AsyncSearchResult(BaseSearchResult):
         content_length: int = 1_000,
         ignore_links: bool = False,
         ignore_images: bool = True,
+        fetch_mode: FetchMode = 'browser',
+        conversion_pool: ConversionPool | None = None,
         **kwargs: Any,
     ) -> dict:
         if not extend or not valid_type(str(self.link)):
-            return super().model_dump(**kwargs)
+            return self.model_dump(**kwargs)
+
+        page_source = await get_page(str(self.link), self._proxy, self._browser_pool, fetch_mode)
+        [page] = await async_convert_pages([page_source], content_length, ignore_links, ignore_images, conversion_pool)
+        return self._extended_json(page, content_length)
+
 
-        page_source = await get_page(str(self.link), self._proxy)
-        return self._extended_json(page_source, content_length, ignore_links, ignore_images)
+class SearchResult(_SyncOutputs, BaseSearchResult):
+    pass
+
+
+class AsyncSearchResult(_AsyncOutputs, BaseSearchResult):
+    pass
+
+
+class CompactSearchResult(_SyncOutputs, BaseCompactResult):
+    __slots__ = ()
+    model = SearchResult
+
+
+class AsyncCompactSearchResult(_AsyncOutputs, BaseCompactResult):
+    __slots__ = ()
+    model = AsyncSearchResult
 
 
 class SearchResults(list):
-    def __init__(self, results: list[SearchResult], _proxy: Proxy | None = None):
+    def __init__(
+        self,
+        results: list[SearchResult | CompactSearchResult],
+        _proxy: Proxy | ProxyPool | None = None,
+        _browser_pool: BrowserPool | None = None,
+    ):
         super().__init__(results)
         self._proxy = _proxy
+        self._browser_pool = _browser_pool
 
-    def markdown(self, extend: bool = False, content_length: int = 1_000, **kwargs) -> str:
+    def markdown(
+        self,
+        extend: bool = False,
+        content_length: int = 1_000,
+        fetch_mode: FetchMode = 'browser',
+        ignore_links: bool = False,
+        ignore_images: bool = True,
+        only_page_content: bool = False,
+        conversion_pool: ConversionPool | None = None,
+    ) -> str:
         if not self:  # Edge case for no search results
             return ''
 
@@ -159,49 +378,160 @@ class SearchResults(list):
             content = [result._basic_markdown() for result in self]
 
         else:
-            page_sources = get_page_sync([str(result.link) for result in self], self._proxy)
+            page_sources = get_page_sync(
+                [str(result.link) for result in self], self._proxy, self._browser_pool, fetch_mode
+            )
+            pages = convert_pages(page_sources, content_length, ignore_links, ignore_images, conversion_pool)
             content = [
-                result._extended_markdown(page_source=page_source, content_length=content_length, **kwargs)
-                for result, page_source in zip(self, page_sources)
+                result._extended_markdown(page, content_length, only_page_content) for result, page in zip(self, pages)
             ]
 
         return '# Search Results\n\n' + '\n----------\n'.join(content)
 
-    def json(self, extend: bool = False, content_length: int = 1_000, **kwargs) -> list[dict]:
+    def json(
+        self,
+        extend: bool = False,
+        content_length: int = 1_000,
+        fetch_mode: FetchMode = 'browser',
+        ignore_links: bool = False,
+        ignore_images: bool = True,
+        conversion_pool: ConversionPool | None = None,
+    ) -> list[dict]:
         if not extend:
             return [result.model_dump() for result in self]
 
-        page_sources = get_page_sync([str(result.link) for result in self], self._proxy)
-        return [
-            result._extended_json(page_source=page_source, content_length=content_length, **kwargs)
-            for result, page_source in zip(self, page_sources)
-        ]
+        page_sources = get_page_sync([str(result.link) for result in self], self._proxy, self._browser_pool, fetch_mode)
+        pages = convert_pages(page_sources, content_length, ignore_links, ignore_images, conversion_pool)
+        return [result._extended_json(page, content_length) for result, page in zip(self, pages)]
+
+    def markdown_stream(
+        self,
+        content_length: int = 1_000,
+        fetch_mode: FetchMode = 'browser',
+        ignore_links: bool = False,
+        ignore_images: bool = True,
+        only_page_content: bool = False,
+        conversion_pool: ConversionPool | None = None,
+    ) -> Iterator[tuple[int, str]]:
+        """
+        Yields `(rank, markdown)` for each result as soon as its page is fetched and converted, instead of waiting
+        for the slowest page like `markdown(extend=True)`. `rank` is the result's index in this list.
+        """
+        for index, page_source in self._page_stream(fetch_mode):
+            [page] = convert_pages([page_source], content_length, ignore_links, ignore_images, conversion_pool)
+            yield index, self[index]._extended_markdown(page, content_length, only_page_content)
+
+    def json_stream(
+        self,
+        content_length: int = 1_000,
+        fetch_mode: FetchMode = 'browser',
+        ignore_links: bool = False,
+        ignore_images: bool = True,
+        conversion_pool: ConversionPool | None = None,
+    ) -> Iterator[tuple[int, dict]]:
+        """
+        Yields `(rank, json)` for each result as soon as its page is fetched and converted, instead of waiting
+        for the slowest page like `json(extend=True)`. `rank` is the result's index in this list.
+        """
+        for index, page_source in self._page_stream(fetch_mode):
+            [page] = convert_pages([page_source], content_length, ignore_links, ignore_images, conversion_pool)
+            yield index, self[index]._extended_json(page, content_length)
+
+    def _page_stream(self, fetch_mode: FetchMode) -> Iterator[tuple[int, str]]:
+        return get_page_stream_sync([str(result.link) for result in self], self._proxy, self._browser_pool, fetch_mode)
 
 
 class AsyncSearchResults(list):
-    def __init__(self, results: list[AsyncSearchResult], _proxy: Proxy | None = None):
+    def __init__(
+        self,
+        results: list[AsyncSearchResult | AsyncCompactSearchResult],
+        _proxy: Proxy | ProxyPool | None = None,
+        _browser_pool: BrowserPool | None = None,
+    ):
         super().__init__(results)
         self._proxy = _proxy
+        self._browser_pool = _browser_pool
 
-    async def markdown(self, extend: bool = False, content_length: int = 1_000, **kwargs) -> str:
+    async def markdown(
+        self,
+        extend: bool = False,
+        content_length: int = 1_000,
+        fetch_mode: FetchMode = 'browser',
+        ignore_links: bool = False,
+        ignore_images: bool = True,
+        only_page_content: bool = False,
+        conversion_pool: ConversionPool | None = None,
+    ) -> str:
         if not extend:
             content = [result._basic_markdown() for result in self]
 
         else:
-            page_sources = await get_page([str(result.link) for result in self], self._proxy)
+            page_sources = await get_page(
+                [str(result.link) for result in self], self._proxy, self._browser_pool, fetch_mode
+            )
+            pages = await async_convert_pages(
+                page_sources, content_length, ignore_links, ignore_images, conversion_pool
+            )
             content = [
-                result._extended_markdown(page_source=page_source, content_length=content_length, **kwargs)
-                for result, page_source in zip(self, page_sources)
+                result._extended_markdown(page, content_length, only_page_content) for result, page in zip(self, pages)
             ]
 
         return '# Search Results\n\n' + '\n----------\n'.join(content)
 
-    async def json(self, extend: bool = False, content_length: int = 1_000, **kwargs) -> list[dict]:
+    async def json(
+        self,
+        extend: bool = False,
+        content_length: int = 1_000,
+        fetch_mode: FetchMode = 'browser',
+        ignore_links: bool = False,
+        ignore_images: bool = True,
+        conversion_pool: ConversionPool | None = None,
+    ) -> list[dict]:
         if not extend:
             return [result.model_dump() for result in self]
 
-        page_sources = await get_page([str(result.link) for result in self], self._proxy)
-        return [
-            result._extended_json(page_source=page_source, content_length=content_length, **kwargs)
-            for result, page_source in zip(self, page_sources)
-        ]
+        page_sources = await get_page(
+            [str(result.link) for result in self], self._proxy, self._browser_pool, fetch_mode
+        )
+        pages = await async_convert_pages(page_sources, content_length, ignore_links, ignore_images, conversion_pool)
+        return [result._extended_json(page, content_length) for result, page in zip(self, pages)]
+
+    async def markdown_stream(
+        self,
+        content_length: int = 1_000,
+        fetch_mode: FetchMode = 'browser',
+        ignore_links: bool = False,
+        ignore_images: bool = True,
+        only_page_content: bool = False,
+        conversion_pool: ConversionPool | None = None,
+    ) -> AsyncIterator[tuple[int, str]]:
+        """
+        Yields `(rank, markdown)` for each result as soon as its page is fetched and converted, instead of waiting
+        for the slowest page like `markdown(extend=True)`. `rank` is the result's index in this list.
+        """
+        async for index, page_source in self._page_stream(fetch_mode):
+            [page] = await async_convert_pages(
+                [page_source], content_length, ignore_links, ignore_images, conversion_pool
+            )
+            yield index, self[index]._extended_markdown(page, content_length, only_page_content)
+
+    async def json_stream(
+        self,
+        content_length: int = 1_000,
+        fetch_mode: FetchMode = 'browser',
+        ignore_links: bool = False,
+        ignore_images: bool = True,
+        conversion_pool: ConversionPool | None = None,
+    ) -> AsyncIterator[tuple[int, dict]]:
+        """
+        Yields `(rank, json)` for each result as soon as its page is fetched and converted, instead of waiting
+        for the slowest page like `json(extend=True)`. `rank` is the result's index in this list.
+        """
+        async for index, page_source in self._page_stream(fetch_mode):
+            [page] = await async_convert_pages(
+                [page_source], content_length, ignore_links, ignore_images, conversion_pool
+            )
+            yield index, self[index]._extended_json(page, content_length)
+
+    def _page_stream(self, fetch_mode: FetchMode) -> AsyncIterator[tuple[int, str]]:
+        return get_page_stream([str(result.link) for result in self], self._proxy, self._browser_pool, fetch_mode)
@@ -1,103 +1,1136 @@
+import math
 import time
 import random
 import asyncio
+import threading
 from functools import partial
+from contextvars import copy_context
+from contextlib import contextmanager
+from dataclasses import dataclass
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import AsyncIterator, Iterable, Iterator, Literal, NamedTuple
 
 import curl_cffi as curl
 from curl_cffi.requests.exceptions import HTTPError
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception
 
-from .proxy import Proxy
-from .filters import Filters
-from .parse import parse_search
-from .search_result import SearchResult, SearchResults, AsyncSearchResult, AsyncSearchResults
+from .proxy import Proxy, ProxyPool, use_proxy
+from .browser import BrowserPool
+from .filters import Filters, MAX_QUERY_LENGTH
+from .parse import parse_search, is_blocked, BLOCK_STATUSES
+from .cache import SearchCache
+from . import replay, tracing
+from .ratelimit import RateLimiter
+from .hedging import Hedging
+from .search_result import (
+    SearchResult,
+    SearchResults,
+    AsyncSearchResult,
+    AsyncSearchResults,
+    CompactSearchResult,
+    AsyncCompactSearchResult,
+)
 
 
 BASE_URL = 'https://lite.duckduckgo.com/lite/'
 SLEEP_TIME = 0.25
 
+# How many parts of a split query are searched at once
+MAX_FAN_OUT = 8
+
+# Threads a `SearchClient` with `hedging` makes its requests on, hedges included
+HEDGE_WORKERS = 64
+
 HEADERS = {'origin': 'https://lite.duckduckgo.com', 'referer': 'https://lite.duckduckgo.com/'}
 
+
+def _blocked(error: BaseException) -> bool:
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return isinstance(error, SearchBlocked) or (isinstance(error, HTTPError) and status in BLOCK_STATUSES)
+
+
+def _failed(error: BaseException) -> bool:
+    return isinstance(error, HTTPError) and not _blocked(error)
+
+
+# Retries a request on the same session and proxy, which is no use once DuckDuckGo has blocked it
 retry_curl = partial(
     retry,
     stop=stop_after_attempt(2),
     wait=wait_fixed(2),
-    retry=retry_if_exception_type(HTTPError),
+    retry=retry_if_exception(_failed),
+    before_sleep=tracing.count_retry,
+    reraise=True,
+)
+
+# Retries a blocked request from the start, so it waits for the rate limiter and picks its proxy again
+retry_blocked = partial(
+    retry,
+    stop=stop_after_attempt(2),
+    wait=wait_fixed(2),
+    retry=retry_if_exception(_blocked),
+    before_sleep=tracing.count_retry,
     reraise=True,
 )
 
 
+class SearchBlocked(HTTPError):
+    """
+    DuckDuckGo served its anomaly (bot challenge) page or a 202 instead of results. Like a 403 or 429, it's retried
+    through the rate limiter and a fresh pick of proxy, and a `ProxyPool` quarantines the proxy it came through.
+    """
+
+    blocked = True
+
+
+class SearchJob(NamedTuple):
+    query: str = ''
+    filters: Filters | None = None
+    count: int = 10
+    proxy: Proxy | ProxyPool | None = None
+
+
+@dataclass
+class BatchResult:
+    index: int
+    job: SearchJob
+    results: SearchResults | AsyncSearchResults | None = None
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _Pagination:
+    """
+    Reads results pages that were requested in parallel in order. `covered` is where the results read so far end,
+    and the next pages are planned `page_size` apart from there. A page that comes back short (DuckDuckGo drops
+    some results) leaves a gap before the next one, so the page from where it ended is requested first, and the
+    results that overlap are dropped.
+    """
+
+    def __init__(self, offset: int, count: int):
+        self.covered = offset
+        self.count = count
+        self.found = 0
+        self.page_size = 0
+        self.seen: set[str] = set()
+
+    @property
+    def done(self) -> bool:
+        return self.found >= self.count
+
+    def plan(self) -> list[int]:
+        """
+        The offsets of the pages that would get the rest of `count`, if none of them were short.
+        """
+        pages = math.ceil((self.count - self.found) / self.page_size)
+        return [self.covered + page * self.page_size for page in range(pages)]
+
+    def next(self, offsets: Iterable[int]) -> tuple[int | None, list[int]]:
+        """
+        Of the requested `offsets`, the one to read next (None if there's a gap to request first), and the ones
+        behind it that aren't needed any more.
+        """
+        behind = [offset for offset in offsets if offset <= self.covered]
+        if not behind:
+            return None, []
+
+        latest = max(behind)
+        return latest, [offset for offset in behind if offset != latest]
+
+    def add(self, offset: int, rows: list[dict]) -> list[dict]:
+        """
+        The rows of the page at `offset` that weren't in an earlier page, up to `count`.
+        """
+        self.page_size = self.page_size or len(rows)
+        self.covered = max(self.covered, offset + len(rows))
+
+        new_rows = []
+        for row in rows:
+            if row['link'] not in self.seen:
+                self.seen.add(row['link'])
+                new_rows.append(row)
+
+        new_rows = new_rows[: self.count - self.found]
+        self.found += len(new_rows)
+        return new_rows
+
+
+class SearchClient:
+    """
+    Keeps curl sessions alive between searches, so TLS sessions and connections to DuckDuckGo are reused.
+
+    Sessions are pooled per proxy. A session is only used by one thread at a time, so a client can be
+    shared between threads. With a `rate_limiter`, every request waits for a token instead of sleeping
+    `SLEEP_TIME` between pages. With a `cache`, results pages are looked up there before being requested.
+    With `compact`, results are `CompactSearchResult`s, which are lighter for holding lots of them.
+
+    Queries longer than `max_query_length` characters or `max_query_terms` terms are split into smaller ones
+    (see `Filters.split`), which are searched at the same time and their results merged.
+
+    With `parallel_pages` over 1, the results pages after the first are requested that many at a time, without
+    sleeping between them (a `rate_limiter` still paces them).
+
+    With `hedging`, a request that's slow to be answered is sent again, and the first response is used (see
+    `Hedging`).
+    """
+
+    def __init__(
+        self,
+        max_idle_sessions: int = 4,
+        rate_limiter: RateLimiter | None = None,
+        cache: SearchCache | None = None,
+        compact: bool = False,
+        max_query_length: int = MAX_QUERY_LENGTH,
+        max_query_terms: int | None = None,
+        parallel_pages: int = 1,
+        hedging: Hedging | None = None,
+    ):
+        self.max_idle_sessions = max_idle_sessions
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.result_class = CompactSearchResult if compact else SearchResult
+        self.max_query_length = max_query_length
+        self.max_query_terms = max_query_terms
+        self.parallel_pages = parallel_pages
+        self.hedging = hedging
+        self._idle: dict[str | None, list[curl.Session]] = {}
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def search(
+        self,
+        query: str = '',
+        filters: Filters | None = None,
+        count: int = 10,
+        offset: int = 0,
+        proxy: Proxy | ProxyPool | None = None,
+        browser_pool: BrowserPool | None = None,
+        cache: SearchCache | Literal[False] | None = None,
+    ) -> SearchResults:
+        """
+        `cache` overrides the client's cache for this call, and `False` skips caching.
+        """
+        return self._search(query, filters, count, offset, proxy, browser_pool, self.rate_limiter, self._cache(cache))
+
+    def search_iter(
+        self,
+        query: str = '',
+        filters: Filters | None = None,
+        count: int = 10,
+        offset: int = 0,
+        proxy: Proxy | ProxyPool | None = None,
+        browser_pool: BrowserPool | None = None,
+        cache: SearchCache | Literal[False] | None = None,
+    ) -> Iterator[SearchResult]:
+        """
+        Yields results as each results page is parsed. Pages are only requested when more results are pulled,
+        so stopping early skips the remaining pages.
+        """
+        return self._iter(query, filters, count, offset, proxy, browser_pool, self.rate_limiter, self._cache(cache))
+
+    def search_many(
+        self,
+        jobs: Iterable[SearchJob | tuple],
+        proxy: Proxy | ProxyPool | None = None,
+        browser_pool: BrowserPool | None = None,
+        max_workers: int = 8,
+        rate_limiter: RateLimiter | None = None,
+    ) -> Iterator[BatchResult]:
+        """
+        Run (query, filters, count[, proxy]) jobs on a thread pool and yield their results as they finish.
+        All requests share one rate limiter. A failed job is yielded with its error instead of raising.
+        """
+        rate_limiter = rate_limiter or self.rate_limiter or RateLimiter()
+
+        def run(index: int, job: SearchJob) -> BatchResult:
+            try:
+                results = self._search(
+                    job.query, job.filters, job.count, 0, job.proxy or proxy, browser_pool, rate_limiter, self.cache
+                )
+            except Exception as e:
+                return BatchResult(index, job, error=e)
+            return BatchResult(index, job, results)
+
+        with ThreadPoolExecutor(max_workers) as executor:
+            # Each job runs in a copy of this context, so tracing sees it as part of this call
+            futures = [executor.submit(copy_context().run, run, i, SearchJob(*job)) for i, job in enumerate(jobs)]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def _search(
+        self,
+        query: str,
+        filters: Filters | None,
+        count: int,
+        offset: int,
+        proxy: Proxy | ProxyPool | None,
+        browser_pool: BrowserPool | None,
+        rate_limiter: RateLimiter | None,
+        cache: SearchCache | None,
+    ) -> SearchResults:
+        results = self._iter(query, filters, count, offset, proxy, browser_pool, rate_limiter, cache)
+        return SearchResults(results=list(results), _proxy=proxy, _browser_pool=browser_pool)
+
+    def _iter(
+        self,
+        query: str,
+        filters: Filters | None,
+        count: int,
+        offset: int,
+        proxy: Proxy | ProxyPool | None,
+        browser_pool: BrowserPool | None,
+        rate_limiter: RateLimiter | None,
+        cache: SearchCache | None,
+    ) -> Iterator[SearchResult]:
+        parts = filters.split(query, self.max_query_length, self.max_query_terms) if filters else [filters]
+        if len(parts) == 1:
+            return self._iter_pages(query, filters, count, offset, proxy, browser_pool, rate_limiter, cache)
+
+        return self._fan_out(query, parts, count, offset, proxy, browser_pool, rate_limiter, cache)
+
+    def _fan_out(
+        self,
+        query: str,
+        parts: list[Filters],
+        count: int,
+        offset: int,
+        proxy: Proxy | ProxyPool | None,
+        browser_pool: BrowserPool | None,
+        rate_limiter: RateLimiter | None,
+        cache: SearchCache | None,
+    ) -> Iterator[SearchResult]:
+        """
+        Searches every part of a split query, and yields their results in turns (one from each part) without
+        duplicates. The parts are advanced together on a thread each, so their pages are requested at the same time.
+        """
+        live = [
+            self._iter_pages(query, part, offset + count, 0, proxy, browser_pool, rate_limiter, cache) for part in parts
+        ]
+        seen: set[str] = set()
+        found = 0
+
+        with ThreadPoolExecutor(min(len(live), MAX_FAN_OUT)) as executor:
+            while live:
+                futures = [executor.submit(copy_context().run, next, results, None) for results in live]
+                turn = [future.result() for future in futures]
+                live = [results for results, result in zip(live, turn) if result is not None]
+
+                for result in _unseen(turn, seen):
+                    if offset:
+                        offset -= 1
+                        continue
+
+                    yield result
+                    found += 1
+                    if found == count:
+                        return
+
+    def _iter_pages(
+        self,
+        query: str,
+        filters: Filters | None,
+        count: int,
+        offset: int,
+        proxy: Proxy | ProxyPool | None,
+        browser_pool: BrowserPool | None,
+        rate_limiter: RateLimiter | None,
+        cache: SearchCache | None,
+    ) -> Iterator[SearchResult]:
+        compiled_query = _compile_query(query, filters)
+        if self.parallel_pages > 1:
+            yield from self._iter_parallel_pages(
+                compiled_query, filters, count, offset, proxy, browser_pool, rate_limiter, cache
+            )
+            return
+
+        found = 0
+
+        while found < count:
+            new_results, requested = self._parse_page(compiled_query, filters, offset, proxy, rate_limiter, cache)
+            if not new_results:
+                return
+
+            for new_result in new_results:
+                yield _result(self.result_class, new_result, proxy, browser_pool)
+
+                found += 1
+                if found == count:
+                    return
+
+            offset += len(new_results)
+            if requested and not rate_limiter:
+                with tracing.span('search.sleep'):
+                    time.sleep(_sleep_time())
+
+    def _iter_parallel_pages(
+        self,
+        compiled_query: str,
+        filters: Filters | None,
+        count: int,
+        offset: int,
+        proxy: Proxy | ProxyPool | None,
+        browser_pool: BrowserPool | None,
+        rate_limiter: RateLimiter | None,
+        cache: SearchCache | None,
+    ) -> Iterator[SearchResult]:
+        """
+        Once the first page shows how many results a page has, the rest of the pages needed for `count` are
+        requested `parallel_pages` at a time on a thread pool, and read in order (see `_Pagination`).
+        """
+
+        def rows_at(page_offset: int) -> list[dict]:
+            return self._parse_page(compiled_query, filters, page_offset, proxy, rate_limiter, cache)[0]
+
+        pagination = _Pagination(offset, count)
+        if pagination.done:
+            return
+
+        rows = rows_at(offset)
+        for row in pagination.add(offset, rows):
+            yield _result(self.result_class, row, proxy, browser_pool)
+
+        if not rows:
+            return
+
+        with ThreadPoolExecutor(self.parallel_pages) as executor:
+            while not pagination.done:
+                futures = {
+                    page_offset: executor.submit(copy_context().run, rows_at, page_offset)
+                    for page_offset in pagination.plan()
+                }
+                try:
+                    while futures and not pagination.done:
+                        page_offset, behind = pagination.next(futures)
+                        for stale in behind:
+                            futures.pop(stale).cancel()
+
+                        if page_offset is None:
+                            page_offset = pagination.covered
+                            rows = rows_at(page_offset)
+                        else:
+                            rows = futures.pop(page_offset).result()
+
+                        if not rows:
+                            return
+
+                        for row in pagination.add(page_offset, rows):
+                            yield _result(self.result_class, row, proxy, browser_pool)
+                finally:
+                    for future in futures.values():
+                        future.cancel()
+
+    def _parse_page(
+        self,
+        compiled_query: str,
+        filters: Filters | None,
+        offset: int,
+        proxy: Proxy | ProxyPool | None,
+        rate_limiter: RateLimiter | None,
+        cache: SearchCache | None,
+    ) -> tuple[list[dict], bool]:
+        response, requested = self._get_results_page(
+            _form_data(compiled_query, filters, offset), proxy, rate_limiter, cache
+        )
+        with tracing.span('search.parse', bytes=len(response)) as span:
+            rows = parse_search(response)
+            span.set(results=len(rows))
+
+        return rows, requested
+
+    def _get_results_page(
+        self, data: dict, proxy: Proxy | ProxyPool | None, rate_limiter: RateLimiter | None, cache: SearchCache | None
+    ) -> tuple[str, bool]:
+        """
+        The results page for `data`, and whether it had to be requested (instead of coming from the cache).
+        """
+        transport = replay.default_transport
+        if transport is None:
+            return self._fetch_results_page(data, proxy, rate_limiter, cache)
+
+        requested = False
+
+        def request() -> str:
+            nonlocal requested
+            response, requested = self._fetch_results_page(data, proxy, rate_limiter, cache)
+            return response
+
+        return transport.search(data, request), requested
+
+    def _fetch_results_page(
+        self, data: dict, proxy: Proxy | ProxyPool | None, rate_limiter: RateLimiter | None, cache: SearchCache | None
+    ) -> tuple[str, bool]:
+        if cache:
+            key = SearchCache.key(data)
+            response = cache.get(key)
+            if response is not None:
+                return response, False
+
+        if self.hedging:
+            response = self._hedged_request(data, proxy, rate_limiter)
+        else:
+            response = self._send(data, proxy, rate_limiter)
+
+        if cache:
+            cache.set(key, response)
+
+        return response, True
+
+    @retry_blocked()
+    def _send(
+        self, data: dict, proxy: Proxy | ProxyPool | None, rate_limiter: RateLimiter | None, hedge: bool = False
+    ) -> str:
+        with use_proxy(proxy) as page_proxy:
+            if rate_limiter:
+                with tracing.span('search.rate_limit'):
+                    rate_limiter.acquire_sync(page_proxy)
+
+            with self._session(page_proxy) as session, _request_span(data, hedge):
+                start = time.monotonic()
+                response = _request(session, data, rate_limiter, page_proxy)
+
+        if self.hedging:
+            self.hedging.observe(time.monotonic() - start)
+        return response
+
+    def _hedged_request(self, data: dict, proxy: Proxy | ProxyPool | None, rate_limiter: RateLimiter | None) -> str:
+        """
+        Sends the request on a worker thread, and a hedge (on another session, or another proxy of a pool) if
+        there's no response within `hedging.delay()`. A request that's already been sent can't be stopped, so
+        the slower one is left to finish in the background, and its session is reused after.
+        """
+        executor = self._hedge_executor()
+        first = executor.submit(copy_context().run, self._send, data, proxy, rate_limiter)
+
+        done, _ = wait([first], timeout=self.hedging.delay())
+        if done or not self.hedging.allow():
+            return first.result()
+
+        second = executor.submit(copy_context().run, self._send, data, proxy, rate_limiter, True)
+        pending = {first, second}
+        error = None
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self.hedging.won()
+                    return future.result()
+                error = error or future.exception()
+
+        raise error
+
+    def _hedge_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(HEDGE_WORKERS, thread_name_prefix='search_ai_hedging')
+            return self._executor
+
+    def _cache(self, cache: SearchCache | Literal[False] | None) -> SearchCache | None:
+        return self.cache if cache is None else cache or None
+
+    def close(self) -> None:
+        with self._lock:
+            sessions = [session for idle in self._idle.values() for session in idle]
+            self._idle.clear()
+            executor, self._executor = self._executor, None
+
+        if executor:
+            executor.shutdown(wait=False)
+
+        for session in sessions:
+            session.close()
+
+    def __enter__(self) -> 'SearchClient':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @contextmanager
+    def _session(self, proxy: Proxy | None) -> Iterator[curl.Session]:
+        proxy_url = proxy.to_httpx_proxy_url() if proxy else None
+
+        with self._lock:
+            idle = self._idle.setdefault(proxy_url, [])
+            session = idle.pop() if idle else None
+
+        if session is None:
+            session = curl.Session(proxy=proxy_url)
+
+        try:
+            yield session
+        finally:
+            with self._lock:
+                keep = len(idle) < self.max_idle_sessions
+                if keep:
+                    idle.append(session)
+            if not keep:
+                session.close()
+
+
+class AsyncSearchClient:
+    """
+    Keeps one curl session per proxy (and event loop) alive between searches, so TLS sessions and connections
+    to DuckDuckGo are reused. A session runs up to `max_clients` requests at once. With a `rate_limiter`, every
+    request waits for a token instead of sleeping `SLEEP_TIME` between pages. With a `cache`, results pages are
+    looked up there before being requested. With `compact`, results are `AsyncCompactSearchResult`s, which are
+    lighter for holding lots of them.
+
+    Queries longer than `max_query_length` characters or `max_query_terms` terms are split into smaller ones
+    (see `Filters.split`), which are searched at the same time and their results merged.
+
+    With `parallel_pages` over 1, the results pages after the first are requested that many at a time, without
+    sleeping between them (a `rate_limiter` still paces them).
+
+    With `hedging`, a request that's slow to be answered is sent again, and the first response is used (see
+    `Hedging`).
+    """
+
+    def __init__(
+        self,
+        max_clients: int = 10,
+        rate_limiter: RateLimiter | None = None,
+        cache: SearchCache | None = None,
+        compact: bool = False,
+        max_query_length: int = MAX_QUERY_LENGTH,
+        max_query_terms: int | None = None,
+        parallel_pages: int = 1,
+        hedging: Hedging | None = None,
+    ):
+        self.max_clients = max_clients
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.result_class = AsyncCompactSearchResult if compact else AsyncSearchResult
+        self.max_query_length = max_query_length
+        self.max_query_terms = max_query_terms
+        self.parallel_pages = parallel_pages
+        self.hedging = hedging
+        self._sessions: dict[tuple[int, str | None, bool], curl.AsyncSession] = {}
+        self._closers: dict[int, tuple[asyncio.AbstractEventLoop, AsyncIterator[None]]] = {}
+        self._lock = threading.Lock()
+
+    async def search(
+        self,
+        query: str = '',
+        filters: Filters | None = None,
+        count: int = 10,
+        offset: int = 0,
+        proxy: Proxy | ProxyPool | None = None,
+        browser_pool: BrowserPool | None = None,
+        cache: SearchCache | Literal[False] | None = None,
+    ) -> AsyncSearchResults:
+        """
+        `cache` overrides the client's cache for this call, and `False` skips caching.
+        """
+        return await self._search(
+            query, filters, count, offset, proxy, browser_pool, self.rate_limiter, self._cache(cache)
+        )
+
+    def search_iter(
+        self,
+        query: str = '',
+        filters: Filters | None = None,
+        count: int = 10,
+        offset: int = 0,
+        proxy: Proxy | ProxyPool | None = None,
+        browser_pool: BrowserPool | None = None,
+        cache: SearchCache | Literal[False] | None = None,
+    ) -> AsyncIterator[AsyncSearchResult]:
+        """
+        Yields results as each results page is parsed. Pages are only requested when more results are pulled,
+        so stopping early skips the remaining pages.
+        """
+        return self._iter(query, filters, count, offset, proxy, browser_pool, self.rate_limiter, self._cache(cache))
+
+    async def search_many(
+        self,
+        jobs: Iterable[SearchJob | tuple],
+        proxy: Proxy | ProxyPool | None = None,
+        browser_pool: BrowserPool | None = None,
+        max_concurrency: int = 8,
+        rate_limiter: RateLimiter | None = None,
+    ) -> AsyncIterator[BatchResult]:
+        """
+        Run (query, filters, count[, proxy]) jobs concurrently and yield their results as they finish.
+        All requests share one rate limiter. A failed job is yielded with its error instead of raising.
+        """
+        rate_limiter = rate_limiter or self.rate_limiter or RateLimiter()
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(index: int, job: SearchJob) -> BatchResult:
+            async with semaphore:
+                try:
+                    results = await self._search(
+                        job.query,
+                        job.filters,
+                        job.count,
+                        0,
+                        job.proxy or proxy,
+                        browser_pool,
+                        rate_limiter,
+                        self.cache,
+                    )
+                except Exception as e:
+                    return BatchResult(index, job, error=e)
+                return BatchResult(index, job, results)
+
+        tasks = [asyncio.create_task(run(i, SearchJob(*job))) for i, job in enumerate(jobs)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _search(
+        self,
+        query: str,
+        filters: Filters | None,
+        count: int,
+        offset: int,
+        proxy: Proxy | ProxyPool | None,
+        browser_pool: BrowserPool | None,
+        rate_limiter: RateLimiter | None,
+        cache: SearchCache | None,
+    ) -> AsyncSearchResults:
+        results = self._iter(query, filters, count, offset, proxy, browser_pool, rate_limiter, cache)
+        return AsyncSearchResults(
+            results=[result async for result in results], _proxy=proxy, _browser_pool=browser_pool
+        )
+
+    def _iter(
+        self,
+        query: str,
+        filters: Filters | None,
+        count: int,
+        offset: int,
+        proxy: Proxy | ProxyPool | None,
+        browser_pool: BrowserPool | None,
+        rate_limiter: RateLimiter | None,
+        cache: SearchCache | None,
+    ) -> AsyncIterator[AsyncSearchResult]:
+        parts = filters.split(query, self.max_query_length, self.max_query_terms) if filters else [filters]
+        if len(parts) == 1:
+            return self._iter_pages(query, filters, count, offset, proxy, browser_pool, rate_limiter, cache)
+
+        return self._fan_out(query, parts, count, offset, proxy, browser_pool, rate_limiter, cache)
+
+    async def _fan_out(
+        self,
+        query: str,
+        parts: list[Filters],
+        count: int,
+        offset: int,
+        proxy: Proxy | ProxyPool | None,
+        browser_pool: BrowserPool | None,
+        rate_limiter: RateLimiter | None,
+        cache: SearchCache | None,
+    ) -> AsyncIterator[AsyncSearchResult]:
+        """
+        Searches every part of a split query, and yields their results in turns (one from each part) without
+        duplicates. The parts are advanced together, so their pages are requested at the same time.
+        """
+        live = [
+            self._iter_pages(query, part, offset + count, 0, proxy, browser_pool, rate_limiter, cache) for part in parts
+        ]
+        seen: set[str] = set()
+        found = 0
+        semaphore = asyncio.Semaphore(MAX_FAN_OUT)
+
+        async def advance(results: AsyncIterator[AsyncSearchResult]) -> AsyncSearchResult | None:
+            async with semaphore:
+                return await anext(results, None)
+
+        while live:
+            turn = await asyncio.gather(*(advance(results) for results in live))
+            live = [results for results, result in zip(live, turn) if result is not None]
+
+            for result in _unseen(turn, seen):
+                if offset:
+                    offset -= 1
+                    continue
+
+                yield result
+                found += 1
+                if found == count:
+                    return
+
+    async def _iter_pages(
+        self,
+        query: str,
+        filters: Filters | None,
+        count: int,
+        offset: int,
+        proxy: Proxy | ProxyPool | None,
+        browser_pool: BrowserPool | None,
+        rate_limiter: RateLimiter | None,
+        cache: SearchCache | None,
+    ) -> AsyncIterator[AsyncSearchResult]:
+        compiled_query = _compile_query(query, filters)
+        if self.parallel_pages > 1:
+            async for result in self._iter_parallel_pages(
+                compiled_query, filters, count, offset, proxy, browser_pool, rate_limiter, cache
+            ):
+                yield result
+            return
+
+        found = 0
+
+        while found < count:
+            new_results, requested = await self._parse_page(compiled_query, filters, offset, proxy, rate_limiter, cache)
+            if not new_results:
+                return
+
+            for new_result in new_results:
+                yield _result(self.result_class, new_result, proxy, browser_pool)
+
+                found += 1
+                if found == count:
+                    return
+
+            offset += len(new_results)
+            if requested and not rate_limiter:
+                with tracing.span('search.sleep'):
+                    await asyncio.sleep(_sleep_time())
+
+    async def _iter_parallel_pages(
+        self,
+        compiled_query: str,
+        filters: Filters | None,
+        count: int,
+        offset: int,
+        proxy: Proxy | ProxyPool | None,
+        browser_pool: BrowserPool | None,
+        rate_limiter: RateLimiter | None,
+        cache: SearchCache | None,
+    ) -> AsyncIterator[AsyncSearchResult]:
+        """
+        Once the first page shows how many results a page has, the rest of the pages needed for `count` are
+        requested `parallel_pages` at a time, and read in order (see `_Pagination`).
+        """
+        semaphore = asyncio.Semaphore(self.parallel_pages)
+
+        async def rows_at(page_offset: int) -> list[dict]:
+            async with semaphore:
+                rows, _ = await self._parse_page(compiled_query, filters, page_offset, proxy, rate_limiter, cache)
+            return rows
+
+        pagination = _Pagination(offset, count)
+        if pagination.done:
+            return
+
+        rows = await rows_at(offset)
+        for row in pagination.add(offset, rows):
+            yield _result(self.result_class, row, proxy, browser_pool)
+
+        if not rows:
+            return
+
+        while not pagination.done:
+            tasks = {page_offset: asyncio.create_task(rows_at(page_offset)) for page_offset in pagination.plan()}
+            try:
+                while tasks and not pagination.done:
+                    page_offset, behind = pagination.next(tasks)
+                    for stale in behind:
+                        tasks.pop(stale).cancel()
+
+                    if page_offset is None:
+                        page_offset = pagination.covered
+                        rows = await rows_at(page_offset)
+                    else:
+                        rows = await tasks.pop(page_offset)
+
+                    if not rows:
+                        return
+
+                    for row in pagination.add(page_offset, rows):
+                        yield _result(self.result_class, row, proxy, browser_pool)
+            finally:
+                for task in tasks.values():
+                    task.cancel()
+
+    async def _parse_page(
+        self,
+        compiled_query: str,
+        filters: Filters | None,
+        offset: int,
+        proxy: Proxy | ProxyPool | None,
+        rate_limiter: RateLimiter | None,
+        cache: SearchCache | None,
+    ) -> tuple[list[dict], bool]:
+        response, requested = await self._get_results_page(
+            _form_data(compiled_query, filters, offset), proxy, rate_limiter, cache
+        )
+        with tracing.span('search.parse', bytes=len(response)) as span:
+            rows = parse_search(response)
+            span.set(results=len(rows))
+
+        return rows, requested
+
+    async def _get_results_page(
+        self, data: dict, proxy: Proxy | ProxyPool | None, rate_limiter: RateLimiter | None, cache: SearchCache | None
+    ) -> tuple[str, bool]:
+        """
+        The results page for `data`, and whether it had to be requested (instead of coming from the cache).
+        """
+        transport = replay.default_transport
+        if transport is None:
+            return await self._fetch_results_page(data, proxy, rate_limiter, cache)
+
+        requested = False
+
+        async def request() -> str:
+            nonlocal requested
+            response, requested = await self._fetch_results_page(data, proxy, rate_limiter, cache)
+            return response
+
+        return await transport.async_search(data, request), requested
+
+    async def _fetch_results_page(
+        self, data: dict, proxy: Proxy | ProxyPool | None, rate_limiter: RateLimiter | None, cache: SearchCache | None
+    ) -> tuple[str, bool]:
+        if cache:
+            key = SearchCache.key(data)
+            response = await cache.async_get(key)
+            if response is not None:
+                return response, False
+
+        if self.hedging:
+            response = await self._hedged_request(data, proxy, rate_limiter)
+        else:
+            response = await self._send(data, proxy, rate_limiter)
+
+        if cache:
+            await cache.async_set(key, response)
+
+        return response, True
+
+    @retry_blocked()
+    async def _send(
+        self, data: dict, proxy: Proxy | ProxyPool | None, rate_limiter: RateLimiter | None, hedge: bool = False
+    ) -> str:
+        with use_proxy(proxy) as page_proxy:
+            if rate_limiter:
+                with tracing.span('search.rate_limit'):
+                    await rate_limiter.acquire(page_proxy)
+
+            with _request_span(data, hedge):
+                start = time.monotonic()
+                response = await _async_request(self._session(page_proxy, hedge), data, rate_limiter, page_proxy)
+
+        if self.hedging:
+            self.hedging.observe(time.monotonic() - start)
+        return response
+
+    async def _hedged_request(
+        self, data: dict, proxy: Proxy | ProxyPool | None, rate_limiter: RateLimiter | None
+    ) -> str:
+        """
+        Sends a hedge (on a session of its own, or another proxy of a pool) if there's no response within
+        `hedging.delay()`, and cancels whichever request is slower.
+        """
+        first = asyncio.ensure_future(self._send(data, proxy, rate_limiter))
+        second = None
+
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self.hedging.delay())
+            if done or not self.hedging.allow():
+                return await first
+
+            second = asyncio.ensure_future(self._send(data, proxy, rate_limiter, True))
+            pending = {first, second}
+            error = None
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedging.won()
+                        return task.result()
+                    error = error or task.exception()
+
+            raise error
+        finally:
+            for task in (first, second):
+                if task is not None:
+                    task.cancel()
+
+    def _cache(self, cache: SearchCache | Literal[False] | None) -> SearchCache | None:
+        return self.cache if cache is None else cache or None
+
+    async def close(self) -> None:
+        """
+        Close the sessions that belong to the running event loop and forget the ones whose loop is gone.
+        """
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            sessions = [session for session in self._sessions.values() if session.loop is loop]
+            self._sessions = {
+                key: session
+                for key, session in self._sessions.items()
+                if session.loop is not loop and not session.loop.is_closed()
+            }
+
+        for session in sessions:
+            await session.close()
+
+    async def __aenter__(self) -> 'AsyncSearchClient':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _session(self, proxy: Proxy | None, hedge: bool = False) -> curl.AsyncSession:
+        """
+        Hedges get sessions of their own, so they don't queue behind (or share a connection with) what they hedge.
+        """
+        loop = asyncio.get_running_loop()
+        key = (id(loop), proxy.to_httpx_proxy_url() if proxy else None, hedge)
+
+        with self._lock:
+            session = self._sessions.get(key)
+
+            if session is None or session.loop is not loop:
+                # Sessions are tied to their event loop, so drop the ones from loops that were closed
+                self._sessions = {k: s for k, s in self._sessions.items() if not s.loop.is_closed()}
+                self._closers = {k: c for k, c in self._closers.items() if not c[0].is_closed()}
+                session = curl.AsyncSession(loop=loop, proxy=key[1], max_clients=self.max_clients)
+                self._sessions[key] = session
+
+                if self._closers.get(id(loop), (None,))[0] is not loop:
+                    closer = self._close_at_shutdown()
+                    self._closers[id(loop)] = (loop, closer)
+                    asyncio.ensure_future(anext(closer))
+
+            return session
+
+    async def _close_at_shutdown(self) -> AsyncIterator[None]:
+        """
+        Closes the loop's sessions when the loop shuts down its async generators (as `asyncio.run` does before
+        closing it), so a client used from many `asyncio.run` calls doesn't keep a session open for each of them.
+        """
+        try:
+            yield
+        finally:
+            await self.close()
+
+
+_default_client = SearchClient()
+_default_async_client = AsyncSearchClient()
+
+
 def search(
     query: str = '',
     filters: Filters | None = None,
     count: int = 10,
     offset: int = 0,
-    proxy: Proxy | None = None,
+    proxy: Proxy | ProxyPool | None = None,
+    browser_pool: BrowserPool | None = None,
+    cache: SearchCache | Literal[False] | None = None,
 ) -> SearchResults:
-    results = SearchResults(results=[], _proxy=proxy)
-
-    compiled_filters = filters.compile_filters() if filters else ''
-    compiled_query = query + (f' {compiled_filters}' if compiled_filters else '')
+    return _default_client.search(query, filters, count, offset, proxy, browser_pool, cache)
 
-    while len(results) < count:
-        response = _request(compiled_query, filters, offset, proxy)
-        new_results = parse_search(response)
 
-        if not new_results:
-            return results
-
-        for new_result in new_results:
-            results.append(SearchResult(**new_result, _proxy=proxy))
-            if len(results) == count:
-                return results
-
-        offset += len(new_results)
+async def async_search(
+    query: str = '',
+    filters: Filters | None = None,
+    count: int = 10,
+    offset: int = 0,
+    proxy: Proxy | ProxyPool | None = None,
+    browser_pool: BrowserPool | None = None,
+    cache: SearchCache | Literal[False] | None = None,
+) -> AsyncSearchResults:
+    return await _default_async_client.search(query, filters, count, offset, proxy, browser_pool, cache)
 
-        twenty_percent = SLEEP_TIME * 0.10
-        time.sleep(random.uniform(SLEEP_TIME - twenty_percent, SLEEP_TIME + twenty_percent))
 
-    return results
+def search_iter(
+    query: str = '',
+    filters: Filters | None = None,
+    count: int = 10,
+    offset: int = 0,
+    proxy: Proxy | ProxyPool | None = None,
+    browser_pool: BrowserPool | None = None,
+    cache: SearchCache | Literal[False] | None = None,
+) -> Iterator[SearchResult]:
+    return _default_client.search_iter(query, filters, count, offset, proxy, browser_pool, cache)
 
 
-async def async_search(
+def async_search_iter(
     query: str = '',
     filters: Filters | None = None,
     count: int = 10,
     offset: int = 0,
-    proxy: Proxy | None = None,
-) -> AsyncSearchResults:
-    results = AsyncSearchResults(results=[], _proxy=proxy)
+    proxy: Proxy | ProxyPool | None = None,
+    browser_pool: BrowserPool | None = None,
+    cache: SearchCache | Literal[False] | None = None,
+) -> AsyncIterator[AsyncSearchResult]:
+    return _default_async_client.search_iter(query, filters, count, offset, proxy, browser_pool, cache)
+
+
+def search_many(
+    jobs: Iterable[SearchJob | tuple],
+    proxy: Proxy | ProxyPool | None = None,
+    browser_pool: BrowserPool | None = None,
+    max_workers: int = 8,
+    rate_limiter: RateLimiter | None = None,
+) -> Iterator[BatchResult]:
+    return _default_client.search_many(jobs, proxy, browser_pool, max_workers, rate_limiter)
+
+
+def async_search_many(
+    jobs: Iterable[SearchJob | tuple],
+    proxy: Proxy | ProxyPool | None = None,
+    browser_pool: BrowserPool | None = None,
+    max_concurrency: int = 8,
+    rate_limiter: RateLimiter | None = None,
+) -> AsyncIterator[BatchResult]:
+    return _default_async_client.search_many(jobs, proxy, browser_pool, max_concurrency, rate_limiter)
+
 
+def _compile_query(query: str, filters: Filters | None) -> str:
     compiled_filters = filters.compile_filters() if filters else ''
-    compiled_query = query + (f' {compiled_filters}' if compiled_filters else '')
+    return query + (f' {compiled_filters}' if compiled_filters else '')
 
-    while len(results) < count:
-        response = await _async_request(compiled_query, filters, offset, proxy)
-        new_results = parse_search(response)
 
-        if not new_results:
-            return results
+def _result(result_class: type, row: dict, proxy: Proxy | ProxyPool | None, browser_pool: BrowserPool | None):
+    result = result_class(**row)
+    result._proxy, result._browser_pool = proxy, browser_pool
+    return result
 
-        for new_result in new_results:
-            results.append(AsyncSearchResult(**new_result, _proxy=proxy))
-            if len(results) == count:
-                return results
 
-        offset += len(new_results)
+def _unseen(results: list, seen: set[str]) -> list:
+    """
+    The results whose links aren't in `seen` (skipping Nones), which are added to it.
+    """
+    unseen = []
+    for result in results:
+        if result is None:
+            continue
 
-        twenty_percent = SLEEP_TIME * 0.10
-        await asyncio.sleep(random.uniform(SLEEP_TIME - twenty_percent, SLEEP_TIME + twenty_percent))
+        link = str(result.link)
+        if link not in seen:
+            seen.add(link)
+            unseen.append(result)
 
-    return results
+    return unseen
 
 
-@retry_curl()
-def _request(
-    compiled_query: str,
-    filters: Filters | None,
-    offset: int,
-    proxy: Proxy | None,
-) -> str:
+def _sleep_time() -> float:
+    twenty_percent = SLEEP_TIME * 0.10
+    return random.uniform(SLEEP_TIME - twenty_percent, SLEEP_TIME + twenty_percent)
+
+
+def _form_data(compiled_query: str, filters: Filters | None, offset: int) -> dict:
     data = {'q': compiled_query}
 
     if offset:
@@ -110,32 +1143,47 @@ def _request(
         if filters.region:
             data['kl'] = filters.region.value
 
-    with curl.Session(proxy=proxy.to_httpx_proxy_url() if proxy else None) as session:
-        resp = session.post(BASE_URL, data=data, headers=HEADERS)
-        resp.raise_for_status()
-        return resp.text
+    return data
+
+
+def _request_span(data: dict, hedge: bool = False) -> tracing.Span:
+    span = tracing.span('search.request', url=BASE_URL, query=data['q'], offset=data.get('dc', 0), retries=0)
+    if hedge:
+        span.set(hedge=True)
+    return span
+
+
+def _check_response(resp, rate_limiter: RateLimiter | None, proxy: Proxy | None) -> None:
+    """
+    Raise if `resp` isn't a results page, and tell the rate limiter whether DuckDuckGo blocked it. A page without
+    results isn't a block, so a search can still end when the results run out.
+    """
+    tracing.annotate(status=resp.status_code, bytes=len(resp.content))
+    blocked = is_blocked(resp.status_code, resp.text)
+
+    if blocked:
+        tracing.annotate(blocked=True)
+    if rate_limiter and (blocked or resp.status_code < 400):
+        rate_limiter.record(proxy, blocked)
+
+    resp.raise_for_status()
+    if blocked:
+        raise SearchBlocked(f'DuckDuckGo blocked the search (status {resp.status_code})', 0, resp)
 
 
 @retry_curl()
-async def _async_request(
-    compiled_query: str,
-    filters: Filters | None,
-    offset: int,
-    proxy: Proxy | None,
+def _request(
+    session: curl.Session, data: dict, rate_limiter: RateLimiter | None = None, proxy: Proxy | None = None
 ) -> str:
-    data = {'q': compiled_query}
+    resp = session.post(BASE_URL, data=data, headers=HEADERS)
+    _check_response(resp, rate_limiter, proxy)
+    return resp.text
 
-    if offset:
-        data['s'] = offset - 1
-        data['dc'] = offset
 
-    if filters:
-        if filters.time_span:
-            data['df'] = filters.time_span.value
-        if filters.region:
-            data['kl'] = filters.region.value
-
-    async with curl.AsyncSession(proxy=proxy.to_httpx_proxy_url() if proxy else None) as session:
-        resp = await session.post(BASE_URL, data=data, headers=HEADERS)
-        resp.raise_for_status()
-        return resp.text
+@retry_curl()
+async def _async_request(
+    session: curl.AsyncSession, data: dict, rate_limiter: RateLimiter | None = None, proxy: Proxy | None = None
+) -> str:
+    resp = await session.post(BASE_URL, data=data, headers=HEADERS)
+    _check_response(resp, rate_limiter, proxy)
+    return resp.text
@@ -0,0 +1,150 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+
+@dataclass(eq=False)
+class Span:
+    """
+    One phase of a call, like a DuckDuckGo request or rendering a page. `attrs` holds what's known about it, such
+    as the `url`, `bytes`, `status` and `retries`, and `error` if the phase raised.
+    """
+
+    name: str
+    attrs: dict[str, Any] = field(default_factory=dict)
+    start: float = 0.0
+    end: float = 0.0
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> 'Span':
+        self._collectors = _collectors.get()
+        self._token = _current.set(self)
+        for hook in start_hooks:
+            hook(self)
+
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end = time.perf_counter()
+        _current.reset(self._token)
+
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+
+        for hook in hooks:
+            hook(self)
+        for collector in self._collectors:
+            collector.spans.append(self)
+
+
+class _NoSpan(Span):
+    """
+    What `span` returns when nothing is listening, so tracing costs next to nothing when it's off.
+    """
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def __enter__(self) -> '_NoSpan':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+@dataclass
+class Phase:
+    count: int = 0
+    total: float = 0.0  # Seconds, added up across concurrent spans too
+    max: float = 0.0
+
+
+class Timings:
+    """
+    Collects the spans of every call made inside `with Timings() as timings:`, including calls in tasks started
+    inside of it. Other calls (in other threads, or tasks started elsewhere) aren't mixed in.
+    """
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self.start = 0.0
+        self.end = 0.0
+
+    def __enter__(self) -> 'Timings':
+        self._token = _collectors.set(_collectors.get() + (self,))
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.end = time.perf_counter()
+        _collectors.reset(self._token)
+
+    @property
+    def wall(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def breakdown(self) -> dict[str, Phase]:
+        """
+        The number of spans, total seconds and slowest span of each phase, slowest phase first.
+        """
+        phases: dict[str, Phase] = {}
+        for span in self.spans:
+            phase = phases.setdefault(span.name, Phase())
+            phase.count += 1
+            phase.total += span.duration
+            phase.max = max(phase.max, span.duration)
+
+        return dict(sorted(phases.items(), key=lambda item: item[1].total, reverse=True))
+
+    def __str__(self) -> str:
+        lines = [f'{"phase":<20} {"count":>6} {"total ms":>10} {"max ms":>10}']
+        for name, phase in self.breakdown().items():
+            lines.append(f'{name:<20} {phase.count:>6} {phase.total * 1000:>10.1f} {phase.max * 1000:>10.1f}')
+        lines.append(f'{"wall":<20} {"":>6} {self.wall * 1000:>10.1f}')
+        return '\n'.join(lines)
+
+
+# Called with every finished span, from whichever thread or task finished it
+hooks: list[Callable[[Span], None]] = []
+
+# Called with every span as it starts. Spans are only created while `hooks` or a `Timings` is listening.
+start_hooks: list[Callable[[Span], None]] = []
+
+_NO_SPAN = _NoSpan('')
+_collectors: ContextVar[tuple[Timings, ...]] = ContextVar('search_ai_collectors', default=())
+_current: ContextVar[Span | None] = ContextVar('search_ai_span', default=None)
+
+
+def span(name: str, **attrs: Any) -> Span:
+    """
+    A span for the phase `name`, to use as a context manager. It's only timed if there is a hook or a `Timings`.
+    """
+    if not hooks and not _collectors.get():
+        return _NO_SPAN
+    return Span(name, attrs)
+
+
+def annotate(**attrs: Any) -> None:
+    """
+    Add `attrs` to the innermost open span, if there is one.
+    """
+    current = _current.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+
+def count_retry(retry_state: Any) -> None:
+    """
+    A tenacity `before_sleep` callback, which counts the retries of the innermost open span.
+    """
+    current = _current.get()
+    if current is not None:
+        current.attrs['retries'] = current.attrs.get('retries', 0) + 1
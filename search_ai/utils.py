@@ -1,6 +1,5 @@
 import mimetypes
 
-import html2text
 from lxml import html, etree
 
 
@@ -38,6 +37,8 @@ def valid_description_metadata(desc: str) -> bool:
 
 
 def generate_markdown(page_source: str, ignore_links: bool, ignore_images: bool) -> str:
+    import html2text  # Only needed when convert_page can't parse a page itself
+
     text_maker = html2text.HTML2Text()
     text_maker.ignore_links = ignore_links
     text_maker.ignore_images = ignore_images
@@ -45,6 +46,50 @@ def generate_markdown(page_source: str, ignore_links: bool, ignore_images: bool)
     return text_maker.handle(page_source).strip()
 
 
+# Elements whose text isn't shown on the page
+HIDDEN_TAGS = ('script', 'style', 'noscript', 'template')
+EMPTY_APP_ROOT_XPATH = (
+    '//body//*[@id="root" or @id="app" or @id="__next" or @id="__nuxt" or @id="app-root"][not(normalize-space())]'
+)
+NOSCRIPT_MARKERS = ('enable javascript', 'javascript is required', 'requires javascript', 'javascript is disabled')
+
+
+def sufficient_content(page_source: str, min_text_length: int = 500, min_text_density: float = 0.02) -> bool:
+    """
+    Decide if a page fetched without a browser already has its content, or if it needs to be rendered.
+    """
+    try:
+        tree = html.fromstring(page_source)
+    except Exception:
+        return False
+
+    bodies = tree.xpath('//body')
+    if not bodies:
+        return False
+
+    # Client-side apps ship an empty mount point and fill it in with JS
+    if tree.xpath(EMPTY_APP_ROOT_XPATH):
+        return False
+
+    # A page that asks for JavaScript also needs `min_text_density` worth of text
+    noscript = ' '.join(tree.xpath('//noscript//text()')).lower()
+    needed = min_text_length
+    if any(marker in noscript for marker in NOSCRIPT_MARKERS):
+        needed = max(needed, min_text_density * len(page_source))
+
+    etree.strip_elements(tree, *HIDDEN_TAGS, with_tail=False)
+
+    # Only counted until there's enough, which is early on for most pages worth reading
+    text_length = 0
+    for body in bodies:
+        for text in body.itertext():
+            text_length += len(text.strip())
+            if text_length >= needed:
+                return True
+
+    return text_length >= needed
+
+
 def valid_type(url: str) -> bool:
     """
     Currently, only text / html pages are supported for extended data retrival.
@@ -0,0 +1,136 @@
+import time
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from tenacity import wait_none
+
+import search_ai.searcher as searcher
+
+
+def lite_page(query: str, start: int, stop: int, sponsored: int = 1) -> str:
+    """
+    A DuckDuckGo lite results page with results `start` to `stop` (and some sponsored rows to skip).
+    """
+    rows = []
+
+    for i in range(sponsored):
+        rows.append(
+            '<tr class="result-sponsored"><td><a class="result-link" href="https://ads.example.com/">Ad</a></td></tr>'
+            '<tr class="result-sponsored"><td class="result-snippet">Sponsored</td></tr>'
+        )
+
+    for i in range(start, stop):
+        rows.append(
+            f'<tr><td><a class="result-link" href="https://example.com/{query}/{i}">{query} result {i}</a></td></tr>'
+            f'<tr><td class="result-snippet">Description {i}</td></tr>'
+        )
+
+    return f'<html><body><table>{"".join(rows)}</table></body></html>'
+
+
+ANOMALY_PAGE = (
+    '<html><body><div class="anomaly-modal__title">Unfortunately, bots use DuckDuckGo too.</div>'
+    '<form id="challenge-form" action="/anomaly.js"></form></body></html>'
+)
+
+
+class FakeResponse:
+    def __init__(self, text: str, status_code: int = 200):
+        self.text = text
+        self.content = text.encode()
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise searcher.HTTPError(f'HTTP Error {self.status_code}', 0, self)
+
+
+class FakeDuckDuckGo:
+    """
+    Stands in for lite.duckduckgo.com: every query has `total` results, served `page_size` at a time.
+    """
+
+    def __init__(self, total: int = 25, page_size: int = 10):
+        self.total = total
+        self.page_size = page_size
+        self.requests: list[dict] = []
+        self.posts = 0
+        self.sessions: list = []
+        self.failing_queries: set[str] = set()  # Forbidden (403)
+        self.broken_queries: set[str] = set()  # Internal Server Error (500)
+        self.blocked_queries: dict[str, int] = {}  # Query -> how many more times it gets the anomaly page
+        self.short_pages: dict[int, int] = {}  # Offset -> how many results that page has instead of `page_size`
+        self.stalls: dict[int, float] = {}  # Request number -> seconds it takes to be answered
+
+    def respond(self, data: dict) -> FakeResponse:
+        self.requests.append(dict(data))
+
+        if data['q'] in self.failing_queries:
+            return FakeResponse('Forbidden', 403)
+        if data['q'] in self.broken_queries:
+            return FakeResponse('Internal Server Error', 500)
+        if self.blocked_queries.get(data['q']):
+            self.blocked_queries[data['q']] -= 1
+            return FakeResponse(ANOMALY_PAGE)
+
+        start = int(data.get('dc', 0))
+        stop = min(start + self.short_pages.get(start, self.page_size), self.total)
+        return FakeResponse(lite_page(data['q'], start, stop))
+
+    def stall(self) -> float:
+        self.posts += 1
+        return self.stalls.get(self.posts - 1, 0)
+
+    def session(self, **kwargs):
+        server = self
+
+        class Session:
+            def __init__(self):
+                self.kwargs = kwargs
+                self.closed = False
+
+            def post(self, url, data=None, headers=None):
+                time.sleep(server.stall())
+                return server.respond(data)
+
+            def close(self):
+                self.closed = True
+
+        session = Session()
+        self.sessions.append(session)
+        return session
+
+    def async_session(self, loop=None, **kwargs):
+        server = self
+
+        class AsyncSession:
+            def __init__(self):
+                self.kwargs = kwargs
+                self.loop = loop or asyncio.get_running_loop()
+                self.closed = False
+
+            async def post(self, url, data=None, headers=None):
+                await asyncio.sleep(server.stall())
+                return server.respond(data)
+
+            async def close(self):
+                self.closed = True
+
+        session = AsyncSession()
+        self.sessions.append(session)
+        return session
+
+
+@pytest.fixture
+def duckduckgo(monkeypatch):
+    server = FakeDuckDuckGo()
+    monkeypatch.setattr(searcher, 'curl', SimpleNamespace(Session=server.session, AsyncSession=server.async_session))
+    monkeypatch.setattr(searcher, 'SLEEP_TIME', 0)
+    monkeypatch.setattr(searcher._request.retry, 'wait', wait_none())
+    monkeypatch.setattr(searcher._async_request.retry, 'wait', wait_none())
+    monkeypatch.setattr(searcher.SearchClient._send.retry, 'wait', wait_none())
+    monkeypatch.setattr(searcher.AsyncSearchClient._send.retry, 'wait', wait_none())
+    monkeypatch.setattr(searcher, '_default_client', searcher.SearchClient())
+    monkeypatch.setattr(searcher, '_default_async_client', searcher.AsyncSearchClient())
+    return server
@@ -0,0 +1,97 @@
+import pytest
+
+from search_ai.blocking import ResourceBlocker
+
+
+@pytest.mark.parametrize(
+    'resource_type, url, expected',
+    [
+        ('image', 'https://example.com/logo.png', True),
+        ('font', 'https://fonts.gstatic.com/s/roboto.woff2', True),
+        ('stylesheet', 'https://example.com/site.css', True),
+        ('media', 'https://example.com/intro.mp4', True),
+        ('script', 'https://example.com/app.js', False),
+        ('document', 'https://example.com/', False),
+        ('script', 'https://www.googletagmanager.com/gtm.js', True),
+        ('script', 'https://googletagmanager.com/gtm.js', True),
+        ('xhr', 'https://stats.g.doubleclick.net/collect', True),
+        ('script', 'https://notdoubleclick.net/app.js', False),
+        ('xhr', 'https://www.facebook.com/tr?id=1', True),
+        ('xhr', 'https://www.facebook.com/api/graphql', False),
+    ],
+)
+def test_blocks(resource_type, url, expected):
+    assert ResourceBlocker().blocks(resource_type, url) is expected
+
+
+def test_custom_rules():
+    blocker = ResourceBlocker(resource_types={'script'}, domains={'tracker.io'})
+
+    assert blocker.blocks('script', 'https://example.com/app.js')
+    assert blocker.blocks('xhr', 'https://a.tracker.io/hit')
+    assert not blocker.blocks('image', 'https://example.com/logo.png')
+
+
+class Frame:
+    def __init__(self, parent_frame=None):
+        self.parent_frame = parent_frame
+
+
+class Request:
+    def __init__(self, resource_type, url, navigation=False, frame=None):
+        self.resource_type = resource_type
+        self.url = url
+        self.navigation = navigation
+        self.frame = frame or Frame()
+
+    def is_navigation_request(self):
+        return self.navigation
+
+
+class Route:
+    def __init__(self):
+        self.outcome = None
+
+    async def abort(self, error_code=None):
+        self.outcome = 'aborted'
+
+    async def continue_(self):
+        self.outcome = 'continued'
+
+
+class Context:
+    async def route(self, url, handler):
+        self.handler = handler
+
+
+@pytest.mark.asyncio
+async def test_attach_counts_blocked_requests():
+    blocker = ResourceBlocker()
+    context = Context()
+    stats = await blocker.attach(context)
+
+    requests = [
+        Request('document', 'https://media.net/', navigation=True),
+        Request('image', 'https://media.net/a.png'),
+        Request('image', 'https://media.net/b.png'),
+        Request('script', 'https://media.net/app.js'),
+        Request('document', 'https://doubleclick.net/ad', navigation=True, frame=Frame(Frame())),
+    ]
+    routes = [Route() for _ in requests]
+
+    for route, request in zip(routes, requests):
+        await context.handler(route, request)
+
+    assert [route.outcome for route in routes] == ['continued', 'aborted', 'aborted', 'aborted', 'aborted']
+    assert stats.requests == 4
+    assert stats.by_type == {'image': 2, 'script': 1, 'document': 1}
+    assert stats.bytes > 0
+    assert blocker.totals == stats
+    assert blocker.pages == 1
+
+
+@pytest.mark.asyncio
+async def test_disabled_blocker_does_not_route():
+    context = Context()
+    await ResourceBlocker(enabled=False).attach(context)
+    assert not hasattr(context, 'handler')
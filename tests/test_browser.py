@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+import search_ai.browser as browser_module
+from search_ai import BrowserPool, Proxy
+
+
+class FakeBrowser:
+    def __init__(self, options):
+        self.options = options
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeChromium:
+    def __init__(self):
+        self.launched = []
+
+    async def launch(self, **options):
+        browser = FakeBrowser(options)
+        self.launched.append(browser)
+        return browser
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.chromium = FakeChromium()
+        self.starts = 0
+        self.stopped = False
+
+    async def start(self):
+        self.starts += 1
+        await asyncio.sleep(0)  # Like the driver process starting, so other callers get to run
+        return self
+
+    async def stop(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def fake_playwright(monkeypatch):
+    playwright = FakePlaywright()
+    monkeypatch.setattr(browser_module, 'async_playwright', lambda: playwright)
+    return playwright
+
+
+@pytest.mark.asyncio
+async def test_browser_is_reused(fake_playwright):
+    async with BrowserPool() as pool:
+        for _ in range(5):
+            async with pool.browser() as browser:
+                assert not browser.closed
+
+    assert pool.launches == 1
+    assert fake_playwright.stopped
+    assert all(browser.closed for browser in fake_playwright.chromium.launched)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_borrows_start_once(fake_playwright):
+    pool = BrowserPool()
+
+    async def borrow():
+        async with pool.browser() as browser:
+            await asyncio.sleep(0)
+            return browser
+
+    browsers = await asyncio.gather(*[borrow() for _ in range(8)])
+    await pool.stop()
+
+    assert fake_playwright.starts == 1
+    assert pool.launches == 1
+    assert len(set(map(id, browsers))) == 1
+    assert fake_playwright.stopped and not pool.running
+
+
+@pytest.mark.asyncio
+async def test_browsers_are_keyed_by_proxy(fake_playwright):
+    proxy = Proxy(protocol='http', host='127.0.0.1', port=8080)
+
+    async with BrowserPool() as pool:
+        async with pool.browser() as direct, pool.browser(proxy) as proxied:
+            assert direct is not proxied
+            assert direct.options['proxy'] is None
+            assert proxied.options['proxy'] == proxy.to_playwright_proxy()
+
+        async with pool.browser(Proxy(protocol='http', host='127.0.0.1', port=8080)) as again:
+            assert again is proxied
+
+    assert pool.launches == 2
+
+
+@pytest.mark.asyncio
+async def test_browser_recycled_after_max_pages(fake_playwright):
+    async with BrowserPool(max_pages=2) as pool:
+        seen = []
+        for _ in range(5):
+            async with pool.browser() as browser:
+                seen.append(browser)
+
+        assert pool.launches == 3
+        assert seen[0] is seen[1] and seen[1] is not seen[2]
+        assert seen[0].closed and not seen[-1].closed
+
+
+@pytest.mark.asyncio
+async def test_retired_browser_closes_after_last_page(fake_playwright):
+    async with BrowserPool(max_pages=1) as pool:
+        async with pool.browser() as first:
+            async with pool.browser() as second:
+                assert first is not second
+                assert not first.closed
+            assert not first.closed
+        assert first.closed
+
+
+@pytest.mark.asyncio
+async def test_browser_recycled_over_memory_limit(fake_playwright, monkeypatch):
+    async def memory(browser):
+        return 2_048
+
+    monkeypatch.setattr(browser_module, 'browser_memory_mb', memory)
+
+    async with BrowserPool(max_memory_mb=1_024, memory_check_interval=1) as pool:
+        async with pool.browser() as first:
+            pass
+        assert first.closed
+
+        async with pool.browser() as second:
+            assert second is not first
+
+
+@pytest.mark.asyncio
+async def test_pool_is_bound_to_its_loop(fake_playwright):
+    pool = BrowserPool()
+    await pool.start()
+
+    async def use_pool():
+        async with pool.browser():
+            pass
+
+    with pytest.raises(RuntimeError):
+        await asyncio.to_thread(asyncio.run, use_pool())
+
+    await pool.stop()
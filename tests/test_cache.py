@@ -0,0 +1,148 @@
+import os
+import time
+
+import pytest
+
+from search_ai.cache import PageCache, SearchCache
+
+
+def test_key_ignores_whitespace_and_empty_fields():
+    a = SearchCache.key({'q': 'python  tutorial', 's': 0, 'dc': 1, 'df': None})
+    b = SearchCache.key({'q': ' python tutorial ', 's': 0, 'dc': 1, 'kl': ''})
+
+    assert a == b
+    assert a != SearchCache.key({'q': 'python tutorial', 's': 9, 'dc': 10})
+
+
+def test_memory_hit():
+    cache = SearchCache()
+    cache.set('key', 'page')
+
+    assert cache.get('key') == 'page'
+    assert cache.get('other') is None
+    assert (cache.stats.hits, cache.stats.memory_hits, cache.stats.misses) == (1, 1, 1)
+    assert cache.stats.hit_rate == 0.5
+
+
+def test_entries_expire(monkeypatch):
+    cache = SearchCache(ttl=10)
+    cache.set('key', 'page')
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+
+    assert cache.get('key') is None
+
+
+def test_lru_evicts_by_size():
+    cache = SearchCache(max_bytes=10)
+    cache.set('a', 'aaaa')
+    cache.set('b', 'bbbb')
+    cache.get('a')
+    cache.set('c', 'cccc')
+
+    assert cache.get('a') == 'aaaa'
+    assert cache.get('b') is None
+    assert cache.get('c') == 'cccc'
+    assert cache.stats.evictions == 1
+
+
+def test_disk_tier_is_shared(tmp_path):
+    path = str(tmp_path / 'cache.db')
+
+    writer = SearchCache(path=path)
+    writer.set('key', 'page' * 1000)
+
+    reader = SearchCache(path=path)
+    assert reader.get('key') == 'page' * 1000
+    assert reader.get('key') == 'page' * 1000
+    assert (reader.stats.disk_hits, reader.stats.memory_hits) == (1, 1)
+
+    writer.clear()
+    assert SearchCache(path=path).get('key') is None
+
+
+def test_purge_expired(tmp_path, monkeypatch):
+    cache = SearchCache(ttl=10, path=str(tmp_path / 'cache.db'))
+    cache.set('key', 'page')
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+    cache.purge_expired()
+
+    assert cache._memory_bytes == 0
+    assert cache._db.execute('SELECT COUNT(*) FROM search_cache').fetchone()[0] == 0
+
+
+@pytest.mark.asyncio
+async def test_async_disk_tier(tmp_path):
+    cache = SearchCache(path=str(tmp_path / 'cache.db'))
+    await cache.async_set('key', 'page')
+
+    assert await SearchCache(path=cache.path).async_get('key') == 'page'
+
+
+def test_normalize_url():
+    assert PageCache.normalize_url('HTTPS://Example.com:443/a?b=2&a=1#top') == 'https://example.com/a?a=1&b=2'
+    assert PageCache.normalize_url('http://example.com:8080') == 'http://example.com:8080/'
+
+
+def test_page_cache_roundtrip(tmp_path):
+    cache = PageCache(str(tmp_path / 'pages.db'))
+    cache.set('https://example.com/a#intro', '<html>a</html>', etag='"v1"')
+
+    page = PageCache(cache.path).get('https://example.com/a')
+    assert (page.source, page.etag, page.last_modified) == ('<html>a</html>', '"v1"', None)
+    assert cache.get('https://example.com/missing') is None
+
+
+def test_page_cache_stores_sources_once(tmp_path):
+    cache = PageCache(str(tmp_path / 'pages.db'))
+    cache.set('https://example.com/a', '<html>same</html>')
+    cache.set('https://example.com/b', '<html>same</html>')
+
+    assert cache._db.execute('SELECT COUNT(*) FROM sources').fetchone()[0] == 1
+
+
+def test_page_cache_freshness(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path / 'pages.db'), ttl=10)
+    cache.set('https://example.com/a', '<html>a</html>')
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+    assert not cache.is_fresh(cache.get('https://example.com/a'))
+
+    cache.revalidated('https://example.com/a')
+    assert cache.is_fresh(cache.get('https://example.com/a'))
+    assert (cache.stats.stale, cache.stats.revalidated, cache.stats.hits) == (1, 1, 1)
+
+
+def test_page_cache_derived_output(tmp_path):
+    cache = PageCache(str(tmp_path / 'pages.db'))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'title': 'A'}
+
+    assert cache.derived('<html>a</html>', 'metadata', compute) == {'title': 'A'}
+    assert cache.derived('<html>a</html>', 'metadata', compute) == {'title': 'A'}
+    assert len(calls) == 1
+    assert cache.stats.derived_hits == 1
+
+
+def test_page_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path / 'pages.db'), max_bytes=300)
+    now = [time.time()]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+
+    for name in 'abc':
+        cache.set(f'https://example.com/{name}', os.urandom(100).hex())
+        now[0] += 1
+        cache.get('https://example.com/a')
+        now[0] += 1
+
+    assert cache.get('https://example.com/a') is not None
+    assert cache.get('https://example.com/b') is None
+    assert cache.size() <= 300
+    assert cache.stats.evictions >= 1
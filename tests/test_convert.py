@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import pytest
+
+from search_ai.convert import TAIL_MARGIN, convert_page
+from search_ai.utils import extract_metadata, generate_markdown
+
+
+PAGES = sorted((Path(__file__).parent / 'pages').glob('*.html'))
+
+
+@pytest.mark.parametrize('page', PAGES, ids=[page.stem for page in PAGES])
+@pytest.mark.parametrize('ignore_links', [False, True])
+@pytest.mark.parametrize('ignore_images', [False, True])
+def test_markdown_matches_html2text(page, ignore_links, ignore_images):
+    page_source = page.read_text()
+    expected = generate_markdown(page_source, ignore_links, ignore_images)
+
+    markdown, metadata = convert_page(page_source, ignore_links, ignore_images)
+
+    assert markdown == expected
+
+
+@pytest.mark.parametrize(
+    'page_source, markdown, html2text_markdown',
+    [
+        ('<p>caf&eacute; &middot; caf&#233;</p>', 'café · café', 'cafe * cafe'),
+        ('<p>&copy; 2024 &mdash; &#8212;</p>', '© 2024 — —', '(C) 2024 -- --'),
+        ('<p>café &amp; &lt;b&gt;</p>', 'café & <b>', 'café & <b>'),
+    ],
+)
+def test_entities_stay_decoded(page_source, markdown, html2text_markdown):
+    # A documented difference: html2text writes some entities as ASCII, but not the characters themselves
+    assert convert_page(page_source)[0] == markdown
+    assert generate_markdown(page_source, False, True) == html2text_markdown
+
+
+@pytest.mark.parametrize(
+    'page_source',
+    [
+        '<p>x</p></body></html><p>after</p>',
+        '<p>x</p></html>\n<div>a <b>b</b></div></HTML >tail',
+        '<table><tr><td>a<td>b<tr><td>c<td>d</table>',
+        '<table><tr><th>a</th><th>b</th></tr><tr><td>c</td><td>d</td></tr></table>',
+        '<p><b><i>text',
+        '<title>T</title><p>x</p>',
+        '<html><title>T</title><body><p>x',
+        '<html>text<p>a',
+    ],
+)
+def test_malformed_markdown_matches_html2text(page_source):
+    assert convert_page(page_source)[0] == generate_markdown(page_source, False, True)
+
+
+@pytest.mark.parametrize('page', PAGES, ids=[page.stem for page in PAGES])
+def test_metadata_matches_extract_metadata(page):
+    page_source = page.read_text()
+    assert convert_page(page_source)[1] == extract_metadata(page_source)
+
+
+@pytest.mark.parametrize('page_source', ['', '   ', 'plain text', '<p>fragment</p>'])
+def test_fragments(page_source):
+    assert convert_page(page_source) == (generate_markdown(page_source, False, True), extract_metadata(page_source))
+
+
+@pytest.mark.parametrize('page', PAGES, ids=[page.stem for page in PAGES])
+@pytest.mark.parametrize('ignore_links', [False, True])
+def test_budget_keeps_the_start_of_the_markdown(page, ignore_links):
+    page_source = page.read_text()
+    full_markdown, full_metadata = convert_page(page_source, ignore_links)
+
+    for max_length in range(0, len(full_markdown) + 10, 5):
+        markdown, metadata = convert_page(page_source, ignore_links, max_length=max_length)
+        assert markdown[:max_length] == full_markdown[:max_length]
+        assert metadata == full_metadata
+
+
+def test_budget_stops_early():
+    paragraphs = ''.join(f'<p>Paragraph {n} has some text in it.</p>' for n in range(100_000))
+    page_source = f'<html><head><title>Long</title></head><body>{paragraphs}</body></html>'
+
+    markdown, metadata = convert_page(page_source, max_length=1000)
+
+    assert 1000 <= len(markdown) <= 1000 + TAIL_MARGIN
+    assert markdown.endswith('has some text in it.')
+    assert metadata == {'title': 'Long'}
@@ -0,0 +1,207 @@
+import time
+import asyncio
+
+import pytest
+
+import search_ai.extractor as extractor
+from search_ai import Timings
+from search_ai.blocking import ResourceBlocker
+from search_ai.cache import PageCache
+from search_ai.extractor import TierMemory, get_page
+from search_ai.readiness import PageReadiness
+
+
+SERVER_RENDERED = '<html><body><p>' + 'Plenty of server rendered text. ' * 40 + '</p></body></html>'
+CLIENT_RENDERED = '<html><body><div id="root"></div></body></html>'
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    calls = {'http': [], 'browser': []}
+    http_pages = {'https://static.com/a': SERVER_RENDERED, 'https://spa.com/a': CLIENT_RENDERED}
+
+    async def http_source(url, fetch):
+        calls['http'].append(url)
+        return http_pages.get(url, '')
+
+    async def page_source(url, fetch):
+        calls['browser'].append(url)
+        return SERVER_RENDERED
+
+    monkeypatch.setattr(extractor, '_get_http_source', http_source)
+    monkeypatch.setattr(extractor, '_get_page_source', page_source)
+    monkeypatch.setattr(extractor, 'tier_memory', TierMemory())
+    return calls
+
+
+def test_tier_memory_expires(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(extractor.time, 'monotonic', lambda: now[0])
+
+    memory = TierMemory(ttl=10)
+    memory.record('example.com', 'browser')
+    assert memory.get('example.com') == 'browser'
+
+    now[0] = 11
+    assert memory.get('example.com') is None
+
+
+def test_tier_memory_evicts_oldest():
+    memory = TierMemory(max_domains=2)
+    memory.record('a.com', 'http')
+    memory.record('b.com', 'http')
+    memory.get('a.com')
+    memory.record('c.com', 'browser')
+
+    assert memory.get('b.com') is None
+    assert memory.get('a.com') == 'http'
+    assert memory.get('c.com') == 'browser'
+
+
+@pytest.mark.asyncio
+async def test_tiered_uses_http_when_sufficient(fetches):
+    page = await get_page('https://static.com/a', None, fetch_mode='tiered')
+
+    assert page == SERVER_RENDERED
+    assert fetches == {'http': ['https://static.com/a'], 'browser': []}
+    assert extractor.tier_memory.get('static.com') == 'http'
+
+
+@pytest.mark.asyncio
+async def test_tiered_escalates_and_remembers_domain(fetches):
+    await get_page('https://spa.com/a', None, fetch_mode='tiered')
+    assert fetches == {'http': ['https://spa.com/a'], 'browser': ['https://spa.com/a']}
+    assert extractor.tier_memory.get('spa.com') == 'browser'
+
+    await get_page(['https://spa.com/b'], None, fetch_mode='tiered')
+    assert fetches['http'] == ['https://spa.com/a']
+    assert fetches['browser'] == ['https://spa.com/a', 'https://spa.com/b']
+
+
+@pytest.mark.asyncio
+async def test_browser_mode_skips_http(fetches):
+    await get_page(['https://static.com/a', 'https://static.com/b'], None)
+    assert fetches == {'http': [], 'browser': ['https://static.com/a', 'https://static.com/b']}
+
+
+@pytest.mark.asyncio
+async def test_page_cache_serves_fresh_pages(fetches, tmp_path):
+    cache = PageCache(str(tmp_path / 'pages.db'))
+
+    await get_page('https://static.com/a', None, page_cache=cache)
+    page = await get_page('https://static.com/a#top', None, page_cache=cache)
+
+    assert page == SERVER_RENDERED
+    assert fetches['browser'] == ['https://static.com/a']
+
+
+@pytest.mark.asyncio
+async def test_page_cache_revalidates_stale_pages(fetches, tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path / 'pages.db'), ttl=10)
+    cache.set('https://static.com/a', 'cached', etag='"v1"')
+    cache.set('https://static.com/b', 'cached')
+
+    revalidated = []
+
+    async def not_modified(url, page, fetch):
+        revalidated.append((url, page.etag))
+        return page.etag is not None
+
+    monkeypatch.setattr(extractor, '_not_modified', not_modified)
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+
+    pages = await get_page(['https://static.com/a', 'https://static.com/b'], None, page_cache=cache)
+
+    assert pages == ['cached', SERVER_RENDERED]
+    assert revalidated == [('https://static.com/a', '"v1"'), ('https://static.com/b', None)]
+    assert fetches['browser'] == ['https://static.com/b']
+    assert cache.get('https://static.com/b').source == SERVER_RENDERED
+
+
+class Request:
+    def __init__(self, resource_type, url):
+        self.resource_type = resource_type
+        self.url = url
+        self.frame = None
+
+    def is_navigation_request(self):
+        return False
+
+
+class Route:
+    async def abort(self, error_code=None):
+        pass
+
+    async def continue_(self):
+        pass
+
+
+class Page:
+    def __init__(self, context):
+        self.context = context
+
+    async def goto(self, url, **kwargs):
+        for request in self.context.requests:
+            await self.context.handler(Route(), request)
+
+    async def content(self):
+        return SERVER_RENDERED
+
+    async def close(self):
+        pass
+
+
+class Context:
+    def __init__(self, requests):
+        self.requests = requests
+
+    async def route(self, url, handler):
+        self.handler = handler
+
+    async def new_page(self):
+        return Page(self)
+
+    async def close(self):
+        pass
+
+
+class Browser:
+    def __init__(self, requests=()):
+        self.requests = list(requests)
+
+    async def new_context(self, **config):
+        return Context(self.requests)
+
+
+@pytest.mark.asyncio
+async def test_rendered_pages_report_what_was_blocked():
+    browser = Browser([Request('image', 'https://a.com/1.png'), Request('font', 'https://a.com/f.woff2')])
+    fetch = extractor._Fetch(None, None, 'browser', PageReadiness([], hard_cap=0), ResourceBlocker())
+
+    with Timings() as timings:
+        assert await extractor._render_page('https://a.com/', browser, fetch) == SERVER_RENDERED
+
+    content = next(span for span in timings.spans if span.name == 'page.content')
+    assert content.attrs['blocked_requests'] == 2
+    assert content.attrs['blocked_bytes'] == fetch.blocker.totals.bytes > 0
+
+
+class Never:
+    name = 'never'
+
+    async def wait(self, page):
+        await asyncio.sleep(10)
+
+
+@pytest.mark.asyncio
+async def test_rendered_pages_report_how_their_wait_ended():
+    fetch = extractor._Fetch(None, None, 'browser', PageReadiness([Never()], hard_cap=0.05), ResourceBlocker())
+
+    with Timings() as timings:
+        await extractor._render_page('https://a.com/', Browser(), fetch)
+
+    wait = next(span for span in timings.spans if span.name == 'page.wait')
+    assert wait.attrs['policy'] == 'hard_cap'
+    assert wait.attrs['timed_out']
+    assert 0.04 <= wait.attrs['elapsed'] < 1
@@ -3,6 +3,7 @@ from datetime import date
 import pytest
 
 from search_ai import Filters
+from search_ai.filters import valid_tld
 
 
 @pytest.mark.parametrize(
@@ -146,3 +147,56 @@ def test_combined_fields(kwargs, expected):
     filter_obj = Filters(**kwargs)
     compiled_filters = filter_obj.compile_filters()
     assert compiled_filters == expected
+
+
+@pytest.mark.parametrize(
+    'tld',
+    [
+        'com',
+        '.com',
+        'COM',
+        'com.',
+        'co.uk',
+        '.co.uk',
+        'foo.ck',
+        'xn--p1ai',
+        'рф',
+        'github.io',
+        'nope',
+        '.local',
+        '.',
+        '',
+    ],
+)
+def test_tld_validation_matches_public_suffix_list(tld):
+    from publicsuffix2 import PublicSuffixList
+
+    assert valid_tld(tld) == bool(PublicSuffixList().get_tld(tld, strict=True))
+
+
+def test_split_spreads_or_groups_within_the_budget():
+    sites = [f'site{i}.example.com' for i in range(200)]
+    filters = Filters(sites=sites, any_keywords=['python', 'rust'], exclude_sites='spam.com', in_title='guide')
+
+    parts = filters.split('machine learning')
+
+    assert 1 < len(parts) <= 14
+    assert [site for part in parts for site in part.sites] == sites
+    for part in parts:
+        assert part.fits('machine learning')
+        assert (part.any_keywords, part.exclude_sites, part.in_title) == (['python', 'rust'], 'spam.com', 'guide')
+
+
+def test_split_by_terms_and_several_groups():
+    filters = Filters(sites=[f'{i}.com' for i in range(12)], any_keywords=[f'word{i}' for i in range(12)])
+
+    parts = filters.split('q', max_terms=10)
+
+    assert all(part.fits('q', max_terms=10) for part in parts)
+    combinations = {(site, word) for part in parts for site in part.sites for word in part.any_keywords}
+    assert len(combinations) == 12 * 12
+
+
+def test_filters_that_fit_are_not_split():
+    filters = Filters(sites=['a.com', 'b.com'])
+    assert filters.split('q') == [filters]
@@ -0,0 +1,31 @@
+from search_ai import Hedging
+
+
+def test_delay_follows_the_percentile():
+    hedging = Hedging(percentile=90, initial_delay=2, min_delay=0.01, min_samples=10)
+    assert hedging.delay() == 2
+
+    for i in range(1, 101):
+        hedging.observe(i / 1000)
+
+    assert hedging.delay() == 0.09
+
+    hedging = Hedging(min_delay=0.5, min_samples=1)
+    hedging.observe(0.1)
+    assert hedging.delay() == 0.5
+
+
+def test_budget():
+    hedging = Hedging(budget=0.25, max_saved=1)
+
+    allowed = []
+    for _ in range(8):
+        hedging.delay()
+        allowed.append(hedging.allow())
+
+    assert allowed == [False, False, False, True] * 2
+    assert (hedging.requests, hedging.hedges) == (8, 2)
+
+    for _ in range(100):
+        hedging.delay()
+    assert [hedging.allow() for _ in range(3)] == [True, False, False]  # Only `max_saved` hedges are kept
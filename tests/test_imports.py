@@ -0,0 +1,10 @@
+import sys
+import subprocess
+
+
+def test_heavy_dependencies_load_lazily():
+    code = 'import sys, search_ai; print(sorted({m.split(".")[0] for m in sys.modules}))'
+    modules = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+
+    for name in ('playwright', 'publicsuffix2', 'html2text'):
+        assert f"'{name}'" not in modules
@@ -0,0 +1,134 @@
+import threading
+
+import pytest
+
+import search_ai.searcher as searcher
+from search_ai import metrics, search, tracing
+from search_ai.metrics import Counter, Histogram, Registry
+
+
+@pytest.fixture
+def recording(monkeypatch):
+    monkeypatch.setattr(tracing, 'hooks', [])
+    monkeypatch.setattr(tracing, 'start_hooks', [])
+    metrics.registry.clear()
+    metrics.enable()
+    yield metrics.registry.snapshot
+    metrics.disable()
+    metrics.registry.clear()
+
+
+def test_search_metrics(duckduckgo, recording):
+    search('python', count=25)
+    snapshot = recording()
+
+    assert snapshot['search_ai_requests_total'] == {'kind="search"': 3}
+    assert snapshot['search_ai_responses_total'] == {'kind="search",status="2xx"': 3}
+    assert snapshot['search_ai_downloaded_bytes_total']['kind="search"'] > 0
+    assert snapshot['search_ai_in_flight'] == {'phase="search.request"': 0}
+    assert snapshot['search_ai_phase_seconds']['phase="search.parse"']['count'] == 3
+
+
+def test_retries_and_parse_failures(duckduckgo, recording, monkeypatch):
+    duckduckgo.failing_queries.add('blocked')
+    duckduckgo.broken_queries.add('broken')
+    for query in ('blocked', 'broken'):
+        with pytest.raises(Exception):
+            search(query)
+
+    def broken(html):
+        assert False, 'unexpected results page'
+
+    monkeypatch.setattr(searcher, 'parse_search', broken)
+    with pytest.raises(AssertionError):
+        search('python')
+
+    snapshot = recording()
+    assert snapshot['search_ai_retries_total'] == {'kind="search"': 1}
+    assert snapshot['search_ai_blocks_total'] == {'kind="search"': 2}
+    assert snapshot['search_ai_responses_total']['kind="search",status="4xx"'] == 2
+    assert snapshot['search_ai_responses_total']['kind="search",status="5xx"'] == 1
+    assert snapshot['search_ai_parse_failures_total'] == {'': 1}
+
+
+def test_blocked_page_requests(recording):
+    with tracing.span('page.content', bytes=1000, blocked_requests=3, blocked_bytes=150_000):
+        pass
+    with tracing.span('page.content', bytes=1000, blocked_requests=0, blocked_bytes=0):
+        pass
+
+    snapshot = recording()
+    assert snapshot['search_ai_blocked_requests_total'] == {'': 3}
+    assert snapshot['search_ai_blocked_bytes_total'] == {'': 150_000}
+
+
+def test_page_readiness(recording):
+    for policy in ('network_idle', 'hard_cap', 'network_idle'):
+        with tracing.span('page.wait', policy=policy):
+            pass
+
+    assert recording()['search_ai_page_readiness_total'] == {'policy="hard_cap"': 1, 'policy="network_idle"': 2}
+
+
+def test_disabled_by_default(duckduckgo):
+    metrics.registry.clear()
+    search('python', count=5)
+
+    assert metrics.registry.snapshot()['search_ai_requests_total'] == {}
+
+
+def test_updates_from_many_threads():
+    counter = Counter('things_total', 'Things.', ['kind'])
+
+    def work():
+        for _ in range(10_000):
+            counter.inc('a')
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.values() == {'kind="a"': 80_000}
+
+
+def test_values_of_ended_threads_are_folded():
+    counter = Counter('things_total', 'Things.', ['kind'])
+
+    for _ in range(50):
+        threads = [threading.Thread(target=counter.inc, args=('a',)) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert counter.values() == {'kind="a"': 500}
+    assert len(counter._shards) <= 10
+
+    counter.clear()
+    assert counter.values() == {}
+
+
+def test_prometheus_format():
+    registry = Registry()
+    counter = registry.add(Counter('things_total', 'Things.', ['kind']))
+    histogram = registry.add(Histogram('wait_seconds', 'Waits.', buckets=[0.1, 1]))
+
+    counter.inc('a "quoted" kind', amount=2)
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert registry.prometheus() == (
+        '# HELP things_total Things.\n'
+        '# TYPE things_total counter\n'
+        'things_total{kind="a \\"quoted\\" kind"} 2\n'
+        '# HELP wait_seconds Waits.\n'
+        '# TYPE wait_seconds histogram\n'
+        'wait_seconds_bucket{le="0.1"} 1\n'
+        'wait_seconds_bucket{le="1"} 2\n'
+        'wait_seconds_bucket{le="+Inf"} 3\n'
+        'wait_seconds_sum 5.55\n'
+        'wait_seconds_count 3\n'
+    )
@@ -0,0 +1,109 @@
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+from search_ai import ConversionPool, PageCache
+from search_ai import extractor
+from search_ai.convert import convert_page
+from search_ai.search_result import AsyncSearchResult, AsyncSearchResults, convert_pages
+
+
+PAGES = [page.read_text() for page in sorted((Path(__file__).parent / 'pages').glob('*.html'))]
+
+
+@pytest.mark.parametrize('kind', ['process', 'thread'])
+def test_pool_converts_like_the_caller(kind):
+    with ConversionPool(max_workers=2, kind=kind) as pool:
+        assert convert_pages(PAGES, 500, conversion_pool=pool) == [convert_page(page, max_length=500) for page in PAGES]
+
+
+def test_pool_is_reused_until_shutdown():
+    pool = ConversionPool(max_workers=1, kind='thread')
+    executor = pool.executor
+
+    convert_pages(PAGES[:1], 100, conversion_pool=pool)
+    assert pool.executor is executor
+
+    pool.shutdown()
+    assert pool.executor is not executor
+    pool.shutdown()
+
+
+def test_pool_kind_is_checked():
+    with pytest.raises(ValueError):
+        ConversionPool(kind='fiber')
+
+
+@pytest.mark.asyncio
+async def test_async_conversion_leaves_the_loop_free(monkeypatch):
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    def slow_convert(*args):
+        time.sleep(0.05)
+        return convert_page(*args)
+
+    monkeypatch.setattr('search_ai.search_result.convert_page', slow_convert)
+
+    async def page_source(url, fetch):
+        return PAGES[0]
+
+    monkeypatch.setattr(extractor, '_get_page_source', page_source)
+
+    results = AsyncSearchResults([AsyncSearchResult(title='A', link='https://a.com/')])
+    ticker = asyncio.create_task(tick())
+    with ConversionPool(kind='thread') as pool:
+        await results.markdown(extend=True, conversion_pool=pool)
+    ticker.cancel()
+
+    assert ticks > 1
+
+
+def test_pool_conversions_are_cached(tmp_path, monkeypatch):
+    page_cache = PageCache(tmp_path / 'pages.db')
+    monkeypatch.setattr(extractor, 'default_page_cache', page_cache)
+
+    with ConversionPool(max_workers=1, kind='thread') as pool:
+        first = convert_pages(PAGES[:2], 300, conversion_pool=pool)
+        assert convert_pages(PAGES[:2], 300, conversion_pool=pool) == first
+
+    assert page_cache.stats.derived_hits == 2
+    page_cache.close()
+
+
+@pytest.mark.asyncio
+async def test_async_conversions_use_the_cache_off_the_loop(tmp_path, monkeypatch):
+    page_cache = PageCache(tmp_path / 'pages.db')
+    monkeypatch.setattr(extractor, 'default_page_cache', page_cache)
+    threads = []
+
+    for method in ('get_derived', 'set_derived'):
+        original = getattr(PageCache, method)
+
+        def spy(self, *args, original=original):
+            threads.append(threading.current_thread())
+            return original(self, *args)
+
+        monkeypatch.setattr(PageCache, method, spy)
+
+    async def page_source(url, fetch):
+        return PAGES[0]
+
+    monkeypatch.setattr(extractor, '_get_page_source', page_source)
+
+    results = AsyncSearchResults([AsyncSearchResult(title='A', link='https://a.com/')])
+    first = [page async for page in results.markdown_stream()]
+    assert [page async for page in results.markdown_stream()] == first
+
+    assert len(threads) == 3  # A miss and its conversion stored, then a hit
+    assert threading.main_thread() not in threads
+    assert page_cache.stats.derived_hits == 1
+    page_cache.close()
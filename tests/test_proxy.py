@@ -1,6 +1,8 @@
 import pytest
 
-from search_ai import Proxy
+import search_ai.proxy as proxy_module
+from search_ai import Proxy, ProxyPool
+from search_ai.proxy import use_proxy
 
 
 @pytest.fixture
@@ -29,3 +31,118 @@ def test_to_playwright_proxy_with_auth(proxy_with_auth):
 def test_to_playwright_proxy_no_auth(proxy_no_auth):
     expected = {'server': 'https://proxy.io:443'}
     assert proxy_no_auth.to_playwright_proxy() == expected
+
+
+@pytest.fixture
+def proxies() -> list[Proxy]:
+    return [Proxy(protocol='http', host=f'10.0.0.{i}', port=8080) for i in range(3)]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(proxy_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+class RateLimited(Exception):
+    def __init__(self, status_code=429):
+        self.response = type('Response', (), {'status_code': status_code})()
+
+
+def test_pool_round_robin(proxies):
+    pool = ProxyPool(proxies)
+    picked = []
+
+    for _ in range(6):
+        with pool.use() as proxy:
+            picked.append(proxy.host)
+
+    assert picked == ['10.0.0.0', '10.0.0.1', '10.0.0.2'] * 2
+
+
+def test_pool_least_loaded(proxies):
+    pool = ProxyPool(proxies, strategy='least_loaded')
+
+    first, second, third = pool.acquire(), pool.acquire(), pool.acquire()
+    assert len({first.host, second.host, third.host}) == 3
+
+    pool.release(second, 0.1)
+    assert pool.acquire() is second
+
+
+def test_pool_max_in_flight(proxies):
+    pool = ProxyPool(proxies[:2], max_in_flight=1)
+
+    a, b = pool.acquire(), pool.acquire()
+    assert a is not b
+    assert pool.acquire() in proxies[:2]  # Over the limit, the pool still hands out a proxy
+
+
+def test_pool_tracks_latency_and_errors(proxies):
+    pool = ProxyPool(proxies[:1], smoothing=0.5)
+    proxy = proxies[0]
+
+    pool.release(pool.acquire() and proxy, 1.0)
+    pool.release(pool.acquire() and proxy, 2.0)
+    with pytest.raises(ValueError):
+        with pool.use():
+            raise ValueError
+
+    stats = pool.stats[proxy.to_httpx_proxy_url()]
+    assert stats.requests == 3
+    assert stats.errors == 1
+    assert stats.latency == pytest.approx(1.5)
+    assert stats.error_rate == pytest.approx(0.5)
+    assert stats.in_flight == 0
+
+
+def test_pool_quarantines_with_exponential_cooldown(proxies, clock):
+    pool = ProxyPool(proxies[:2], max_failures=2, base_cooldown=10)
+    bad, good = proxies[:2]
+
+    for _ in range(2):
+        pool.release(pool.acquire() and bad, 1, ValueError())
+
+    assert pool.healthy() == [good]
+    assert all(pool.acquire() is good for _ in range(4))
+
+    clock[0] += 11
+    assert pool.healthy() == [bad, good]
+
+    pool.release(bad, 1, RateLimited())
+    stats = pool.stats[bad.to_httpx_proxy_url()]
+    assert stats.rate_limited == 1
+    assert stats.quarantined_until == clock[0] + 20
+
+    clock[0] += 21
+    pool.release(bad, 1)
+    assert stats.quarantines == 0
+
+
+@pytest.mark.parametrize('status_code', [403, 418, 429])
+def test_pool_quarantines_on_every_block_status(proxies, clock, status_code):
+    pool = ProxyPool(proxies[:1], max_failures=5)
+    pool.release(pool.acquire(), 1, RateLimited(status_code))
+
+    assert pool.stats[proxies[0].to_httpx_proxy_url()].rate_limited == 1
+    assert pool.healthy() == []
+
+
+def test_pool_with_every_proxy_quarantined(proxies, clock):
+    pool = ProxyPool(proxies[:2], max_failures=1, base_cooldown=10)
+    pool.release(proxies[0], 1, ValueError())
+    clock[0] += 1
+    pool.release(proxies[1], 1, ValueError())
+
+    assert pool.healthy() == []
+    assert pool.acquire() is proxies[0]
+
+
+def test_use_proxy():
+    proxy = Proxy(protocol='http', host='127.0.0.1', port=8080)
+
+    with use_proxy(proxy) as used:
+        assert used is proxy
+    with use_proxy(None) as used:
+        assert used is None
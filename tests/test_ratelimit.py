@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from search_ai import AdaptiveRateLimiter, Proxy, RateLimiter
+from search_ai.parse import is_blocked
+from search_ai.ratelimit import TokenBucket, pacing_rates
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_token_bucket_burst_then_rate(clock):
+    bucket = TokenBucket(rate=2, burst=3)
+
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+    clock[0] = 10
+    assert bucket.reserve() == 0
+
+
+def test_per_proxy_budgets(clock):
+    limiter = RateLimiter(rate=100, per_proxy_rate=1, per_proxy_burst=1)
+    a = Proxy(protocol='http', host='a.example', port=1)
+    b = Proxy(protocol='http', host='b.example', port=1)
+
+    assert limiter.reserve(a) == 0
+    assert limiter.reserve(b) == 0
+    assert limiter.reserve(a) == pytest.approx(1)
+
+
+def test_acquire_sync_waits(monkeypatch):
+    limiter = RateLimiter(rate=20, burst=1)
+
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire_sync()
+
+    assert time.monotonic() - start >= 0.09
+
+
+def test_is_blocked():
+    assert is_blocked(429, '')
+    assert is_blocked(200, '<div class="anomaly-modal__title">Unfortunately, bots use DuckDuckGo too.</div>')
+    assert not is_blocked(200, '<html><body><table></table></body></html>')  # No results
+    assert not is_blocked(500, 'Internal Server Error')
+
+
+def test_adaptive_increase_and_decrease(clock):
+    limiter = AdaptiveRateLimiter(rate=10, per_proxy_rate=2, min_rate=0.5, increase=1, decrease=0.5)
+    proxy = Proxy(protocol='http', host='a.example', port=1, username='user', password='secret')
+
+    limiter.record(proxy, blocked=False)
+    assert limiter.rates() == {'a.example:1': 3}
+
+    limiter.record(proxy, blocked=True)
+    limiter.record(proxy, blocked=True)
+    assert limiter.rates() == {'a.example:1': 0.75}
+
+    for _ in range(20):
+        limiter.record(proxy, blocked=False)
+    assert limiter.rates() == {'a.example:1': 10}
+    assert pacing_rates()['a.example:1'] == 10
+
+
+def test_circuit_opens_with_backoff(clock):
+    limiter = AdaptiveRateLimiter(rate=100, min_rate=1, trip_after=2, cooldown=10, max_cooldown=25)
+
+    for _ in range(2):
+        limiter.record(None, blocked=True)
+    assert limiter.reserve() == pytest.approx(10)
+
+    clock[0] = 10
+    assert limiter.reserve() == 0
+    assert limiter.reserve() == pytest.approx(1)  # Back at `min_rate`
+
+    for _ in range(2):
+        limiter.record(None, blocked=True)
+    assert limiter.reserve() == pytest.approx(20)
+
+    for _ in range(2):
+        limiter.record(None, blocked=True)
+    assert limiter.reserve() == pytest.approx(25)
+
+    limiter.record(None, blocked=False)
+    assert limiter._pace(None).trips == 0
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from search_ai.readiness import PageReadiness
+
+
+class Policy:
+    def __init__(self, name, delay, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.cancelled = False
+
+    async def wait(self, page):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.fail:
+            raise RuntimeError('page closed')
+
+
+@pytest.mark.asyncio
+async def test_first_policy_to_fire_wins():
+    slow = Policy('slow', 1)
+    readiness = PageReadiness([Policy('fast', 0.01), slow], hard_cap=2)
+
+    result = await readiness.wait(None, 'https://example.com/a')
+
+    assert result.policy == 'fast'
+    assert not result.timed_out
+    assert result.elapsed < 0.5
+    assert slow.cancelled
+    assert readiness.fired == {'fast': 1}
+
+
+@pytest.mark.asyncio
+async def test_failed_policies_are_ignored():
+    readiness = PageReadiness([Policy('broken', 0, fail=True), Policy('ok', 0.02)], hard_cap=2)
+    assert (await readiness.wait(None, 'https://example.com')).policy == 'ok'
+
+    readiness = PageReadiness([Policy('broken', 0, fail=True)], hard_cap=2)
+    assert (await readiness.wait(None, 'https://example.com')).policy == 'error'
+
+
+@pytest.mark.asyncio
+async def test_hard_cap():
+    readiness = PageReadiness([Policy('never', 10)], hard_cap=0.05)
+    result = await readiness.wait(None, 'https://example.com')
+
+    assert result.policy == 'hard_cap'
+    assert result.timed_out
+    assert result.elapsed < 1
+
+
+@pytest.mark.asyncio
+async def test_no_policies_is_a_fixed_wait():
+    result = await PageReadiness([], hard_cap=0.05).wait(None, 'https://example.com')
+    assert result.policy == 'hard_cap'
+    assert result.elapsed >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_learned_domain_budget():
+    readiness = PageReadiness([Policy('quick', 0.01)], hard_cap=5, min_budget=0.05, min_samples=3)
+
+    for _ in range(3):
+        assert readiness.budget('example.com') == 5
+        await readiness.wait(None, 'https://example.com/page')
+
+    assert 0.05 <= readiness.budget('example.com') < 0.1
+    assert readiness.budget('other.com') == 5
+
+    readiness.policies = [Policy('never', 10)]
+    assert (await readiness.wait(None, 'https://example.com/slow')).policy == 'budget'
@@ -0,0 +1,134 @@
+import time
+
+import pytest
+
+import search_ai.extractor as extractor
+from search_ai import replay, search, async_search, search_many, Recorder, Replayer, RateLimiter
+from search_ai.replay import Archive, Transport
+from search_ai.extractor import get_page
+
+
+PAGE = '<html><body><p>Recorded page</p></body></html>'
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    fetched = []
+
+    async def page_source(url, fetch):
+        fetched.append(url)
+        return PAGE
+
+    monkeypatch.setattr(extractor, '_get_page_source', page_source)
+    return fetched
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    def use(transport):
+        monkeypatch.setattr(replay, 'default_transport', transport)
+        return transport
+
+    return use
+
+
+def test_archive_round_trip(tmp_path):
+    archive = Archive(str(tmp_path / 'run.db'))
+    archive.put('page', archive.page_key('HTTPS://Example.com:443/a#top'), 'source', 0.5)
+
+    assert archive.get('page', archive.page_key('https://example.com/a')) == ('source', 0.5)
+    assert archive.get('search', archive.page_key('https://example.com/a')) is None
+    assert len(archive) == 1
+    archive.close()
+
+
+def test_replay_serves_what_was_recorded(duckduckgo, pages, transport, tmp_path):
+    path = str(tmp_path / 'run.db')
+
+    with transport(Recorder(path)):
+        recorded = search('python', count=25)
+        recorded_page = extractor.get_page_sync('https://example.com/a', None)
+
+    requests = len(duckduckgo.requests)
+    assert requests == 3
+    assert pages == ['https://example.com/a']
+
+    with transport(Replayer(path)):
+        replayed = search('python', count=25)
+        replayed_page = extractor.get_page_sync('https://example.com/a', None)
+
+    assert [r.link for r in replayed] == [r.link for r in recorded]
+    assert replayed_page == recorded_page == PAGE
+    assert len(duckduckgo.requests) == requests
+    assert len(pages) == 1
+
+
+def test_replayed_searches_are_not_paced(duckduckgo, transport, tmp_path):
+    path = str(tmp_path / 'run.db')
+    jobs = [(f'query{i}', None, 10) for i in range(4)]
+
+    with transport(Recorder(path)):
+        assert all(r.ok for r in search_many(jobs))
+
+    limiter = RateLimiter(rate=1, burst=1)
+    with transport(Replayer(path)):
+        start = time.monotonic()
+        assert all(r.ok for r in search_many(jobs, rate_limiter=limiter))
+
+    assert time.monotonic() - start < 1
+
+
+def test_transport_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        Transport(str(tmp_path / 'run.db'))
+
+
+@pytest.mark.asyncio
+async def test_async_replay(duckduckgo, pages, transport, tmp_path):
+    path = str(tmp_path / 'run.db')
+
+    with transport(Recorder(path)):
+        recorded = await async_search('python', count=10)
+        await get_page(['https://example.com/a'], None)
+
+    with transport(Replayer(path)):
+        replayed = await async_search('python', count=10)
+        assert await get_page(['https://example.com/a'], None) == [PAGE]
+
+    assert [r.link for r in replayed] == [r.link for r in recorded]
+    assert len(duckduckgo.requests) == 1
+    assert len(pages) == 1
+
+
+@pytest.mark.asyncio
+async def test_replay_misses(duckduckgo, pages, transport, tmp_path):
+    path = str(tmp_path / 'run.db')
+
+    with transport(Replayer(path)):
+        with pytest.raises(LookupError):
+            search('python')
+        with pytest.raises(LookupError):
+            await get_page('https://example.com/a', None)
+
+    with transport(Replayer(path, passthrough=True)) as replayer:
+        assert len(search('python')) == 10
+        assert await get_page('https://example.com/a', None) == PAGE
+        assert replayer.misses == 2
+
+
+@pytest.mark.asyncio
+async def test_replay_latency(pages, transport, tmp_path):
+    path = str(tmp_path / 'run.db')
+    archive = Archive(path)
+    archive.put('page', archive.page_key('https://example.com/a'), PAGE, 0.05)
+
+    transport(Replayer(archive))
+    start = time.monotonic()
+    await get_page('https://example.com/a', None)
+    assert time.monotonic() - start < 0.05
+
+    transport(Replayer(archive, latency='recorded'))
+    start = time.monotonic()
+    await get_page('https://example.com/a', None)
+    assert time.monotonic() - start >= 0.05
+    archive.close()
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from contextvars import ContextVar
+
+import pytest
+
+import search_ai.extractor as extractor
+import search_ai.runner as runner
+from search_ai import LoopRunner
+
+request_id: ContextVar[str] = ContextVar('request_id', default='')
+
+
+@pytest.fixture
+def loop_runner(monkeypatch):
+    loop_runner = LoopRunner()
+    monkeypatch.setattr(runner, 'default_runner', loop_runner)
+    yield loop_runner
+    loop_runner.close()
+
+
+def test_runs_on_one_background_loop(loop_runner):
+    async def where() -> tuple:
+        return asyncio.get_running_loop(), threading.current_thread(), request_id.get()
+
+    def call(name: str, seen: list) -> None:
+        request_id.set(name)
+        seen.append(loop_runner.run(where()))
+
+    seen = []
+    threads = [threading.Thread(target=call, args=(f'thread {i}', seen)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({loop for loop, _, _ in seen}) == 1
+    assert {thread.name for _, thread, _ in seen} == {'search_ai_loop_runner'}
+    assert sorted(name for _, _, name in seen) == [f'thread {i}' for i in range(4)]
+
+
+def test_sync_pages_share_the_runners_browser_pool(loop_runner, monkeypatch):
+    pools = []
+
+    async def page_source(url, fetch):
+        pools.append(fetch.browser_pool)
+        return '<html><body><p>Page text</p></body></html>'
+
+    monkeypatch.setattr(extractor, '_get_page_source', page_source)
+
+    threads = [
+        threading.Thread(target=extractor.get_page_sync, args=(f'https://example.com/{i}', None)) for i in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    extractor.get_page_sync(['https://example.com/a', 'https://example.com/b'], None)
+
+    assert len(pools) == 6
+    assert all(pool is loop_runner.browser_pool for pool in pools)
+
+
+def test_errors_and_misuse(loop_runner):
+    async def fail():
+        raise ValueError('failed')
+
+    with pytest.raises(ValueError):
+        loop_runner.run(fail())
+
+    async def nested():
+        return loop_runner.run(asyncio.sleep(0))
+
+    with pytest.raises(RuntimeError):
+        loop_runner.run(nested())
+
+
+def test_close_and_restart(loop_runner):
+    first = loop_runner.run(_running_loop())
+    loop_runner.close()
+
+    assert not loop_runner.running
+    assert first.is_closed()
+    assert loop_runner.run(_running_loop()) is not first
+
+
+async def _running_loop() -> asyncio.AbstractEventLoop:
+    return asyncio.get_running_loop()
+
+
+def test_iterate_closes_the_stream_when_left_early(loop_runner):
+    closed = []
+
+    async def numbers():
+        try:
+            for number in range(10):
+                yield number, asyncio.get_running_loop()
+        finally:
+            closed.append(asyncio.get_running_loop())
+
+    for number, loop in loop_runner.iterate(numbers()):
+        if number == 2:
+            break
+
+    assert closed == [loop]
+    assert [number for number, _ in loop_runner.iterate(numbers())] == list(range(10))
+    assert len(closed) == 2
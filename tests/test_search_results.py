@@ -5,6 +5,8 @@ from search_ai.search_result import (
     AsyncSearchResult,
     SearchResults,
     AsyncSearchResults,
+    CompactSearchResult,
+    AsyncCompactSearchResult,
 )
 
 
@@ -84,3 +86,98 @@ async def test_async_search_results(sample_data):
     json_data = await results.json()
     assert isinstance(json_data, list)
     assert len(json_data) == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_in_completion_order(monkeypatch):
+    import asyncio
+    import search_ai.extractor as extractor
+
+    delays = {'https://slow.com/': 0.05, 'https://fast.com/': 0}
+
+    async def page_source(url, fetch):
+        await asyncio.sleep(delays[url])
+        return f'<html><head><title>{url}</title></head><body><p>Page text</p></body></html>'
+
+    monkeypatch.setattr(extractor, '_get_page_source', page_source)
+
+    results = AsyncSearchResults(
+        [
+            AsyncSearchResult(title='Slow', link='https://slow.com/'),
+            AsyncSearchResult(title='Fast', link='https://fast.com/'),
+        ]
+    )
+
+    streamed = [(rank, data['title']) async for rank, data in results.json_stream()]
+    assert streamed == [(1, 'https://fast.com/'), (0, 'https://slow.com/')]
+
+    streamed = [rank async for rank, markdown in results.markdown_stream(only_page_content=True)]
+    assert streamed == [1, 0]
+
+
+def test_sync_stream_yields_in_completion_order(monkeypatch):
+    import asyncio
+    import search_ai.extractor as extractor
+
+    delays = {'https://slow.com/': 0.05, 'https://fast.com/': 0}
+
+    async def page_source(url, fetch):
+        await asyncio.sleep(delays[url])
+        return f'<html><head><title>{url}</title></head><body><p>Page text</p></body></html>'
+
+    monkeypatch.setattr(extractor, '_get_page_source', page_source)
+
+    results = SearchResults(
+        [
+            SearchResult(title='Slow', link='https://slow.com/'),
+            SearchResult(title='Fast', link='https://fast.com/'),
+        ]
+    )
+
+    streamed = [(rank, data['title']) for rank, data in results.json_stream()]
+    assert streamed == [(1, 'https://fast.com/'), (0, 'https://slow.com/')]
+
+    streamed = dict(results.markdown_stream(only_page_content=True))
+    assert list(streamed) == [1, 0]
+    assert 'Page text' in streamed[0]
+
+
+def test_compact_results_match_full_results(sample_data, monkeypatch):
+    import search_ai.extractor as extractor
+
+    async def page_source(url, fetch):
+        return '<html><head><title>Page</title></head><body><p>Page text</p></body></html>'
+
+    monkeypatch.setattr(extractor, '_get_page_source', page_source)
+
+    full = SearchResults([SearchResult(**sample_data)])
+    compact = SearchResults([CompactSearchResult(**sample_data)])
+
+    assert compact.markdown() == full.markdown()
+    assert compact.json() == full.json()
+    assert compact.markdown(extend=True) == full.markdown(extend=True)
+    assert compact.json(extend=True) == full.json(extend=True)
+    assert compact[0].json(mode='json') == full[0].json(mode='json')
+    assert str(compact[0]) == str(full[0]).replace('SearchResult', 'CompactSearchResult')
+
+
+@pytest.mark.asyncio
+async def test_async_compact_results(sample_data):
+    full = AsyncSearchResults([AsyncSearchResult(**sample_data)])
+    compact = AsyncSearchResults([AsyncCompactSearchResult(**sample_data)])
+
+    assert await compact.markdown() == await full.markdown()
+    assert await compact.json() == await full.json()
+    assert isinstance(compact[0].to_model(), AsyncSearchResult)
+
+
+def test_compact_link_is_validated_when_read():
+    from pydantic import ValidationError
+
+    result = CompactSearchResult(title='Broken', link='not a url')
+    assert result.title == 'Broken'
+
+    with pytest.raises(ValidationError):
+        result.link
+    with pytest.raises(ValidationError):
+        result.markdown()
@@ -0,0 +1,409 @@
+import time
+import asyncio
+import threading
+
+import pytest
+from curl_cffi.requests.exceptions import HTTPError
+
+from search_ai import (
+    AdaptiveRateLimiter,
+    AsyncSearchClient,
+    Filters,
+    Hedging,
+    Proxy,
+    ProxyPool,
+    RateLimiter,
+    Regions,
+    SearchBlocked,
+    SearchCache,
+    SearchClient,
+    SearchJob,
+    async_search,
+    async_search_iter,
+    async_search_many,
+    search,
+    search_iter,
+    search_many,
+)
+import search_ai.searcher as searcher
+from search_ai.search_result import CompactSearchResult
+
+
+def test_search_paginates(duckduckgo):
+    results = search('python', count=22)
+
+    assert [r.title for r in results] == [f'python result {i}' for i in range(22)]
+    assert [r.get('dc') for r in duckduckgo.requests] == [None, 10, 20]
+
+
+def test_search_stops_when_results_run_out(duckduckgo):
+    results = search('python', count=100)
+    assert len(results) == duckduckgo.total
+
+
+def test_form_data(duckduckgo):
+    search('python', filters=Filters(region=Regions.JAPAN, sites='example.com'), count=1, offset=5)
+    assert duckduckgo.requests == [{'q': 'python site:example.com', 's': 4, 'dc': 5, 'kl': 'jp-jp'}]
+
+
+def test_sessions_are_reused(duckduckgo):
+    client = SearchClient()
+    client.search('python', count=25)
+    client.search('rust', count=25)
+
+    assert len(duckduckgo.sessions) == 1
+
+
+def test_sessions_are_pooled_per_proxy(duckduckgo):
+    proxy = Proxy(protocol='http', host='127.0.0.1', port=8080)
+
+    with SearchClient() as client:
+        client.search('python', count=1)
+        client.search('python', count=1, proxy=proxy)
+        client.search('python', count=1, proxy=proxy)
+
+    assert [s.kwargs['proxy'] for s in duckduckgo.sessions] == [None, proxy.to_httpx_proxy_url()]
+    assert all(s.closed for s in duckduckgo.sessions)
+
+
+def test_client_is_thread_safe(duckduckgo):
+    client = SearchClient(max_idle_sessions=2)
+    errors = []
+
+    def worker():
+        try:
+            assert len(client.search('python', count=25)) == 25
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(client._idle[None]) <= 2
+
+
+@pytest.mark.asyncio
+async def test_async_search(duckduckgo):
+    results = await async_search('python', count=12)
+
+    assert [r.title for r in results] == [f'python result {i}' for i in range(12)]
+    assert len(duckduckgo.sessions) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_client_shares_one_session_per_proxy(duckduckgo):
+    async with AsyncSearchClient() as client:
+        await client.search('python', count=15)
+        await client.search('rust', count=15)
+
+    assert len(duckduckgo.sessions) == 1
+    assert duckduckgo.sessions[0].closed
+
+
+def test_async_sessions_are_closed_with_their_loop(duckduckgo):
+    for _ in range(5):
+        assert len(asyncio.run(async_search('python', count=12))) == 12
+
+    assert len(duckduckgo.sessions) == 5
+    assert all(s.closed for s in duckduckgo.sessions)
+    assert len(searcher._default_async_client._sessions) <= 1
+
+
+def test_search_many_isolates_errors(duckduckgo):
+    duckduckgo.failing_queries.add('broken')
+    jobs = [('python', None, 15), ('broken', None, 5), SearchJob('rust', count=3)]
+
+    batch = sorted(search_many(jobs, rate_limiter=RateLimiter(rate=1_000)), key=lambda r: r.index)
+
+    assert [r.ok for r in batch] == [True, False, True]
+    assert len(batch[0].results) == 15
+    assert isinstance(batch[1].error, HTTPError)
+    assert [r.title for r in batch[2].results] == ['rust result 0', 'rust result 1', 'rust result 2']
+
+
+@pytest.mark.asyncio
+async def test_async_search_many_streams_in_completion_order(duckduckgo):
+    duckduckgo.failing_queries.add('broken')
+    jobs = [('python', None, 25), ('broken', None, 5), ('rust', None, 3)]
+
+    batch = [r async for r in async_search_many(jobs, rate_limiter=RateLimiter(rate=1_000))]
+
+    order = [r.index for r in batch]
+    assert sorted(order) == [0, 1, 2]
+    assert order.index(2) < order.index(0)  # One page finishes before three pages
+    assert [len(r.results) for r in batch if r.ok] == [3, 25]
+
+
+@pytest.mark.asyncio
+async def test_async_search_many_is_rate_limited(duckduckgo):
+    jobs = [(f'query{i}', None, 10) for i in range(6)]
+    limiter = RateLimiter(rate=50, burst=1)
+
+    start = time.monotonic()
+    batch = [r async for r in async_search_many(jobs, rate_limiter=limiter)]
+
+    assert all(r.ok for r in batch)
+    assert time.monotonic() - start >= 5 / 50
+
+
+def test_search_with_proxy_pool(duckduckgo):
+    pool = ProxyPool([Proxy(protocol='http', host=f'10.0.0.{i}', port=8080) for i in range(2)])
+    results = search('python', count=25, proxy=pool)
+
+    assert len(results) == 25
+    assert [s.kwargs['proxy'] for s in duckduckgo.sessions] == [p.to_httpx_proxy_url() for p in pool.proxies]
+    assert [stats.requests for stats in pool.stats.values()] == [2, 1]
+    assert results._proxy is pool and results[0]._proxy is pool
+
+
+def test_proxy_pool_records_rate_limits(duckduckgo):
+    duckduckgo.failing_queries.add('python')
+    pool = ProxyPool([Proxy(protocol='http', host='10.0.0.1', port=8080)])
+
+    with pytest.raises(HTTPError):
+        search('python', proxy=pool)
+
+    assert pool.healthy() == []
+
+
+def test_anomaly_page_is_not_an_empty_page(duckduckgo):
+    duckduckgo.blocked_queries['python'] = 2
+    pool = ProxyPool([Proxy(protocol='http', host='10.0.0.1', port=8080)])
+
+    with pytest.raises(SearchBlocked):
+        search('python', count=25, proxy=pool)
+
+    assert len(duckduckgo.requests) == 2  # Retried once
+    assert pool.healthy() == []
+
+    duckduckgo.blocked_queries['python'] = 1
+    assert len(search('python', count=25)) == 25
+
+
+def test_blocked_request_is_paced_and_sent_through_another_proxy(duckduckgo):
+    duckduckgo.blocked_queries['python'] = 1
+    pool = ProxyPool([Proxy(protocol='http', host=f'10.0.0.{i}', port=8080) for i in range(2)])
+    limiter = AdaptiveRateLimiter(rate=1000, per_proxy_rate=100)
+    reserved = []
+    reserve = limiter.reserve
+    limiter.reserve = lambda proxy=None: reserved.append(proxy.host) or reserve(proxy)
+
+    results = SearchClient(rate_limiter=limiter).search('python', count=5, proxy=pool)
+
+    assert len(results) == 5
+    assert reserved == ['10.0.0.0', '10.0.0.1']
+    assert [p.host for p in pool.healthy()] == ['10.0.0.1']
+    assert limiter.rates()['10.0.0.0:8080'] == 50
+
+
+def test_adaptive_pacing_sees_blocks(duckduckgo):
+    limiter = AdaptiveRateLimiter(rate=1000, per_proxy_rate=100, increase=1)
+    client = SearchClient(rate_limiter=limiter)
+
+    duckduckgo.blocked_queries['python'] = 1
+    client.search('python', count=5)
+    assert limiter.rates() == {'direct': 51}  # Halved by the block, then one more per response
+
+    client.search('rust', count=25)
+    assert limiter.rates() == {'direct': 54}
+
+
+@pytest.mark.asyncio
+async def test_async_anomaly_page(duckduckgo):
+    duckduckgo.blocked_queries['python'] = 2
+
+    with pytest.raises(SearchBlocked):
+        await async_search('python')
+
+
+def test_hedged_request_beats_a_stall(duckduckgo):
+    duckduckgo.stalls[0] = 1.0
+    hedging = Hedging(budget=1, initial_delay=0.05)
+    client = SearchClient(hedging=hedging)
+
+    start = time.monotonic()
+    results = client.search('python', count=5)
+
+    assert time.monotonic() - start < 0.5
+    assert len(results) == 5
+    assert (hedging.hedges, hedging.wins) == (1, 1)
+    assert len(duckduckgo.sessions) == 2  # The hedge didn't wait for the stalled session
+
+
+def test_hedges_stay_within_budget(duckduckgo):
+    duckduckgo.stalls[0] = 0.2
+    hedging = Hedging(initial_delay=0.05)  # The first request only earns 5% of a hedge
+
+    results = SearchClient(hedging=hedging).search('python', count=5)
+
+    assert len(results) == 5
+    assert hedging.hedges == 0
+    assert len(duckduckgo.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_hedge_cancels_the_slower_request(duckduckgo):
+    duckduckgo.stalls[0] = 1.0
+    hedging = Hedging(budget=1, initial_delay=0.05)
+
+    start = time.monotonic()
+    results = await AsyncSearchClient(hedging=hedging).search('python', count=5)
+
+    assert time.monotonic() - start < 0.5
+    assert len(results) == 5
+    assert hedging.wins == 1
+    assert len(duckduckgo.requests) == 1  # The stalled request was cancelled before it was answered
+
+
+def test_client_cache(duckduckgo):
+    client = SearchClient(cache=SearchCache())
+    first = client.search('python', count=22)
+    second = client.search('python', count=22)
+
+    assert [r.link for r in first] == [r.link for r in second]
+    assert len(duckduckgo.requests) == 3
+    assert client.cache.stats.hits == 3
+
+    client.search('python', count=22, cache=False)
+    assert len(duckduckgo.requests) == 6
+
+
+def test_failed_pages_are_not_cached(duckduckgo):
+    duckduckgo.failing_queries.add('broken')
+    cache = SearchCache()
+
+    with pytest.raises(HTTPError):
+        search('broken', count=5, cache=cache)
+
+    assert cache._memory_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_async_client_cache(duckduckgo):
+    cache = SearchCache()
+    await async_search('python', count=12, cache=cache)
+    results = await async_search('python', count=12, cache=cache)
+
+    assert len(results) == 12
+    assert len(duckduckgo.requests) == 2
+
+
+def test_search_iter_stops_requesting_early(duckduckgo):
+    results = search_iter('python', count=100)
+
+    assert next(results).title == 'python result 0'
+    assert len(duckduckgo.requests) == 1
+
+    assert [r.title for r in results][-1] == 'python result 24'
+    assert len(duckduckgo.requests) == 4  # The last page is empty
+
+
+@pytest.mark.asyncio
+async def test_async_search_iter(duckduckgo):
+    titles = []
+    async for result in async_search_iter('python', count=100):
+        titles.append(result.title)
+        if len(titles) == 10:
+            break
+
+    assert titles == [f'python result {i}' for i in range(10)]
+    assert len(duckduckgo.requests) == 1
+
+
+def test_compact_client(duckduckgo):
+    results = SearchClient(compact=True).search('python', count=15)
+
+    assert len(results) == 15
+    assert all(isinstance(result, CompactSearchResult) for result in results)
+    assert results.json() == search('python', count=15).json()
+
+
+def test_oversized_filters_fan_out(duckduckgo):
+    client = SearchClient(max_query_length=60)
+    filters = Filters(sites=[f'site{i}.com' for i in range(6)])
+
+    results = client.search('python', filters, count=12)
+
+    queries = {request['q'] for request in duckduckgo.requests}
+    assert len(queries) > 1
+    assert all(len(query) <= 60 for query in queries)
+
+    # The parts take turns, so the first results come from every part
+    assert len(results) == 12
+    assert {result.title.rsplit(' result ', 1)[0] for result in results[: len(queries)]} == queries
+
+
+def test_fan_out_drops_duplicates(duckduckgo, monkeypatch):
+    parse_search = searcher.parse_search
+
+    def same_links(response):
+        rows = parse_search(response)
+        return [{**row, 'link': f'https://example.com/{row["link"].rsplit("/", 1)[1]}'} for row in rows]
+
+    monkeypatch.setattr(searcher, 'parse_search', same_links)
+    client = SearchClient(max_query_length=40)
+
+    results = client.search('python', Filters(sites=['a.com', 'b.com', 'c.com']), count=40)
+
+    assert sorted(str(result.link) for result in results) == sorted(f'https://example.com/{i}' for i in range(25))
+
+
+@pytest.mark.asyncio
+async def test_async_oversized_filters_fan_out(duckduckgo):
+    client = AsyncSearchClient(max_query_length=60)
+    filters = Filters(sites=[f'site{i}.com' for i in range(6)])
+
+    results = await client.search('python', filters, count=30, offset=5)
+
+    queries = {request['q'] for request in duckduckgo.requests}
+    assert len(queries) > 1
+    assert len(results) == 30
+    assert len({str(result.link) for result in results}) == 30
+
+
+def test_parallel_pages(duckduckgo):
+    duckduckgo.total = 100
+    results = SearchClient(parallel_pages=4).search('python', count=45)
+
+    assert [r.title for r in results] == [f'python result {i}' for i in range(45)]
+    assert sorted(r.get('dc', 0) for r in duckduckgo.requests) == [0, 10, 20, 30, 40]
+
+
+def test_parallel_pages_stop_at_the_last_page(duckduckgo):
+    results = SearchClient(parallel_pages=4).search('python', count=60)
+
+    assert [r.title for r in results] == [f'python result {i}' for i in range(25)]
+
+
+def test_parallel_pages_fill_gaps_and_drop_overlaps(duckduckgo):
+    duckduckgo.total = 60
+    duckduckgo.short_pages = {10: 7, 30: 4}
+
+    results = SearchClient(parallel_pages=3).search('python', count=50)
+
+    assert [r.title for r in results] == [f'python result {i}' for i in range(50)]
+    assert 17 in {r.get('dc') for r in duckduckgo.requests}
+
+
+@pytest.mark.asyncio
+async def test_parallel_pages_with_nothing_to_find(duckduckgo):
+    assert len(SearchClient(parallel_pages=4).search('python', count=0)) == 0
+    async with AsyncSearchClient(parallel_pages=4) as client:
+        assert len(await client.search('python', count=0, offset=10)) == 0
+
+    assert duckduckgo.requests == []
+
+
+@pytest.mark.asyncio
+async def test_async_parallel_pages(duckduckgo):
+    duckduckgo.total = 100
+    duckduckgo.short_pages = {20: 5}
+
+    async with AsyncSearchClient(parallel_pages=4) as client:
+        results = await client.search('python', count=70, offset=3)
+
+    assert [r.title for r in results] == [f'python result {i}' for i in range(3, 73)]
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+import search_ai.extractor as extractor
+from search_ai import Timings, async_search, search, tracing
+from search_ai.search_result import SearchResult, SearchResults
+
+
+def test_spans_are_free_without_listeners():
+    assert tracing.span('search.request') is tracing.span('page')
+
+    with tracing.span('search.request') as span:
+        span.set(status=200)
+        tracing.annotate(bytes=10)
+
+
+def test_timings_break_down_a_search(duckduckgo):
+    with Timings() as timings:
+        search('python', count=25)
+
+    phases = timings.breakdown()
+    assert phases['search.request'].count == 3
+    assert phases['search.parse'].count == 3
+    assert timings.wall >= phases['search.request'].total
+
+    request = next(span for span in timings.spans if span.name == 'search.request')
+    assert request.attrs['query'] == 'python'
+    assert request.attrs['status'] == 200
+    assert request.attrs['bytes'] > 0
+    assert request.attrs['retries'] == 0
+    assert 'search.request' in str(timings)
+
+
+def test_retries_and_errors_are_recorded(duckduckgo):
+    duckduckgo.broken_queries.add('broken')
+
+    with Timings() as timings, pytest.raises(Exception):
+        search('broken')
+
+    [request] = timings.spans
+    assert request.attrs['retries'] == 1
+    assert request.attrs['status'] == 500
+    assert request.attrs['error'] == 'HTTPError'
+
+
+def test_blocked_requests_are_sent_again(duckduckgo):
+    duckduckgo.failing_queries.add('blocked')
+
+    with Timings() as timings, pytest.raises(Exception):
+        search('blocked')
+
+    assert [span.name for span in timings.spans] == ['search.request', 'search.request']
+    assert all(span.attrs['retries'] == 0 and span.attrs['blocked'] for span in timings.spans)
+
+
+def test_hooks_see_every_span(duckduckgo, monkeypatch):
+    spans = []
+    monkeypatch.setattr(tracing, 'hooks', [spans.append])
+
+    search('python', count=5)
+    assert [span.name for span in spans] == ['search.request', 'search.parse']
+
+
+def test_extended_output_phases(monkeypatch):
+    async def page_source(url, fetch):
+        return '<html><body><p>Page text</p></body></html>'
+
+    monkeypatch.setattr(extractor, '_get_page_source', page_source)
+    results = SearchResults(
+        [SearchResult(title='A', link='https://a.com/'), SearchResult(title='B', link='https://b.com/')]
+    )
+
+    with Timings() as timings:
+        results.markdown(extend=True)
+
+    pages = [span for span in timings.spans if span.name == 'page']
+    assert sorted(span.attrs['url'] for span in pages) == ['https://a.com/', 'https://b.com/']
+    assert all(span.attrs['bytes'] > 0 for span in pages)
+
+    [convert] = [span for span in timings.spans if span.name == 'convert']
+    assert convert.attrs['pages'] == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_timed_separately(duckduckgo):
+    async def timed(query: str, count: int) -> Timings:
+        with Timings() as timings:
+            await async_search(query, count=count)
+        return timings
+
+    short, long = await asyncio.gather(timed('a', 5), timed('b', 25))
+
+    assert short.breakdown()['search.request'].count == 1
+    assert long.breakdown()['search.request'].count == 3
@@ -0,0 +1,34 @@
+import pytest
+
+from search_ai.utils import sufficient_content
+
+
+ARTICLE = '<p>' + 'Server rendered article text. ' * 40 + '</p>'
+
+
+@pytest.mark.parametrize(
+    'page_source, expected',
+    [
+        (f'<html><head><title>t</title></head><body>{ARTICLE}</body></html>', True),
+        ('<html><head><title>t</title></head></html>', False),
+        ('<html><body></body></html>', False),
+        ('<html><body><p>Too short</p></body></html>', False),
+        (f'<html><body><div id="root"></div>{ARTICLE}</body></html>', False),
+        (f'<html><body><div id="__next">{ARTICLE}</div></body></html>', True),
+        (
+            '<html><body><noscript>Please enable JavaScript to run this app.</noscript>'
+            f'<script>{"x" * 100_000}</script>{ARTICLE}</body></html>',
+            False,
+        ),
+        (f'<html><body><noscript>Please enable JavaScript.</noscript>{ARTICLE}</body></html>', True),
+        (f'<html><body><script>{"var a = 1;" * 100}</script></body></html>', False),
+        (f'<html><body><template>{ARTICLE}</template><style>{ARTICLE}</style></body></html>', False),
+        (
+            '<html><body><noscript>Please enable JavaScript to run this app.</noscript>'
+            f'<script>{"x" * 10_000}</script>{ARTICLE * 2}</body></html>',
+            True,  # Long enough to pass the density check too
+        ),
+    ],
+)
+def test_sufficient_content(page_source, expected):
+    assert sufficient_content(page_source) is expected